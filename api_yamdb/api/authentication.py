@@ -0,0 +1,93 @@
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+from reviews.models import User
+
+USER_KEY = 'auth-user:{}'
+# Бэкенды, у которых кеш свой в каждом процессе.
+LOCAL_CACHES = (LocMemCache, DummyCache)
+# Поля, которые читают права доступа и сериализатор /users/me/. Остальные
+# (password, last_login, ...) остаются отложенными: обращение к ним
+# подгрузит строку, а save() не перезапишет их значениями из кеша.
+# Порядок — как в модели, его ожидает Model.from_db.
+USER_FIELDS = tuple(
+    field.attname for field in User._meta.concrete_fields
+    if field.attname in {
+        'id', 'username', 'email', 'first_name', 'last_name', 'bio',
+        'role', 'is_superuser', 'is_staff', 'is_active',
+    }
+)
+
+
+def access_token_for(user):
+    """Токен доступа с ролью пользователя в claims.
+
+    Роль в токене видна клиентам и прокси без запроса к API, сам API
+    права проверяет по актуальной записи пользователя.
+    """
+    token = AccessToken.for_user(user)
+    token['role'] = user.role
+    token['is_superuser'] = user.is_superuser
+    return token
+
+
+def user_cache_enabled():
+    """Пользователь кешируется только в общем для процессов кеше.
+
+    Сигналы User удаляют запись в кеше процесса, который изменил
+    пользователя. С локальным кешем остальные воркеры и asgi ещё
+    AUTH_USER_CACHE_TIMEOUT секунд пускали бы удалённого, отключённого или
+    пониженного в правах пользователя, поэтому с ним пользователь читается
+    из базы на каждый запрос.
+    """
+    return (settings.AUTH_USER_CACHE_TIMEOUT > 0
+            and not isinstance(caches['default'], LOCAL_CACHES))
+
+
+def cache_user(user):
+    cache.set(
+        USER_KEY.format(user.pk),
+        [getattr(user, field) for field in USER_FIELDS],
+        settings.AUTH_USER_CACHE_TIMEOUT
+    )
+
+
+def cached_user(user_id):
+    values = cache.get(USER_KEY.format(user_id))
+    if values is None:
+        return None
+    return User.from_db(User.objects.db, USER_FIELDS, values)
+
+
+def forget_user_on_commit(user_id):
+    transaction.on_commit(lambda: cache.delete(USER_KEY.format(user_id)))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWT-аутентификация без запроса пользователя на каждый запрос.
+
+    Пользователь собирается из кеша с коротким сроком жизни
+    (AUTH_USER_CACHE_TIMEOUT), при промахе читается из базы. Сигналы
+    модели User удаляют запись из кеша при изменении роли или удалении.
+    Без общего бэкенда кеша (user_cache_enabled) — обычный запрос к базе.
+    """
+
+    def get_user(self, validated_token):
+        if not user_cache_enabled():
+            return super().get_user(validated_token)
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        user = cached_user(user_id) if user_id is not None else None
+        if user is None:
+            user = super().get_user(validated_token)
+            cache_user(user)
+        elif not user.is_active:
+            raise AuthenticationFailed(
+                _('User is inactive'), code='user_inactive')
+        return user
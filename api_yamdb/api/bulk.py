@@ -0,0 +1,263 @@
+"""Пакетное создание и изменение объектов каталога.
+
+POST со списком объектов на маршрут списка создаёт их, PATCH со списком
+(api/routers.py) частично изменяет. Пачка проверяется целиком: слаги
+связанных объектов и уникальные поля ищутся одним запросом IN на всю
+пачку, ошибки возвращаются списком той же длины, что и запрос, с пустым
+словарём у верных объектов. Если ошибок нет, объекты записываются
+bulk_create/bulk_update в одной транзакции, иначе не записывается ничего.
+Сигналы моделей при этом не срабатывают, поэтому кеш сбрасывается здесь.
+"""
+from api.cache import invalidate_on_commit
+from api.integrity import unique_violation
+from api.serializers import TitleCreateUpdateDestroySerializer
+from api.slugs import atomic_with_slugs, forget_slugs_on_commit, slug_objects
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import IntegrityError, connection, transaction
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from reviews.models import Title, TitleGenre
+
+NOT_A_LIST = 'Ожидается список объектов.'
+TOO_MANY = 'Не больше {} объектов за запрос.'
+REQUIRED = 'Обязательное поле.'
+NOT_FOUND = 'Объект не найден.'
+DUPLICATE = 'Объект повторяется в запросе.'
+CONFLICT = ('Объект с таким уникальным полем создан другим запросом, '
+            'повторите запрос.')
+
+
+class BulkMixin:
+    """Пакетные create и bulk_update для вьюсета.
+
+    bulk_lookup_field — поле, по которому PATCH находит объекты, оно
+    обязательно в каждом объекте. bulk_serializer_class проверяет объекты
+    пачки, по умолчанию — serializer_class. Запись выполняют
+    perform_bulk_create(validated) и perform_bulk_update(pairs) вьюсета
+    или примеси ниже.
+    """
+
+    bulk_lookup_field = 'id'
+    bulk_serializer_class = None
+
+    def create(self, request, *args, **kwargs):
+        if isinstance(request.data, list):
+            return self.bulk_create(request)
+        return super().create(request, *args, **kwargs)
+
+    def bulk_create(self, request):
+        items = self.bulk_items(request)
+        errors = [{} for _ in items]
+        validated = self.bulk_validate(items, [None] * len(items), errors)
+        objects = self.bulk_write(self.perform_bulk_create, validated)
+        return Response(self.bulk_representation(objects),
+                        status=status.HTTP_201_CREATED)
+
+    def bulk_update(self, request, *args, **kwargs):
+        items = self.bulk_items(request)
+        errors = [{} for _ in items]
+        instances = self.bulk_instances(items, errors)
+        validated = self.bulk_validate(items, instances, errors)
+        objects = self.bulk_write(self.perform_bulk_update,
+                                  list(zip(instances, validated)))
+        return Response(self.bulk_representation(objects))
+
+    def bulk_items(self, request):
+        items = request.data
+        if not isinstance(items, list):
+            raise ValidationError(
+                {api_settings.NON_FIELD_ERRORS_KEY: [NOT_A_LIST]})
+        if len(items) > settings.BULK_MAX_ITEMS:
+            raise ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [
+                TOO_MANY.format(settings.BULK_MAX_ITEMS)]})
+        return items
+
+    def bulk_instances(self, items, errors):
+        """Изменяемые объекты пачки одним запросом."""
+        model = self.get_queryset().model
+        field = model._meta.get_field(self.bulk_lookup_field)
+        keys = []
+        seen = set()
+        for item, error in zip(items, errors):
+            key = None
+            # Объект не словарь — ошибку формата вернёт сериализатор.
+            if isinstance(item, dict) and field.name not in item:
+                error[field.name] = [REQUIRED]
+            elif isinstance(item, dict):
+                try:
+                    key = field.to_python(item[field.name])
+                except (DjangoValidationError, TypeError):
+                    error[field.name] = [NOT_FOUND]
+            if key is not None and key in seen:
+                error[field.name] = [DUPLICATE]
+                key = None
+            seen.add(key)
+            keys.append(key)
+        found = model._default_manager.in_bulk(
+            {key for key in keys if key is not None}, field_name=field.name)
+        for key, error in zip(keys, errors):
+            if key is not None and key not in found:
+                error[field.name] = [NOT_FOUND]
+        return [found.get(key) for key in keys]
+
+    def get_bulk_serializer_class(self):
+        return self.bulk_serializer_class or self.get_serializer_class()
+
+    def get_bulk_context(self, items):
+        """Контекст сериализаторов пачки. В related_objects можно заранее
+        положить связанные объекты (PreloadedSlugRelatedField)."""
+        return self.get_serializer_context()
+
+    def bulk_validate(self, items, instances, errors):
+        serializer_class = self.get_bulk_serializer_class()
+        context = self.get_bulk_context(items)
+        serializers = []
+        for item, instance, error in zip(items, instances, errors):
+            serializer = serializer_class(
+                instance, data=item, partial=instance is not None,
+                context=context)
+            if not error and not serializer.is_valid():
+                error.update(serializer.errors)
+            serializers.append(serializer)
+        self.validate_unique(serializers, instances, errors)
+        if any(errors):
+            raise ValidationError(errors)
+        return [serializer.validated_data for serializer in serializers]
+
+    def validate_unique(self, serializers, instances, errors):
+        """Уникальные поля: повторы внутри пачки и в базе одним запросом
+        на поле (BulkUniqueMixin)."""
+        if not serializers or not hasattr(
+                serializers[0], 'get_unique_validators'):
+            return
+        unique = serializers[0].get_unique_validators()
+        for name, (attr, validator) in unique.items():
+            values = {}
+            for serializer, instance, error in zip(
+                    serializers, instances, errors):
+                if error or attr not in serializer.validated_data:
+                    continue
+                value = serializer.validated_data[attr]
+                if instance is not None and getattr(instance, attr) == value:
+                    continue
+                if value in values:
+                    error[name] = [DUPLICATE]
+                else:
+                    values[value] = error
+            taken = validator.queryset.filter(
+                **{f'{attr}__in': values}).values_list(attr, flat=True)
+            for value in taken:
+                values[value][name] = [validator.message]
+
+    def bulk_atomic(self):
+        return transaction.atomic()
+
+    def bulk_write(self, perform, data):
+        """Запись пачки. Уникальное значение, которое другой запрос занял
+        после проверки, — ошибка проверки, а не ошибка сервера."""
+        try:
+            with self.bulk_atomic():
+                objects = perform(data)
+                self.bulk_invalidate()
+        except IntegrityError as error:
+            if not unique_violation(error, self.get_queryset().model):
+                raise
+            raise ValidationError(
+                {api_settings.NON_FIELD_ERRORS_KEY: [CONFLICT]})
+        return objects
+
+    def bulk_invalidate(self):
+        invalidate_on_commit(*self.cache_namespaces)
+
+    def bulk_representation(self, objects):
+        return self.get_serializer(objects, many=True).data
+
+
+class SlugBulkMixin(BulkMixin):
+    """Жанры и категории: PATCH находит объекты по slug и меняет название.
+
+    title_lookup — связь произведения с моделью: изменённое название
+    попадает в ответы произведений, поэтому их modified обновляется.
+    """
+
+    bulk_lookup_field = 'slug'
+    title_lookup = None
+
+    def perform_bulk_create(self, validated):
+        model = self.get_queryset().model
+        return model.objects.bulk_create(
+            model(**data) for data in validated)
+
+    def perform_bulk_update(self, pairs):
+        fields = set()
+        for instance, data in pairs:
+            for attr, value in data.items():
+                setattr(instance, attr, value)
+            fields.update(data)
+        objects = [instance for instance, _ in pairs]
+        if fields:
+            self.get_queryset().model.objects.bulk_update(objects, fields)
+            Title.objects.filter(
+                **{f'{self.title_lookup}__in': objects}).touch()
+        return objects
+
+    def bulk_invalidate(self):
+        invalidate_on_commit(*self.cache_namespaces, 'titles')
+        forget_slugs_on_commit(self.get_queryset().model)
+
+
+class TitleBulkMixin(BulkMixin):
+    """Произведения: слаги жанров и категорий всей пачки берутся из кеша
+    одним запросом (api/slugs.py), связи с жанрами пишутся одним INSERT."""
+
+    def get_bulk_context(self, items):
+        context = super().get_bulk_context(items)
+        context['related_objects'] = slug_objects(
+            TitleCreateUpdateDestroySerializer.related_slugs(items))
+        return context
+
+    def bulk_atomic(self):
+        return atomic_with_slugs()
+
+    def perform_bulk_create(self, validated):
+        titles = [Title(**{attr: value for attr, value in data.items()
+                           if attr != 'genres'}) for data in validated]
+        if connection.features.can_return_ids_from_bulk_insert:
+            Title.objects.bulk_create(titles)
+        else:
+            # SQLite не возвращает id из bulk_create, а они нужны для
+            # связей с жанрами.
+            for title in titles:
+                title.save()
+        self.set_genres(zip(titles, validated), created=True)
+        return titles
+
+    def perform_bulk_update(self, pairs):
+        fields = {'modified'}
+        for title, data in pairs:
+            for attr, value in data.items():
+                if attr != 'genres':
+                    setattr(title, attr, value)
+                    fields.add(attr)
+            # bulk_update не вызывает pre_save, auto_now не сработает.
+            title.modified = Title._meta.get_field('modified').pre_save(
+                title, add=False)
+        titles = [title for title, _ in pairs]
+        Title.objects.bulk_update(titles, fields)
+        self.set_genres(pairs)
+        return titles
+
+    def set_genres(self, pairs, created=False):
+        TitleGenre.objects.set_genres({
+            title.id: [genre.id for genre in data['genres']]
+            for title, data in pairs if 'genres' in data
+        }, created=created)
+
+    def bulk_representation(self, titles):
+        ids = [title.id for title in titles]
+        fetched = self.get_queryset().in_bulk(ids)
+        return super().bulk_representation(
+            [fetched[title_id] for title_id in ids])
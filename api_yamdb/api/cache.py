@@ -0,0 +1,90 @@
+from hashlib import md5
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.http import urlencode
+from rest_framework.response import Response
+
+VERSION_KEY = 'api-cache-version:{}'
+RESPONSE_KEY = 'api-response:{}'
+
+
+def namespace_versions(namespaces):
+    """Возвращает текущие версии пространств имён кеша.
+
+    Ключ ответа включает версии, поэтому смена версии делает все старые
+    записи пространства недоступными, не перебирая их.
+    """
+    keys = [VERSION_KEY.format(namespace) for namespace in namespaces]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, uuid4().hex, None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def invalidate(*namespaces):
+    cache.set_many(
+        {VERSION_KEY.format(namespace): uuid4().hex
+         for namespace in namespaces},
+        None
+    )
+
+
+def invalidate_on_commit(*namespaces):
+    transaction.on_commit(lambda: invalidate(*namespaces))
+
+
+class CachedListMixin:
+    """Кеширует данные ответов list для анонимных запросов.
+
+    Ключ строится из пути, строки запроса, классов прав доступа и версий
+    пространств имён из get_cache_namespaces(), которые сбрасываются
+    сигналами при изменении моделей (см. api/signals.py).
+    """
+
+    cache_namespaces = ()
+
+    def get_cache_namespaces(self):
+        return self.cache_namespaces
+
+    def get_cache_key(self, request):
+        query = urlencode(sorted(request.query_params.lists()), doseq=True)
+        permissions = ','.join(
+            permission.__name__ for permission in self.permission_classes)
+        versions = ','.join(
+            namespace_versions(self.get_cache_namespaces()))
+        raw_key = f'{request.path}?{query}|{permissions}|{versions}'
+        return RESPONSE_KEY.format(md5(raw_key.encode()).hexdigest())
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        if request.user.is_authenticated:
+            return handler(request, *args, **kwargs)
+        key = self.get_cache_key(request)
+        cached = cache.get(key)
+        if cached is not None:
+            data, self.conditional_state = cached
+            return Response(data)
+        response = handler(request, *args, **kwargs)
+        # Потоковый ответ (?stream=true) не кешируется: данных в памяти нет.
+        if response.status_code == 200 and not response.streaming:
+            cache.set(
+                key,
+                (response.data, getattr(self, 'conditional_state', None)),
+                settings.API_CACHE_TIMEOUT
+            )
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+
+class CachedListRetrieveMixin(CachedListMixin):
+    """Кеширует ответы list и retrieve."""
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            super().retrieve, request, *args, **kwargs)
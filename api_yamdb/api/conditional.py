@@ -0,0 +1,71 @@
+from hashlib import md5
+
+from django.utils.cache import get_conditional_response, quote_etag
+from django.utils.http import http_date
+
+
+class ConditionalGetMixin:
+    """Отвечает 304 на If-None-Match / If-Modified-Since для list и retrieve.
+
+    Вьюсет сообщает версию данных двумя способами. Обычный запрос
+    вычисляет её по уже загруженным строкам через set_conditional_state(),
+    не делая лишних запросов. Условный запрос сначала вызывает
+    get_conditional_state(), которая должна быть дешевле выборки и
+    сериализации страницы, и при совпадении версии сразу получает 304.
+    """
+
+    conditional_state = None
+    checked_state = None
+
+    def get_conditional_state(self):
+        """Возвращает (версия, время изменения) или None."""
+        return None
+
+    def set_conditional_state(self, version, last_modified):
+        self.conditional_state = (version, last_modified)
+
+    def get_etag(self, request, version):
+        raw = '|'.join((request.get_full_path(),
+                        request.META.get('HTTP_ACCEPT', ''), version))
+        return quote_etag(md5(raw.encode()).hexdigest())
+
+    def set_conditional_headers(self, response, etag, last_modified):
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified.timestamp())
+        return response
+
+    def not_modified_response(self, request):
+        state = self.get_conditional_state()
+        if state is None:
+            return None
+        version, last_modified = self.checked_state = state
+        etag = self.get_etag(request, version)
+        response = get_conditional_response(
+            request, etag=etag,
+            last_modified=last_modified and int(last_modified.timestamp()))
+        if response is not None:
+            self.set_conditional_headers(response, etag, last_modified)
+        return response
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        if ('HTTP_IF_NONE_MATCH' in request.META
+                or 'HTTP_IF_MODIFIED_SINCE' in request.META):
+            response = self.not_modified_response(request)
+            if response is not None:
+                return response
+        response = handler(request, *args, **kwargs)
+        state = self.checked_state or self.conditional_state
+        if response.status_code == 200 and state:
+            version, last_modified = state
+            self.set_conditional_headers(
+                response, self.get_etag(request, version), last_modified)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().retrieve, request, *args, **kwargs)
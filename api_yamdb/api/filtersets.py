@@ -1,12 +1,78 @@
-from django_filters import CharFilter, FilterSet
-from reviews.models import Title
+from api.search import search
+from django.db.models import Subquery
+from django_filters import CharFilter, ChoiceFilter, FilterSet
+from reviews.models import Category, Genre, Title, TitleGenre
+
+GENRE_MATCH_ANY = 'any'
+GENRE_MATCH_ALL = 'all'
+GENRE_MATCH_CHOICES = (
+    (GENRE_MATCH_ANY, 'Любой из жанров'),
+    (GENRE_MATCH_ALL, 'Все жанры'),
+)
+
+
+def slugs(value):
+    return list(dict.fromkeys(
+        slug.strip() for slug in value.split(',') if slug.strip()))
+
+
+def by_slugs(field, model, slug_list):
+    """Условие на внешний ключ через подзапрос id по слагам.
+
+    Для одного слага подзапрос скалярный: сравнение с константой
+    позволяет читать составной индекс (поле, -id) сразу в нужном порядке.
+    """
+    queryset = model.objects.order_by()
+    if len(slug_list) == 1:
+        return {field: Subquery(
+            queryset.filter(slug=slug_list[0]).values('id'))}
+    return {f'{field}__in': queryset.filter(
+        slug__in=slug_list).values('id')}
 
 
 class TitleFilter(FilterSet):
-    category = CharFilter(field_name='category__slug')
-    genre = CharFilter(field_name='genres__slug')
-    name = CharFilter(field_name='name', lookup_expr='icontains')
+    """Фильтры произведений.
+
+    Категории и жанры принимают несколько слагов через запятую. Жанры
+    проверяются подзапросами к TitleGenre, которые база выполняет как
+    полусоединение (semi-join), а не соединением: каждое произведение
+    попадает в выдачу один раз без DISTINCT. Django 2.2 не умеет
+    filter(Exists(...)), а аннотация с Exists добавила бы GROUP BY в COUNT
+    пагинации, поэтому подзапросы записаны через id__in.
+    """
+
+    category = CharFilter(method='filter_category')
+    genre = CharFilter(method='filter_genre')
+    genre_match = ChoiceFilter(choices=GENRE_MATCH_CHOICES,
+                               method='skip_filter')
+    name = CharFilter(method='search_name')
 
     class Meta:
         model = Title
-        fields = ('category', 'genres', 'name', 'year')
+        fields = ('category', 'genres', 'name', 'year', 'rating')
+
+    def skip_filter(self, queryset, name, value):
+        return queryset
+
+    def filter_category(self, queryset, name, value):
+        slug_list = slugs(value)
+        if not slug_list:
+            return queryset
+        return queryset.filter(**by_slugs('category', Category, slug_list))
+
+    def filter_genre(self, queryset, name, value):
+        slug_list = slugs(value)
+        if not slug_list:
+            return queryset
+        if self.form.cleaned_data.get('genre_match') == GENRE_MATCH_ALL:
+            groups = [[slug] for slug in slug_list]
+        else:
+            groups = [slug_list]
+        for group in groups:
+            queryset = queryset.filter(id__in=TitleGenre.objects.filter(
+                **by_slugs('genre', Genre, group)).values('title_id'))
+        return queryset
+
+    def search_name(self, queryset, name, value):
+        """Полнотекстовый поиск по названию и описанию с учётом опечаток."""
+        return search(queryset, value, ('name',), ('name', 'description'))
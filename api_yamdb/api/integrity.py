@@ -0,0 +1,52 @@
+"""Какое ограничение нарушила IntegrityError.
+
+Вьюсеты превращают в ошибку проверки только ожидаемые нарушения (гонка
+за уникальное значение, устаревший внешний ключ), остальные IntegrityError
+остаются ошибками сервера. PostgreSQL сообщает код SQLSTATE, таблицу и
+ограничение, SQLite — только текст: для уникальности в нём есть столбцы,
+для внешнего ключа нет ничего, поэтому на SQLite любое нарушение внешнего
+ключа считается подходящим.
+"""
+UNIQUE_VIOLATION = '23505'
+FOREIGN_KEY_VIOLATION = '23503'
+
+
+def _diag(error):
+    cause = error.__cause__
+    return getattr(cause, 'pgcode', None), getattr(cause, 'diag', None)
+
+
+def unique_violation(error, model, constraint=None):
+    """Нарушена уникальность в таблице model, если задано — ограничение
+    constraint из Meta.constraints."""
+    opts = model._meta
+    code, diag = _diag(error)
+    if code is not None:
+        return (code == UNIQUE_VIOLATION
+                and diag.table_name == opts.db_table
+                and constraint in (None, diag.constraint_name))
+    message = str(error)
+    prefix = 'UNIQUE constraint failed: '
+    if not message.startswith(prefix):
+        return False
+    columns = message[len(prefix):].split(', ')
+    if constraint is None:
+        return all(column.startswith(f'{opts.db_table}.')
+                   for column in columns)
+    fields = next(item.fields for item in opts.constraints
+                  if item.name == constraint)
+    return columns == [f'{opts.db_table}.{opts.get_field(name).column}'
+                       for name in fields]
+
+
+def foreign_key_violation(error, model, *fields):
+    """Нарушен внешний ключ одного из полей fields таблицы model."""
+    opts = model._meta
+    code, diag = _diag(error)
+    if code is not None:
+        detail = diag.message_detail or ''
+        return (code == FOREIGN_KEY_VIOLATION
+                and diag.table_name == opts.db_table
+                and any(f'({opts.get_field(name).column})=' in detail
+                        for name in fields))
+    return str(error) == 'FOREIGN KEY constraint failed'
@@ -0,0 +1,109 @@
+"""Метрики Prometheus по действиям DRF.
+
+Без PROMETHEUS_MULTIPROC_DIR значения хранятся в памяти процесса. С ним
+prometheus_client пишет их в mmap-файлы каталога, и /metrics любого
+воркера gunicorn отдаёт сумму по всем воркерам.
+"""
+import os
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import HttpResponse
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY,
+                               CollectorRegistry, Counter, Gauge, Histogram,
+                               generate_latest, multiprocess)
+
+MULTIPROC_DIR = os.getenv('PROMETHEUS_MULTIPROC_DIR')
+if MULTIPROC_DIR:
+    os.makedirs(MULTIPROC_DIR, exist_ok=True)
+
+LABELS = ('viewset', 'action', 'method')
+
+REQUESTS = Counter(
+    'yamdb_requests_total',
+    'Requests by viewset action and response status',
+    LABELS + ('status',)
+)
+LATENCY = Histogram(
+    'yamdb_request_duration_seconds',
+    'Request latency by viewset action',
+    LABELS,
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+)
+POOL_CONNECTIONS = Gauge(
+    'yamdb_db_pool_connections',
+    'Connections of the in-process pool (api_yamdb.db_pool)',
+    ('alias', 'state'),
+    multiprocess_mode='livesum'
+)
+POOL_MAX_CONNECTIONS = Gauge(
+    'yamdb_db_pool_max_connections',
+    'Pool size limit (api_yamdb.db_pool)',
+    ('alias',),
+    multiprocess_mode='livesum'
+)
+
+
+def view_labels(request, view_func):
+    """Класс и действие вьюсета, например TitleViewSet и list."""
+    view_class = getattr(view_func, 'cls', None)
+    if view_class is None:
+        return '', '', request.method
+    method = request.method.lower()
+    actions = getattr(view_func, 'actions', None) or {}
+    return view_class.__name__, actions.get(method, method), request.method
+
+
+def update_pool_gauges():
+    for connection in connections.all():
+        connection_pool = getattr(connection, 'connection_pool', None)
+        if connection_pool is None or connection_pool.closed:
+            continue
+        in_use, idle = connection_pool.usage()
+        POOL_CONNECTIONS.labels(connection.alias, 'in_use').set(in_use)
+        POOL_CONNECTIONS.labels(connection.alias, 'idle').set(idle)
+        POOL_MAX_CONNECTIONS.labels(connection.alias).set(
+            connection_pool.maxconn)
+
+
+class MetricsMiddleware:
+    """Считает запросы, ошибки и время ответа по действиям вьюсетов.
+
+    Метки — класс вьюсета, действие и метод. Запросы к другим
+    представлениям (и 404 без маршрута) идут с пустыми viewset и action.
+    Отключается METRICS_ENABLED=False.
+    """
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        response = self.get_response(request)
+        labels = getattr(request, 'metrics_labels', None) or (
+            '', '', request.method)
+        LATENCY.labels(*labels).observe(time.perf_counter() - started)
+        REQUESTS.labels(*labels, response.status_code).inc()
+        update_pool_gauges()
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.metrics_labels = view_labels(request, view_func)
+
+
+def registry():
+    if not MULTIPROC_DIR:
+        return REGISTRY
+    collector_registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(collector_registry, MULTIPROC_DIR)
+    return collector_registry
+
+
+def metrics(request):
+    """Метрики в текстовом формате Prometheus."""
+    return HttpResponse(generate_latest(registry()),
+                        content_type=CONTENT_TYPE_LATEST)
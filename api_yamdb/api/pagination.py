@@ -0,0 +1,93 @@
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.paginator import InvalidPage
+from rest_framework import pagination
+from rest_framework.exceptions import NotFound
+
+PAGINATION_QUERY_PARAM = 'pagination'
+PAGE_MODE = 'page'
+CURSOR_MODE = 'cursor'
+STREAM_QUERY_PARAM = 'stream'
+
+
+class CursorPagination(pagination.CursorPagination):
+    """Keyset-пагинация по сортировке вьюсета, без COUNT и OFFSET."""
+
+    def get_ordering(self, request, queryset, view):
+        return view.cursor_ordering
+
+
+class StreamingPagination(pagination.PageNumberPagination):
+    """Постраничная пагинация для потоковой выдачи (?stream=true).
+
+    Размер страницы можно поднять параметром page_size до
+    STREAM_MAX_PAGE_SIZE. paginate_lazily не загружает страницу, а
+    возвращает срез queryset, который вьюсет читает чанками.
+    """
+
+    page_size_query_param = 'page_size'
+
+    @property
+    def max_page_size(self):
+        return settings.STREAM_MAX_PAGE_SIZE
+
+    def paginate_lazily(self, queryset, request, view=None):
+        # То же, что PageNumberPagination.paginate_queryset, но без
+        # list(self.page).
+        page_size = self.get_page_size(request)
+        paginator = self.django_paginator_class(queryset, page_size)
+        page_number = request.query_params.get(self.page_query_param, 1)
+        if page_number in self.last_page_strings:
+            page_number = paginator.num_pages
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            raise NotFound(self.invalid_page_message.format(
+                page_number=page_number, message=str(exc)))
+        self.request = request
+        return self.page.object_list
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return list(self.paginate_lazily(queryset, request, view))
+
+    def get_envelope(self):
+        """Ответ get_paginated_response без results."""
+        return OrderedDict((
+            ('count', self.page.paginator.count),
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+        ))
+
+
+class SwitchablePaginationMixin:
+    """Выбор курсорной пагинации для вьюсета или отдельного запроса.
+
+    Режим по умолчанию задаёт ``pagination_mode`` вьюсета, в запросе его
+    можно переключить параметром ``?pagination=cursor|page``. Постраничный
+    режим с ``?stream=true`` использует StreamingPagination.
+    """
+
+    pagination_mode = PAGE_MODE
+    cursor_ordering = None
+
+    def use_cursor_pagination(self):
+        params = self.request.query_params
+        if PAGINATION_QUERY_PARAM in params:
+            return params[PAGINATION_QUERY_PARAM] == CURSOR_MODE
+        # Курсор без явного режима пришёл из ссылки курсорной страницы.
+        return (self.pagination_mode == CURSOR_MODE
+                or CursorPagination.cursor_query_param in params)
+
+    def use_streaming(self):
+        return self.request.query_params.get(STREAM_QUERY_PARAM) in (
+            '1', 'true')
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            if self.use_cursor_pagination():
+                self._paginator = CursorPagination()
+            elif self.use_streaming():
+                self._paginator = StreamingPagination()
+        return super().paginator
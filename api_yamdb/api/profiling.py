@@ -0,0 +1,213 @@
+import cProfile
+import math
+import os
+import random
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+METRICS = ('wall_ms', 'db_ms', 'queries', 'serializer_ms', 'render_ms',
+           'size')
+
+
+class RequestProfile:
+    """Замеры одного запроса, доступны как request.profile."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.render_started = None
+        self.render_time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        """Обёртка connection.execute_wrapper: считает запросы к базе."""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.queries += 1
+
+    def sample(self, response):
+        # У потоковых ответов размер заранее неизвестен.
+        size = 0 if response.streaming else len(response.content)
+        return {
+            'wall_ms': (time.perf_counter() - self.started) * 1000,
+            'db_ms': self.db_time * 1000,
+            'queries': self.queries,
+            'serializer_ms': self.serializer_time * 1000,
+            'render_ms': self.render_time * 1000,
+            'size': size,
+        }
+
+
+def percentile(values, share):
+    """Перцентиль по методу ближайшего ранга, values отсортированы."""
+    index = max(math.ceil(share * len(values)) - 1, 0)
+    return values[index]
+
+
+class ProfileStats:
+    """Последние PROFILING_WINDOW замеров каждого маршрута в процессе."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.samples = defaultdict(self.new_window)
+            self.totals = defaultdict(int)
+
+    @staticmethod
+    def new_window():
+        return deque(maxlen=settings.PROFILING_WINDOW)
+
+    def add(self, route, sample):
+        with self.lock:
+            self.samples[route].append(sample)
+            self.totals[route] += 1
+
+    def summary(self):
+        with self.lock:
+            samples = {route: list(window)
+                       for route, window in self.samples.items()}
+            totals = dict(self.totals)
+        result = {}
+        for route, window in sorted(samples.items()):
+            route_stats = {'requests': totals[route], 'window': len(window)}
+            for metric in METRICS:
+                values = sorted(sample[metric] for sample in window)
+                route_stats[metric] = {
+                    'mean': round(sum(values) / len(values), 3),
+                    'p50': round(percentile(values, 0.5), 3),
+                    'p95': round(percentile(values, 0.95), 3),
+                    'p99': round(percentile(values, 0.99), 3),
+                    'max': round(values[-1], 3),
+                }
+            result[route] = route_stats
+        return result
+
+
+stats = ProfileStats()
+# cProfile в CPython не умеет профилировать несколько потоков сразу.
+profiler_lock = threading.Lock()
+
+
+def route_of(request):
+    """Метод и имя маршрута роутера, например GET titles-list."""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        name = 'unresolved'
+    else:
+        name = match.url_name or match.route
+    return f'{request.method} {name}'
+
+
+def profile_of(request):
+    return getattr(request, 'profile', None)
+
+
+@contextmanager
+def serialization_timer(request):
+    """Добавляет время блока к serializer_ms запроса."""
+    profile = profile_of(request)
+    if profile is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.serializer_time += time.perf_counter() - started
+
+
+class ProfilingMiddleware:
+    """Собирает время запроса, запросы к базе, сериализацию и отрисовку.
+
+    Включается PROFILING_ENABLED, статистика по маршрутам доступна
+    администраторам на /api/v1/profiling/. С вероятностью
+    PROFILING_CPROFILE_RATE запрос выполняется под cProfile, и если он
+    дольше PROFILING_SLOW_MS, профиль сохраняется в PROFILING_CPROFILE_DIR.
+    """
+
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        profile = request.profile = RequestProfile()
+        profiler = None
+        if (settings.PROFILING_CPROFILE_RATE
+                and random.random() < settings.PROFILING_CPROFILE_RATE
+                and profiler_lock.acquire(blocking=False)):
+            profiler = cProfile.Profile()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(profile))
+                if profiler is None:
+                    response = self.get_response(request)
+                else:
+                    response = profiler.runcall(self.get_response, request)
+        finally:
+            if profiler is not None:
+                profiler_lock.release()
+        route = route_of(request)
+        sample = profile.sample(response)
+        stats.add(route, sample)
+        if (profiler is not None
+                and sample['wall_ms'] >= settings.PROFILING_SLOW_MS):
+            self.dump(profiler, route, sample)
+        return response
+
+    def process_template_response(self, request, response):
+        # Вызывается прямо перед response.render(), отрисовку DRF
+        # замеряем до колбэка после неё.
+        profile = profile_of(request)
+        if profile is not None:
+            profile.render_started = time.perf_counter()
+            response.add_post_render_callback(
+                lambda response: self.rendered(profile))
+        return response
+
+    @staticmethod
+    def rendered(profile):
+        profile.render_time += time.perf_counter() - profile.render_started
+
+    @staticmethod
+    def dump(profiler, route, sample):
+        os.makedirs(settings.PROFILING_CPROFILE_DIR, exist_ok=True)
+        name = '{}-{}-{:.0f}ms.prof'.format(
+            time.strftime('%Y%m%d-%H%M%S'),
+            route.replace(' ', '-'), sample['wall_ms'])
+        profiler.dump_stats(
+            os.path.join(settings.PROFILING_CPROFILE_DIR, name))
+
+
+class SerializerTimingMixin:
+    """Учитывает в профиле запроса время to_representation сериализатора.
+
+    Ленивые запросы к базе во время сериализации попадают и в db_ms.
+    """
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        if profile_of(self.request) is None:
+            return serializer
+        to_representation = serializer.to_representation
+
+        def timed(instance):
+            with serialization_timer(self.request):
+                return to_representation(instance)
+
+        serializer.to_representation = timed
+        return serializer
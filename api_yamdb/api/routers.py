@@ -0,0 +1,12 @@
+from rest_framework.routers import DefaultRouter
+
+
+class BulkRouter(DefaultRouter):
+    """DefaultRouter, у которого маршрут списка принимает и PATCH: его
+    обрабатывает bulk_update вьюсета (api/bulk.py), если метод есть."""
+
+    routes = [
+        route._replace(mapping=dict(route.mapping, patch='bulk_update'))
+        if route.name == '{basename}-list' else route
+        for route in DefaultRouter.routes
+    ]
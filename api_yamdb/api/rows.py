@@ -0,0 +1,161 @@
+"""Сериализация списков из строк .values() без полей DRF.
+
+ModelSerializer на каждую строку создаёт OrderedDict и для каждого поля
+вызывает get_attribute и to_representation. Для больших страниц это
+основная доля времени ответа, поэтому list читает только нужные колонки
+и собирает словари с теми же ключами и значениями, что и сериализатор:
+JSON ответа совпадает байт в байт (tests/test_rows.py).
+"""
+from collections import defaultdict
+from itertools import islice
+
+from api.pagination import StreamingPagination
+from api.profiling import serialization_timer
+from api.serializers import (CommentSerializer, ReviewSerializer,
+                             TitleReadSerializer)
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from rest_framework.response import Response
+from reviews.models import TitleGenre
+
+
+class RowSerializer:
+    """Быстрый аналог serializer_class для list.
+
+    fields передаются в values(), to_representation получает страницу
+    строк и возвращает данные ответа. title_modified_field — поле строки
+    со временем изменения произведения для ETag вложенных списков.
+    """
+
+    serializer_class = None
+    fields = ()
+    title_modified_field = None
+
+    def values(self, queryset):
+        # Только поля, без выражений: с аннотациями COUNT пагинации
+        # оборачивается в подзапрос.
+        return queryset.prefetch_related(None).values(*self.fields)
+
+    def field(self, name):
+        """Поле serializer_class для значений, которые нельзя отдать как
+        есть: даты форматируются так же, как в сериализаторе."""
+        return self.serializer_class().fields[name]
+
+    def to_representation(self, rows):
+        """По умолчанию строки отдаются как есть: подходит, когда fields
+        совпадают с полями ответа и значения не нужно форматировать."""
+        return [dict(row) for row in rows]
+
+
+class TitleRows(RowSerializer):
+    serializer_class = TitleReadSerializer
+    fields = ('id', 'name', 'year', 'rating', 'description', 'modified',
+              'category_id', 'category__name', 'category__slug')
+
+    def genres(self, title_ids):
+        """Жанры страницы одним запросом, в порядке модели Genre (-id),
+        как их отдаёт prefetch_related('genres')."""
+        genres = defaultdict(list)
+        if not title_ids:
+            return genres
+        rows = TitleGenre.objects.filter(title_id__in=title_ids).order_by(
+            '-genre_id').values_list('title_id', 'genre__name', 'genre__slug')
+        for title_id, name, slug in rows:
+            genres[title_id].append({'name': name, 'slug': slug})
+        return genres
+
+    def to_representation(self, rows):
+        genres = self.genres([row['id'] for row in rows])
+        return [{
+            'id': row['id'],
+            'name': row['name'],
+            'year': row['year'],
+            'rating': row['rating'],
+            'description': row['description'],
+            'genre': genres.get(row['id'], []),
+            'category': None if row['category_id'] is None else {
+                'name': row['category__name'],
+                'slug': row['category__slug'],
+            },
+        } for row in rows]
+
+
+class ReviewRows(RowSerializer):
+    serializer_class = ReviewSerializer
+    fields = ('id', 'text', 'author__username', 'score', 'pub_date',
+              'title__modified')
+    title_modified_field = 'title__modified'
+
+    def to_representation(self, rows):
+        pub_date = self.field('pub_date').to_representation
+        return [{
+            'id': row['id'],
+            'text': row['text'],
+            'author': row['author__username'],
+            'score': row['score'],
+            'pub_date': pub_date(row['pub_date']),
+        } for row in rows]
+
+
+class CommentRows(RowSerializer):
+    serializer_class = CommentSerializer
+    fields = ('id', 'text', 'author__username', 'pub_date',
+              'review__title__modified')
+    title_modified_field = 'review__title__modified'
+
+    def to_representation(self, rows):
+        pub_date = self.field('pub_date').to_representation
+        return [{
+            'id': row['id'],
+            'text': row['text'],
+            'author': row['author__username'],
+            'pub_date': pub_date(row['pub_date']),
+        } for row in rows]
+
+
+class FastListMixin:
+    """list через row_serializer_class вместо serializer_class.
+
+    Остальные действия, а также вьюсеты с fast_list = False идут через
+    обычный сериализатор. С StreamingPagination и рендерером, который
+    умеет stream (api/renderers.py), страница читается из базы чанками по
+    STREAM_CHUNK_SIZE строк и сразу отдаётся клиенту.
+    """
+
+    row_serializer_class = None
+    fast_list = True
+
+    def list(self, request, *args, **kwargs):
+        if not self.fast_list or self.row_serializer_class is None:
+            return super().list(request, *args, **kwargs)
+        row_serializer = self.row_serializer_class()
+        queryset = row_serializer.values(
+            self.filter_queryset(self.get_queryset()))
+        renderer = getattr(request, 'accepted_renderer', None)
+        if (isinstance(self.paginator, StreamingPagination)
+                and hasattr(renderer, 'stream')):
+            return self.stream_list(request, queryset, row_serializer,
+                                    renderer)
+        page = self.paginate_queryset(queryset)
+        rows = list(queryset) if page is None else page
+        with serialization_timer(request):
+            data = row_serializer.to_representation(rows)
+        if page is None:
+            return Response(data)
+        return self.get_paginated_response(data)
+
+    def stream_list(self, request, queryset, row_serializer, renderer):
+        rows = self.paginator.paginate_lazily(queryset, request, view=self)
+        return StreamingHttpResponse(
+            renderer.stream(self.paginator.get_envelope(), 'results',
+                            self.stream_chunks(rows, row_serializer)),
+            content_type=renderer.media_type)
+
+    def stream_chunks(self, rows, row_serializer):
+        chunk_size = settings.STREAM_CHUNK_SIZE
+        iterator = rows.iterator(chunk_size=chunk_size)
+        while True:
+            chunk = list(islice(iterator, chunk_size))
+            if not chunk:
+                return
+            yield row_serializer.to_representation(chunk)
@@ -0,0 +1,149 @@
+import re
+from functools import reduce
+from operator import add, or_
+
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            SearchVector, TrigramSimilarity)
+from django.db import connections
+from django.db.models import Case, FloatField, Q, Value, When
+from django.db.models.functions import Upper
+from rest_framework import filters
+
+SEARCH_CONFIG = 'russian'
+TRIGRAM_THRESHOLD = 0.3
+WORD_RE = re.compile(r'\w+')
+
+
+def has_trigram_extension(alias):
+    """Проверяет, что в базе установлено расширение pg_trgm."""
+    connection = connections[alias]
+    if not hasattr(connection, 'has_pg_trgm'):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+            connection.has_pg_trgm = cursor.fetchone() is not None
+    return connection.has_pg_trgm
+
+
+def document_vector(fields):
+    """tsvector, совпадающий с выражением GIN-индекса из миграции."""
+    return SearchVector(*fields, config=SEARCH_CONFIG)
+
+
+def ranked(queryset, rank):
+    ordering = queryset.query.order_by or queryset.model._meta.ordering
+    return queryset.annotate(search_rank=rank).order_by(
+        '-search_rank', *ordering)
+
+
+def postgres_search(queryset, term, fields, document_fields):
+    """Условия поиска записаны так, чтобы совпадать с индексами миграции.
+
+    Подстрока и сходство триграмм ищутся по UPPER(поле): такое выражение
+    обслуживает один GIN-индекс gin_trgm_ops, pg_trgm сам не различает
+    регистр. Без расширения pg_trgm остаётся поиск по подстроке.
+    """
+    term_upper = term.upper()
+    trigram = has_trigram_extension(queryset.db)
+    conditions, ranks = [], []
+    for field in fields:
+        alias = f'search_{field}'
+        queryset = queryset.annotate(**{alias: Upper(field)})
+        conditions.append(Q(**{f'{alias}__contains': term_upper}))
+        if trigram:
+            conditions.append(Q(**{f'{alias}__trigram_similar': term_upper}))
+            ranks.append(TrigramSimilarity(field, term))
+    if document_fields:
+        query = SearchQuery(term, config=SEARCH_CONFIG)
+        queryset = queryset.annotate(
+            search_document=document_vector(document_fields))
+        conditions.append(Q(search_document=query))
+        weighted = reduce(add, (
+            SearchVector(field, config=SEARCH_CONFIG, weight=weight)
+            for field, weight in zip(document_fields, 'ABCD')
+        ))
+        ranks.append(SearchRank(weighted, query))
+    queryset = queryset.filter(reduce(or_, conditions))
+    if not ranks:
+        return queryset
+    return ranked(queryset, reduce(add, ranks))
+
+
+def trigrams(text):
+    """Триграммы слов в том же виде, что строит pg_trgm."""
+    result = set()
+    for word in WORD_RE.findall(text.lower()):
+        padded = f'  {word} '
+        result.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return result
+
+
+def similarity(term, text):
+    term_trigrams, text_trigrams = trigrams(term), trigrams(text)
+    if not term_trigrams or not text_trigrams:
+        return 0
+    return (len(term_trigrams & text_trigrams)
+            / len(term_trigrams | text_trigrams))
+
+
+def python_search(queryset, term, fields, document_fields):
+    """Поиск для SQLite: подстрока, совпадение слов и сходство триграмм.
+
+    Строки выбираются и ранжируются в Python, поэтому годится только для
+    тестовых баз небольшого размера.
+    """
+    term_lower = term.lower()
+    term_words = set(WORD_RE.findall(term_lower))
+    all_fields = tuple(dict.fromkeys(fields + document_fields))
+    scores = {}
+    for row in queryset.values('pk', *all_fields):
+        score = 0
+        for field in all_fields:
+            text = (row[field] or '').lower()
+            if term_lower in text or (
+                    field in document_fields and term_words
+                    and term_words <= set(WORD_RE.findall(text))):
+                score = max(score, 1)
+            elif field in fields:
+                value = similarity(term_lower, text)
+                if value >= TRIGRAM_THRESHOLD:
+                    score = max(score, value)
+        if score:
+            scores[row['pk']] = score
+    if not scores:
+        return queryset.none()
+    rank = Case(
+        *(When(pk=pk, then=Value(score)) for pk, score in scores.items()),
+        output_field=FloatField()
+    )
+    return ranked(queryset.filter(pk__in=scores), rank)
+
+
+def search(queryset, term, fields, document_fields=()):
+    """Ищет term по полям с учётом опечаток и ранжирует результат.
+
+    fields сравниваются по подстроке и сходству триграмм (pg_trgm),
+    document_fields — полнотекстово (tsvector) с весами по порядку полей.
+    На PostgreSQL поиск использует GIN-индексы, на других базах —
+    python_search.
+    """
+    term = term.strip()
+    if not term:
+        return queryset
+    if connections[queryset.db].vendor == 'postgresql':
+        return postgres_search(queryset, term, tuple(fields),
+                               tuple(document_fields))
+    return python_search(queryset, term, tuple(fields),
+                         tuple(document_fields))
+
+
+class SearchFilter(filters.SearchFilter):
+    """Параметр search через search() вместо ILIKE по каждому слову."""
+
+    def filter_queryset(self, request, queryset, view):
+        fields = getattr(view, 'search_fields', None)
+        terms = self.get_search_terms(request)
+        if not fields or not terms:
+            return queryset
+        return search(queryset, ' '.join(terms), fields,
+                      getattr(view, 'search_document_fields', ()))
@@ -1,6 +1,57 @@
+from collections.abc import Mapping
+
+from api.slugs import atomic_with_slugs, slug_objects
+from django.utils.encoding import smart_str
 from rest_framework import exceptions, serializers
 from rest_framework.relations import SlugRelatedField
-from reviews.models import Category, Comment, Genre, Review, Title, User
+from rest_framework.utils import html
+from rest_framework.validators import UniqueValidator
+from reviews.models import (Category, Comment, Genre, Review, Title,
+                            TitleGenre, User)
+
+
+class PreloadedSlugRelatedField(SlugRelatedField):
+    """SlugRelatedField, который ищет объекты в context['related_objects'].
+
+    related_objects — словарь {модель: {slug: объект}}, заполненный сразу
+    для всех слагов объекта или пачки (api/slugs.py). Без него поле
+    работает как обычный SlugRelatedField.
+    """
+
+    def to_internal_value(self, data):
+        objects = self.context.get('related_objects', {}).get(
+            self.queryset.model)
+        if objects is None:
+            return super().to_internal_value(data)
+        if not isinstance(data, (str, int)):
+            self.fail('invalid')
+        try:
+            return objects[str(data)]
+        except KeyError:
+            self.fail('does_not_exist', slug_name=self.slug_field,
+                      value=smart_str(data))
+
+
+class BulkUniqueMixin:
+    """Сериализатор объекта пачки без UniqueValidator: уникальность всей
+    пачки проверяется одним запросом на поле (api/bulk.py)."""
+
+    def get_fields(self):
+        fields = super().get_fields()
+        for field in fields.values():
+            field.validators = [
+                validator for validator in field.validators
+                if not isinstance(validator, UniqueValidator)]
+        return fields
+
+    def get_unique_validators(self):
+        """Снятые UniqueValidator: {имя поля: (атрибут модели, валидатор)}."""
+        return {
+            name: (field.source or name, validator)
+            for name, field in super().get_fields().items()
+            for validator in field.validators
+            if isinstance(validator, UniqueValidator)
+        }
 
 
 class CategorySerializer(serializers.ModelSerializer):
@@ -9,12 +60,20 @@ class CategorySerializer(serializers.ModelSerializer):
         fields = ('name', 'slug')
 
 
+class CategoryBulkSerializer(BulkUniqueMixin, CategorySerializer):
+    pass
+
+
 class GenreSerializer(serializers.ModelSerializer):
     class Meta:
         model = Genre
         fields = ('name', 'slug')
 
 
+class GenreBulkSerializer(BulkUniqueMixin, GenreSerializer):
+    pass
+
+
 class TitleReadSerializer(serializers.ModelSerializer):
     rating = serializers.IntegerField(read_only=True)
     genre = GenreSerializer(read_only=True, many=True, source='genres')
@@ -29,10 +88,11 @@ class TitleReadSerializer(serializers.ModelSerializer):
 
 
 class TitleCreateUpdateDestroySerializer(serializers.ModelSerializer):
-    genre = SlugRelatedField(many=True, source='genres', slug_field='slug',
-                             queryset=Genre.objects.all())
-    category = SlugRelatedField(slug_field='slug',
-                                queryset=Category.objects.all())
+    genre = PreloadedSlugRelatedField(
+        many=True, source='genres', slug_field='slug',
+        queryset=Genre.objects.all())
+    category = PreloadedSlugRelatedField(
+        slug_field='slug', queryset=Category.objects.all())
 
     class Meta:
         fields = (
@@ -40,6 +100,53 @@ class TitleCreateUpdateDestroySerializer(serializers.ModelSerializer):
         )
         model = Title
 
+    @staticmethod
+    def related_slugs(items):
+        """Слаги жанров и категорий в данных объектов items.
+
+        Берутся только строки и числа: значение другого типа (список,
+        словарь) отклонит проверка поля с ошибкой 400.
+        """
+        slugs = {Genre: set(), Category: set()}
+        for item in items:
+            if not isinstance(item, Mapping):
+                continue
+            genres = (item.getlist('genre') if html.is_html_input(item)
+                      else item.get('genre'))
+            if not isinstance(genres, list):
+                genres = []
+            for model, values in ((Genre, genres),
+                                  (Category, [item.get('category')])):
+                slugs[model].update(str(slug) for slug in values
+                                    if isinstance(slug, (str, int)))
+        return slugs
+
+    def to_internal_value(self, data):
+        # В пачке related_objects уже заполнил BulkMixin.
+        if 'related_objects' not in self.context:
+            self.context['related_objects'] = slug_objects(
+                self.related_slugs([data]))
+        return super().to_internal_value(data)
+
+    def create(self, validated_data):
+        genres = validated_data.pop('genres', [])
+        with atomic_with_slugs():
+            title = Title.objects.create(**validated_data)
+            TitleGenre.objects.set_genres(
+                {title.id: [genre.id for genre in genres]}, created=True)
+        return title
+
+    def update(self, instance, validated_data):
+        genres = validated_data.pop('genres', None)
+        with atomic_with_slugs():
+            for attr, value in validated_data.items():
+                setattr(instance, attr, value)
+            instance.save()
+            if genres is not None:
+                TitleGenre.objects.set_genres(
+                    {instance.id: [genre.id for genre in genres]})
+        return instance
+
 
 class ReviewSerializer(serializers.ModelSerializer):
     author = SlugRelatedField(slug_field='username', read_only=True,
@@ -49,16 +156,6 @@ class ReviewSerializer(serializers.ModelSerializer):
         fields = ('id', 'text', 'author', 'score', 'pub_date')
         model = Review
 
-    def validate(self, attrs):
-        if self.context.get('request').method != 'POST':
-            return attrs
-        author = self.context.get('request').user
-        title_id = self.context.get('view').kwargs.get('titles_id')
-        if Review.objects.filter(title__id=title_id, author=author).exists():
-            raise serializers.ValidationError(
-                'На каждое произведение можно оставить только одно ревью')
-        return attrs
-
 
 class CommentSerializer(serializers.ModelSerializer):
     author = SlugRelatedField(slug_field='username', read_only=True)
@@ -0,0 +1,46 @@
+from api.authentication import forget_user_on_commit
+from api.cache import invalidate_on_commit
+from api.slugs import forget_slugs_on_commit
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from reviews.models import Category, Genre, Review, Title, TitleGenre, User
+
+
+@receiver((post_save, post_delete), sender=Category)
+def category_changed(sender, instance, **kwargs):
+    invalidate_on_commit('categories', 'titles')
+    forget_slugs_on_commit(Category)
+
+
+@receiver((post_save, post_delete), sender=Genre)
+def genre_changed(sender, instance, **kwargs):
+    invalidate_on_commit('genres', 'titles')
+    forget_slugs_on_commit(Genre)
+
+
+@receiver((post_save, pre_delete), sender=Category)
+@receiver((post_save, pre_delete), sender=Genre)
+def touch_titles(sender, instance, created=False, **kwargs):
+    """Название и слаг жанра или категории входят в ответ произведения,
+    поэтому меняется и его modified (ETag). При удалении произведения
+    ищутся до того, как обнулится category и удалятся связи с жанрами."""
+    if created:
+        return
+    lookup = 'category' if sender is Category else 'genres'
+    Title.objects.filter(**{lookup: instance}).touch()
+
+
+@receiver((post_save, post_delete), sender=Title)
+@receiver((post_save, post_delete), sender=TitleGenre)
+def title_changed(sender, instance, **kwargs):
+    invalidate_on_commit('titles')
+
+
+@receiver((post_save, post_delete), sender=Review)
+def review_changed(sender, instance, **kwargs):
+    invalidate_on_commit(f'reviews:{instance.title_id}', 'titles')
+
+
+@receiver((post_save, post_delete), sender=User)
+def user_changed(sender, instance, **kwargs):
+    forget_user_on_commit(instance.pk)
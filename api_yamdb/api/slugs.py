@@ -0,0 +1,116 @@
+"""Кеш slug → id жанров и категорий в памяти процесса.
+
+Запись произведения указывает жанры и категорию слагами. Вместо запроса
+на каждый слаг id берутся из кеша, промахи всех моделей ищутся одним
+запросом UNION. Сигналы Genre и Category очищают кеш своего процесса
+после коммита, в других процессах запись живёт не дольше
+SLUG_CACHE_TIMEOUT секунд. Если слаг за это время удалили, вставка
+нарушит внешний ключ: TitleCreateUpdateDestroySerializer очищает кеш и
+возвращает ошибку проверки.
+"""
+import time
+from contextlib import contextmanager
+
+from api.integrity import foreign_key_violation
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import IntegerField, Value
+from rest_framework.exceptions import ValidationError
+from rest_framework.settings import api_settings
+from reviews.models import Category, Genre, Title, TitleGenre
+
+STALE_SLUGS = 'Жанр или категория изменились, повторите запрос.'
+
+
+class SlugCache:
+
+    def __init__(self, model):
+        self.model = model
+        self.entries = {}
+
+    def get_many(self, slugs, now):
+        """Найденные id и слаги, которых нет в кеше или они устарели."""
+        found = {}
+        missing = []
+        for slug in slugs:
+            pk, expires = self.entries.get(slug, (None, 0))
+            if expires > now:
+                found[slug] = pk
+            else:
+                missing.append(slug)
+        return found, missing
+
+    def set(self, slug, pk, now):
+        self.entries[slug] = (pk, now + settings.SLUG_CACHE_TIMEOUT)
+
+    def clear(self):
+        self.entries = {}
+
+
+caches = {model: SlugCache(model) for model in (Genre, Category)}
+
+
+def resolve_slugs(slugs_by_model):
+    """{модель: слаги} → {модель: {slug: id}} для существующих слагов."""
+    now = time.monotonic()
+    models = list(slugs_by_model)
+    result = {}
+    queries = []
+    for index, model in enumerate(models):
+        result[model], missing = caches[model].get_many(
+            slugs_by_model[model], now)
+        if missing:
+            queries.append(
+                model.objects.filter(slug__in=missing).order_by()
+                .annotate(model_index=Value(index, IntegerField()))
+                .values_list('slug', 'id', 'model_index'))
+    if not queries:
+        return result
+    rows = queries[0]
+    if len(queries) > 1:
+        rows = rows.union(*queries[1:], all=True)
+    for slug, pk, index in rows:
+        model = models[index]
+        result[model][slug] = pk
+        caches[model].set(slug, pk, now)
+    return result
+
+
+def slug_objects(slugs_by_model):
+    """Как resolve_slugs, но вместо id — объекты моделей с одними id и
+    slug: остальные поля отложены и подгрузятся при обращении."""
+    return {
+        model: {slug: model.from_db(model.objects.db, ('id', 'slug'),
+                                    (pk, slug))
+                for slug, pk in ids.items()}
+        for model, ids in resolve_slugs(slugs_by_model).items()
+    }
+
+
+def forget_slugs():
+    for cache in caches.values():
+        cache.clear()
+
+
+def forget_slugs_on_commit(model):
+    transaction.on_commit(caches[model].clear)
+
+
+@contextmanager
+def atomic_with_slugs():
+    """transaction.atomic для записи со слагами из кеша.
+
+    Нарушение внешнего ключа category или genre (слаг удалён в другом
+    процессе) становится ошибкой проверки, кеш очищается, и повтор запроса
+    прочитает слаги из базы. Прочие IntegrityError пробрасываются.
+    """
+    try:
+        with transaction.atomic():
+            yield
+    except IntegrityError as error:
+        if not (foreign_key_violation(error, Title, 'category')
+                or foreign_key_violation(error, TitleGenre, 'genre')):
+            raise
+        forget_slugs()
+        raise ValidationError(
+            {api_settings.NON_FIELD_ERRORS_KEY: [STALE_SLUGS]})
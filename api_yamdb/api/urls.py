@@ -1,9 +1,10 @@
+from api.routers import BulkRouter
 from api.views import (AuthClass, CategoryViewSet, CommentViewSet,
-                       GenreViewSet, ReviewViewSet, TitleViewSet, UserViewSet)
+                       GenreViewSet, ProfilingViewSet, ReviewViewSet,
+                       TitleViewSet, UserViewSet)
 from django.urls import include, path
-from rest_framework import routers
 
-router_v1 = routers.DefaultRouter()
+router_v1 = BulkRouter()
 
 router_v1.register('auth', AuthClass, basename='auth_users')
 router_v1.register('genres', GenreViewSet)
@@ -20,6 +21,7 @@ router_v1.register(
 )
 router_v1.register('titles', TitleViewSet, basename='titles')
 router_v1.register('users', UserViewSet, basename='users')
+router_v1.register('profiling', ProfilingViewSet, basename='profiling')
 
 
 urlpatterns = [
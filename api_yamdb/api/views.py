@@ -1,7 +1,20 @@
+import os
+
+from api.authentication import access_token_for
+from api.bulk import SlugBulkMixin, TitleBulkMixin
+from api.cache import (CachedListMixin, CachedListRetrieveMixin,
+                       invalidate_on_commit)
+from api.conditional import ConditionalGetMixin
 from api.filtersets import TitleFilter
+from api.integrity import foreign_key_violation, unique_violation
+from api.pagination import SwitchablePaginationMixin
 from api.permissions import (AdminPermissions, AllWithoutGuestOrReadOnly,
                              IsAdminOrReadOnly)
-from api.serializers import (CategorySerializer, CommentSerializer,
+from api.profiling import SerializerTimingMixin, stats
+from api.rows import CommentRows, FastListMixin, ReviewRows, TitleRows
+from api.search import SearchFilter
+from api.serializers import (CategoryBulkSerializer, CategorySerializer,
+                             CommentSerializer, GenreBulkSerializer,
                              GenreSerializer, ReviewSerializer,
                              SignUpSerializer,
                              TitleCreateUpdateDestroySerializer,
@@ -9,34 +22,177 @@ from api.serializers import (CategorySerializer, CommentSerializer,
                              UserSerializer)
 from django.conf import settings
 from django.contrib.auth.tokens import default_token_generator
-from django.core.mail import send_mail
-from django.db import IntegrityError
-from django.db.models import Avg
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.http import Http404
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import filters, mixins, status, viewsets
+from rest_framework import mixins, status, viewsets
 from rest_framework.decorators import action
-from rest_framework.exceptions import MethodNotAllowed, ValidationError
+from rest_framework.exceptions import (AuthenticationFailed,
+                                       MethodNotAllowed, ValidationError)
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
-from rest_framework_simplejwt.tokens import AccessToken
-from reviews.models import Category, Genre, Review, Title, User
+from rest_framework.settings import api_settings
+from reviews.models import (Category, Comment, Genre, OutgoingEmail, Review,
+                            Title, User)
+
+
+def title_ids_of(user):
+    return set(Title.objects.filter(
+        Q(reviews__author=user) | Q(reviews__comments__author=user)
+    ).values_list('id', flat=True))
+
+
+def refresh_titles(title_ids):
+    """Пересчитывает рейтинги и сбрасывает версии произведений."""
+    if not title_ids:
+        return
+    Title.objects.filter(id__in=title_ids).recalculate_ratings()
+    invalidate_on_commit(
+        'titles', *(f'reviews:{title_id}' for title_id in title_ids))
+
+
+class NestedListMixin(ConditionalGetMixin):
+    """Отзывы и комментарии произведения.
+
+    Версия для ETag — время изменения произведения. На непустой странице
+    оно приходит вместе со строками, поэтому произведение запрашивается
+    отдельно, только если страница пуста: заодно проверяется, что оно
+    существует.
+
+    title_kwargs — аргументы URL и поиск произведения по ним, title_field —
+    путь от объекта к его произведению.
+    """
+
+    title_kwargs = {'titles_id': 'id'}
+    title_field = 'title'
+
+    def get_title_modified(self):
+        """Время изменения произведения из URL, None — если его нет."""
+        return Title.objects.filter(**{
+            lookup: self.kwargs.get(kwarg)
+            for kwarg, lookup in self.title_kwargs.items()
+        }).values_list('modified', flat=True).first()
 
+    def title_of(self, obj):
+        for name in self.title_field.split('__'):
+            obj = getattr(obj, name)
+        return obj
 
-class ReviewViewSet(viewsets.ModelViewSet):
+    def get_conditional_state(self):
+        modified = self.get_title_modified()
+        if modified is None:
+            return None
+        return modified.isoformat(), modified
+
+    def title_modified_of(self, obj):
+        # Строка быстрого list (api/rows.py).
+        if isinstance(obj, dict):
+            return obj[self.row_serializer_class.title_modified_field]
+        return self.title_of(obj).modified
+
+    def get_existing_title_modified(self):
+        modified = self.get_title_modified()
+        if modified is None:
+            raise Http404
+        return modified
+
+    def paginate_queryset(self, queryset):
+        page = super().paginate_queryset(queryset)
+        if page:
+            modified = self.title_modified_of(page[0])
+        else:
+            modified = self.get_existing_title_modified()
+        self.set_conditional_state(modified.isoformat(), modified)
+        return page
+
+    def stream_list(self, request, queryset, row_serializer, renderer):
+        # Потоковый list минует paginate_queryset: произведение проверяется
+        # до начала ответа, иначе вместо 404 ушёл бы пустой список.
+        modified = self.get_existing_title_modified()
+        self.set_conditional_state(modified.isoformat(), modified)
+        return super().stream_list(request, queryset, row_serializer,
+                                   renderer)
+
+    def get_object(self):
+        obj = super().get_object()
+        modified = self.title_of(obj).modified
+        self.set_conditional_state(modified.isoformat(), modified)
+        return obj
+
+
+class ReviewViewSet(NestedListMixin, CachedListRetrieveMixin,
+                    SwitchablePaginationMixin, SerializerTimingMixin,
+                    FastListMixin, viewsets.ModelViewSet):
     serializer_class = ReviewSerializer
+    row_serializer_class = ReviewRows
     permission_classes = (AllWithoutGuestOrReadOnly, )
+    cursor_ordering = ('-pub_date',)
+
+    def get_cache_namespaces(self):
+        return (f'reviews:{self.kwargs.get("titles_id")}',)
 
     def get_queryset(self):
         title_id = self.kwargs.get('titles_id')
-        title = get_object_or_404(Title, id=title_id)
-        return title.reviews.all()
+        return Review.objects.filter(
+            title_id=title_id).select_related('author', 'title')
 
     def perform_create(self, serializer):
+        """Отзыв без предварительных проверок.
+
+        UPDATE рейтинга заодно проверяет, что произведение есть, и
+        блокирует его строку до конца транзакции. Повторный отзыв автора
+        отсекает ограничение unique_title_author, в том числе при
+        одновременных запросах. Нарушенный внешний ключ автора значит, что
+        пользователь удалён после выдачи токена, — это 401, а не 500.
+        """
         title_id = self.kwargs.get('titles_id')
-        title = get_object_or_404(Title, id=title_id)
-        serializer.save(author=self.request.user,
-                        title=title)
+        score = serializer.validated_data['score']
+        try:
+            with transaction.atomic():
+                if not Title.objects.filter(id=title_id).change_rating(
+                        score, 1):
+                    raise Http404
+                serializer.save(author=self.request.user, title_id=title_id)
+        except IntegrityError as error:
+            if foreign_key_violation(error, Review, 'author'):
+                raise AuthenticationFailed(
+                    'Пользователь не найден', code='user_not_found')
+            if not unique_violation(error, Review, 'unique_title_author'):
+                raise
+            raise ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [
+                'На каждое произведение можно оставить только одно ревью']})
+
+    def locked_score(self, review):
+        """Оценка отзыва под блокировкой строки до конца транзакции.
+
+        Разница для рейтинга считается от неё, а не от оценки, прочитанной
+        в get_object: иначе одновременные PATCH и DELETE посчитали бы её от
+        одного старого значения. Отзыв, удалённый другим запросом, — 404.
+        """
+        score = Review.objects.select_for_update().filter(
+            pk=review.pk).values_list('score', flat=True).first()
+        if score is None:
+            raise Http404
+        return score
+
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            old_score = self.locked_score(serializer.instance)
+            review = serializer.save()
+            # Обновляет и modified: без этого правка одного текста
+            # оставила бы прежний ETag.
+            Title.objects.filter(id=review.title_id).change_rating(
+                review.score - old_score, 0)
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            score = self.locked_score(instance)
+            _, deleted = Review.objects.filter(pk=instance.pk).delete()
+            if deleted.get(Review._meta.label):
+                Title.objects.filter(id=instance.title_id).change_rating(
+                    -score, -1)
 
     def update(self, request, *args, **kwargs):
         if self.action == 'update':
@@ -44,20 +200,41 @@ class ReviewViewSet(viewsets.ModelViewSet):
         return super().update(request, *args, **kwargs)
 
 
-class CommentViewSet(viewsets.ModelViewSet):
+class CommentViewSet(NestedListMixin, SwitchablePaginationMixin,
+                     SerializerTimingMixin, FastListMixin,
+                     viewsets.ModelViewSet):
     serializer_class = CommentSerializer
+    row_serializer_class = CommentRows
     permission_classes = (AllWithoutGuestOrReadOnly, )
+    cursor_ordering = ('-pub_date',)
+    title_kwargs = {'titles_id': 'id', 'review_id': 'reviews__id'}
+    title_field = 'review__title'
 
     def get_queryset(self):
+        title_id = self.kwargs.get('titles_id')
         review_id = self.kwargs.get('review_id')
-        review = get_object_or_404(Review, id=review_id)
-        return review.comments.all()
+        return Comment.objects.filter(
+            review_id=review_id,
+            review__title_id=title_id
+        ).select_related('author', 'review__title')
 
     def perform_create(self, serializer):
         title_id = self.kwargs.get('titles_id')
         review_id = self.kwargs.get('review_id')
         review = get_object_or_404(Review, id=review_id, title__id=title_id)
-        serializer.save(author=self.request.user, review=review)
+        with transaction.atomic():
+            serializer.save(author=self.request.user, review=review)
+            Title.objects.filter(id=title_id).touch()
+
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            serializer.save()
+            Title.objects.filter(id=self.kwargs.get('titles_id')).touch()
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            instance.delete()
+            Title.objects.filter(id=self.kwargs.get('titles_id')).touch()
 
     def update(self, request, *args, **kwargs):
         if self.action == 'update':
@@ -65,30 +242,44 @@ class CommentViewSet(viewsets.ModelViewSet):
         return super().update(request, *args, **kwargs)
 
 
-class ListCreateDestroyViewSet(mixins.ListModelMixin,
+class ListCreateDestroyViewSet(SerializerTimingMixin,
+                               mixins.ListModelMixin,
                                mixins.CreateModelMixin,
                                mixins.DestroyModelMixin,
                                viewsets.GenericViewSet):
-    filter_backends = (filters.SearchFilter,)
+    filter_backends = (SearchFilter,)
     search_fields = ('name',)
     lookup_field = 'slug'
 
 
-class CategoryViewSet(ListCreateDestroyViewSet):
+class CategoryViewSet(CachedListMixin, SlugBulkMixin,
+                      ListCreateDestroyViewSet):
     serializer_class = CategorySerializer
+    bulk_serializer_class = CategoryBulkSerializer
     queryset = Category.objects.all()
     permission_classes = (IsAdminOrReadOnly,)
+    cache_namespaces = ('categories',)
+    title_lookup = 'category'
 
 
-class GenreViewSet(ListCreateDestroyViewSet):
+class GenreViewSet(CachedListMixin, SlugBulkMixin, ListCreateDestroyViewSet):
     serializer_class = GenreSerializer
+    bulk_serializer_class = GenreBulkSerializer
     queryset = Genre.objects.all()
     permission_classes = (IsAdminOrReadOnly,)
+    cache_namespaces = ('genres',)
+    title_lookup = 'genres'
 
 
-class TitleViewSet(viewsets.ModelViewSet):
-    queryset = Title.objects.annotate(rating=Avg('reviews__score'))
+class TitleViewSet(ConditionalGetMixin, CachedListRetrieveMixin,
+                   SwitchablePaginationMixin, SerializerTimingMixin,
+                   FastListMixin, TitleBulkMixin, viewsets.ModelViewSet):
+    queryset = Title.objects.select_related(
+        'category').prefetch_related('genres')
+    row_serializer_class = TitleRows
     permission_classes = (IsAdminOrReadOnly,)
+    cursor_ordering = ('-id',)
+    cache_namespaces = ('titles',)
     filter_backends = (DjangoFilterBackend,)
     filterset_class = TitleFilter
 
@@ -97,19 +288,60 @@ class TitleViewSet(viewsets.ModelViewSet):
             raise MethodNotAllowed('PUT')
         return super().update(request, *args, **kwargs)
 
+    def page_state(self, rows):
+        """Версия страницы: число записей, их id и время изменения."""
+        page = getattr(self.paginator, 'page', None)
+        # У курсорной пагинации page — список строк без общего счётчика.
+        paginator = getattr(page, 'paginator', None)
+        count = paginator.count if paginator is not None else ''
+        modified = [row['modified'] if isinstance(row, dict)
+                    else row.modified for row in rows]
+        ids = [row['id'] if isinstance(row, dict) else row.id
+               for row in rows]
+        version = f'{count}:' + ','.join(
+            f'{pk}@{value.isoformat()}' for pk, value in zip(ids, modified))
+        return version, max(modified, default=None)
+
+    def get_conditional_state(self):
+        if self.action == 'retrieve':
+            modified = Title.objects.filter(
+                id=self.kwargs.get('pk')).values_list(
+                'modified', flat=True).first()
+            if modified is None:
+                return None
+            return modified.isoformat(), modified
+        queryset = self.filter_queryset(self.get_queryset())
+        rows = self.paginator.paginate_queryset(
+            queryset.values('id', 'modified'), self.request, view=self)
+        if rows is None:
+            return None
+        return self.page_state(rows)
+
+    def paginate_queryset(self, queryset):
+        page = super().paginate_queryset(queryset)
+        if page is not None:
+            self.set_conditional_state(*self.page_state(page))
+        return page
+
+    def get_object(self):
+        title = super().get_object()
+        self.set_conditional_state(title.modified.isoformat(), title.modified)
+        return title
+
     def get_serializer_class(self):
         if self.action in {'list', 'retrieve'}:
             return TitleReadSerializer
         return TitleCreateUpdateDestroySerializer
 
 
-def create_conf_code_and_send_email(user):
+def create_conf_code_and_queue_email(user):
+    """Кладёт письмо в очередь, отправляет его команда send_emails."""
     confirmation_code = default_token_generator.make_token(user)
-    send_mail(
-        'Код подтверждения',
-        f'Ваш код подтверждения: {confirmation_code}',
-        settings.DEFAULT_FROM_EMAIL,
-        (user.email,)
+    OutgoingEmail.objects.create(
+        subject='Код подтверждения',
+        body=f'Ваш код подтверждения: {confirmation_code}',
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        recipient=user.email,
     )
 
 
@@ -128,7 +360,7 @@ class AuthClass(viewsets.ViewSet):
         except IntegrityError:
             raise ValidationError(
                 'Пользователь с такими данными уже существует')
-        create_conf_code_and_send_email(user)
+        create_conf_code_and_queue_email(user)
         return Response(
             serializer.data,
             status=status.HTTP_200_OK)
@@ -143,7 +375,7 @@ class AuthClass(viewsets.ViewSet):
         user = User.objects.get(username=serializer.data['username'])
         if default_token_generator.check_token(
            user, serializer.data['confirmation_code']):
-            token = AccessToken.for_user(user)
+            token = access_token_for(user)
             return Response(
                 {'token': str(token)}, status=status.HTTP_200_OK)
         return Response({
@@ -151,12 +383,12 @@ class AuthClass(viewsets.ViewSet):
             status=status.HTTP_400_BAD_REQUEST)
 
 
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(SerializerTimingMixin, viewsets.ModelViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     lookup_field = 'username'
     permission_classes = (AdminPermissions, )
-    filter_backends = (filters.SearchFilter, )
+    filter_backends = (SearchFilter, )
     search_fields = ('username', )
 
     def update(self, request, *args, **kwargs):
@@ -164,6 +396,23 @@ class UserViewSet(viewsets.ModelViewSet):
             raise MethodNotAllowed('PUT')
         return super().update(request, *args, **kwargs)
 
+    def save_user(self, serializer, **kwargs):
+        old_username = serializer.instance.username
+        with transaction.atomic():
+            user = serializer.save(**kwargs)
+            if user.username != old_username:
+                refresh_titles(title_ids_of(user))
+        return user
+
+    def perform_update(self, serializer):
+        self.save_user(serializer)
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            title_ids = title_ids_of(instance)
+            instance.delete()
+            refresh_titles(title_ids)
+
     @action(
         detail=False, methods=('get',),
         url_path='me', url_name='me',
@@ -179,5 +428,23 @@ class UserViewSet(viewsets.ModelViewSet):
             request.user, data=request.data, partial=True
         )
         serializer.is_valid(raise_exception=True)
-        serializer.save(role=request.user.role)
+        self.save_user(serializer, role=request.user.role)
         return Response(serializer.data, status=status.HTTP_200_OK)
+
+
+class ProfilingViewSet(viewsets.ViewSet):
+    """Статистика ProfilingMiddleware по маршрутам текущего процесса."""
+
+    permission_classes = (AdminPermissions, )
+
+    def list(self, request):
+        return Response({
+            'enabled': settings.PROFILING_ENABLED,
+            'pid': os.getpid(),
+            'routes': stats.summary(),
+        })
+
+    @action(detail=False, methods=('post',), url_path='reset')
+    def reset(self, request):
+        stats.reset()
+        return Response(status=status.HTTP_204_NO_CONTENT)
@@ -3,14 +3,34 @@ ASGI config for YaMDb project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
-For more information on this file, see
-https://docs.djangoproject.com/en/3.0/howto/deployment/asgi/
+Django 2.2 has no ASGI handler and no async views, so the WSGI application
+is served through asgiref's WsgiToAsgi: the event loop reads request
+bodies and writes responses, and views run in a thread pool whose size is
+set by the ASGI_THREADS environment variable.
 """
 
 import os
 
-from django.core.asgi import get_asgi_application
+from asgiref.wsgi import WsgiToAsgi
+from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'api_yamdb.settings')
 
-application = get_asgi_application()
+
+def closing(wsgi_application):
+    """Вызывает close() у ответа, как требует PEP 3333.
+
+    WsgiToAsgi этого не делает, и без close() Django не отправляет
+    request_finished: соединения с базой в потоках пула не закрываются.
+    """
+    def application(environ, start_response):
+        response = wsgi_application(environ, start_response)
+        try:
+            yield from response
+        finally:
+            if hasattr(response, 'close'):
+                response.close()
+    return application
+
+
+application = WsgiToAsgi(closing(get_wsgi_application()))
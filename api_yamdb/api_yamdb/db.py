@@ -0,0 +1,20 @@
+from django.core.signals import request_started
+from django.db import connections
+from django.dispatch import receiver
+
+
+@receiver(request_started)
+def check_connections(**kwargs):
+    """Закрывает сохранённые соединения, которые перестали отвечать.
+
+    Без проверки первый запрос после перезапуска базы или pgbouncer
+    получает ошибку на старом соединении. Проверка — один SELECT 1 на
+    запрос и только для соединений, оставшихся от предыдущих запросов.
+    """
+    for connection in connections.all():
+        if (connection.connection is None
+                or connection.in_atomic_block
+                or not connection.settings_dict.get('CONN_HEALTH_CHECKS')):
+            continue
+        if not connection.is_usable():
+            connection.close()
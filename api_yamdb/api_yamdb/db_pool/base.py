@@ -0,0 +1,104 @@
+"""PostgreSQL с пулом соединений внутри процесса.
+
+Подключается через DB_ENGINE=api_yamdb.db_pool. Закрытие соединения
+Django возвращает его в пул, поэтому бэкенд рассчитан на
+CONN_MAX_AGE=0: соединение занято только на время запроса, и потоки
+воркера (gthread) делят между собой не больше POOL['MAX_SIZE']
+соединений. Пул создаётся в каждом процессе при первом подключении,
+после fork соединения не наследуются.
+"""
+import os
+import threading
+
+from django.db.backends.postgresql import base
+from psycopg2 import pool
+
+
+class BlockingPool(pool.ThreadedConnectionPool):
+    """Пул, который ждёт освободившееся соединение вместо PoolError."""
+
+    def __init__(self, minconn, maxconn, timeout, *args, **kwargs):
+        self.slots = threading.BoundedSemaphore(maxconn)
+        self.timeout = timeout
+        super().__init__(minconn, maxconn, *args, **kwargs)
+        # psycopg2 хранит свободными не больше minconn соединений и
+        # закрывает остальные при возврате. minconn открываются сразу,
+        # а храним все, что вернулись, в пределах maxconn.
+        self.minconn = maxconn
+
+    def getconn(self, key=None):
+        if not self.slots.acquire(timeout=self.timeout):
+            raise pool.PoolError(
+                f'No free connection in the pool after {self.timeout}s')
+        try:
+            return super().getconn(key)
+        except Exception:
+            self.slots.release()
+            raise
+
+    def usage(self):
+        """Число занятых и свободных соединений пула."""
+        with self._lock:
+            return len(self._used), len(self._pool)
+
+    def putconn(self, conn, key=None, close=False):
+        try:
+            super().putconn(conn, key, close)
+        finally:
+            self.slots.release()
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    pools = {}
+    pools_lock = threading.Lock()
+    connection_pool = None
+
+    def get_pool(self, conn_params):
+        # Служебные обёртки Django (например, к базе postgres при создании
+        # тестовой базы) подключаются с другими параметрами — у них свой пул.
+        key = (os.getpid(), repr(sorted(conn_params.items())))
+        with self.pools_lock:
+            if key not in self.pools:
+                options = self.settings_dict.get('POOL', {})
+                self.pools[key] = BlockingPool(
+                    options.get('MIN_SIZE', 1),
+                    options.get('MAX_SIZE', 10),
+                    options.get('TIMEOUT', 30),
+                    **conn_params
+                )
+            return self.pools[key]
+
+    def get_new_connection(self, conn_params):
+        self.connection_pool = self.get_pool(conn_params)
+        connection = self.connection_pool.getconn()
+        options = self.settings_dict['OPTIONS']
+        try:
+            self.isolation_level = options['isolation_level']
+        except KeyError:
+            self.isolation_level = connection.isolation_level
+        else:
+            if self.isolation_level != connection.isolation_level:
+                connection.set_session(isolation_level=self.isolation_level)
+        return connection
+
+    def _close(self):
+        if (self.connection is None or self.connection_pool is None
+                or self.connection_pool.closed):
+            return super()._close()
+        # После ошибки базы соединение может быть сломано, в пул его
+        # не возвращаем.
+        with self.wrap_database_errors:
+            self.connection_pool.putconn(
+                self.connection, close=self.errors_occurred)
+
+    def close_pool(self):
+        """Закрывает все соединения пула, например перед DROP DATABASE."""
+        self.close()
+        connection_pool, self.connection_pool = self.connection_pool, None
+        if connection_pool is None or connection_pool.closed:
+            return
+        with self.pools_lock:
+            for key, value in list(self.pools.items()):
+                if value is connection_pool:
+                    del self.pools[key]
+        connection_pool.closeall()
@@ -22,6 +22,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'django_filters',
     'reviews.apps.ReviewsConfig',
@@ -29,6 +30,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.metrics.MetricsMiddleware',
+    'api.profiling.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -61,19 +64,79 @@ WSGI_APPLICATION = 'api_yamdb.wsgi.application'
 
 
 # Database
+# CONN_MAX_AGE держит соединение между запросами, CONN_HEALTH_CHECKS
+# проверяет его в начале запроса (api_yamdb.db). Пул соединений внутри
+# процесса для потоковых воркеров — DB_ENGINE=api_yamdb.db_pool
+# с DB_CONN_MAX_AGE=0. За pgbouncer в режиме transaction нужно
+# DB_DISABLE_SERVER_SIDE_CURSORS=True.
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': os.getenv('DB_ENGINE', default='django.db.backends.postgresql'),
         'NAME': os.getenv('DB_NAME', default=None),
         'USER': os.getenv('POSTGRES_USER', default=None),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', default=None),
         'HOST': os.getenv('DB_HOST', default=None),
-        'PORT': os.getenv('DB_PORT', default=None)
+        'PORT': os.getenv('DB_PORT', default=None),
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', default=60)),
+        'CONN_HEALTH_CHECKS': os.getenv(
+            'DB_CONN_HEALTH_CHECKS', default='True') == 'True',
+        'DISABLE_SERVER_SIDE_CURSORS': os.getenv(
+            'DB_DISABLE_SERVER_SIDE_CURSORS', default='False') == 'True',
+        'POOL': {
+            'MIN_SIZE': int(os.getenv('DB_POOL_MIN_SIZE', default=1)),
+            'MAX_SIZE': int(os.getenv('DB_POOL_MAX_SIZE', default=10)),
+            'TIMEOUT': float(os.getenv('DB_POOL_TIMEOUT', default=30)),
+        },
     }
 }
 
 
+# Cache
+# Бэкенд задаётся переменными окружения, например
+# CACHE_BACKEND=django.core.cache.backends.filebased.FileBasedCache или
+# django_redis.cache.RedisCache (пакет django-redis) с CACHE_LOCATION.
+# Локальный кеш (по умолчанию) не разделяется между воркерами gunicorn:
+# сброс после записи виден только процессу, который писал. docker-compose
+# задаёт FileBasedCache на общем томе.
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', default='yamdb'),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.getenv('CACHE_MAX_ENTRIES', default=300)),
+        },
+    }
+}
+
+API_CACHE_TIMEOUT = int(os.getenv('API_CACHE_TIMEOUT', default=60))
+# Срок, на который пользователь из JWT кешируется вместо запроса к базе.
+# Действует только с общим бэкендом кеша (не LocMemCache), см.
+# api.authentication.user_cache_enabled.
+AUTH_USER_CACHE_TIMEOUT = int(
+    os.getenv('AUTH_USER_CACHE_TIMEOUT', default=60))
+# Сколько секунд процесс помнит id жанров и категорий по слагам
+# (api/slugs.py).
+SLUG_CACHE_TIMEOUT = int(os.getenv('SLUG_CACHE_TIMEOUT', default=60))
+
+# Профилирование запросов (api/profiling.py). Статистика хранится в памяти
+# каждого процесса, PROFILING_WINDOW — число последних запросов маршрута.
+PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', default='False') == 'True'
+PROFILING_WINDOW = int(os.getenv('PROFILING_WINDOW', default=1000))
+PROFILING_CPROFILE_RATE = float(
+    os.getenv('PROFILING_CPROFILE_RATE', default=0))
+PROFILING_SLOW_MS = float(os.getenv('PROFILING_SLOW_MS', default=500))
+PROFILING_CPROFILE_DIR = os.getenv(
+    'PROFILING_CPROFILE_DIR', default=os.path.join(BASE_DIR, 'profiles'))
+
+# Метрики Prometheus на /metrics (api/metrics.py). Для суммирования по
+# воркерам gunicorn задайте каталог PROMETHEUS_MULTIPROC_DIR.
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', default='True') == 'True'
+
+
 # Password validation
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -123,7 +186,12 @@ REST_FRAMEWORK = {
     ],
 
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.CachedJWTAuthentication',
+    ],
+
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
     ],
 
     'DEFAULT_PAGINATION_CLASS': (
@@ -131,6 +199,15 @@ REST_FRAMEWORK = {
     'PAGE_SIZE': PAGINATOR_PAGE_ITEMS_COUNT,
 }
 
+# orjson — быстрый кодировщик FastJSONRenderer, json — стандартный модуль.
+JSON_ENCODER = os.getenv('JSON_ENCODER', default='orjson')
+# Потоковая выдача списков (?stream=true): наибольший размер страницы и
+# число строк, которые читаются из базы и кодируются за раз.
+STREAM_MAX_PAGE_SIZE = int(os.getenv('STREAM_MAX_PAGE_SIZE', default=1000))
+STREAM_CHUNK_SIZE = int(os.getenv('STREAM_CHUNK_SIZE', default=100))
+# Наибольшее число объектов в пакетном POST/PATCH (api/bulk.py).
+BULK_MAX_ITEMS = int(os.getenv('BULK_MAX_ITEMS', default=1000))
+
 SIMPLE_JWT = {
     # Устанавливаем срок жизни токена
     'ACCESS_TOKEN_LIFETIME': timedelta(days=5),
@@ -139,5 +216,6 @@ SIMPLE_JWT = {
 DOMAIN_NAME = 'yamdb.ru'
 DEFAULT_FROM_EMAIL = f'from@{DOMAIN_NAME}'
 
-EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+EMAIL_BACKEND = os.getenv(
+    'EMAIL_BACKEND', default='django.core.mail.backends.filebased.EmailBackend')
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
@@ -0,0 +1,87 @@
+"""Настройки gunicorn, все значения можно переопределить окружением.
+
+Профили (подробнее в README):
+- CPU-bound (сериализация больших списков): GUNICORN_WORKER_CLASS=sync,
+  воркеров по числу ядер * 2 + 1;
+- I/O-bound (ожидание базы, почты, медленные клиенты):
+  GUNICORN_WORKER_CLASS=gthread с GUNICORN_THREADS=4..8 или gevent
+  (нужны пакеты gevent и psycogreen).
+"""
+import os
+
+
+def env_int(name, default):
+    return int(os.getenv(name, default))
+
+
+def env_bool(name, default):
+    return os.getenv(name, str(default)) == 'True'
+
+
+def cpu_count():
+    # В контейнере sched_getaffinity учитывает ограничение по ядрам.
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+# По умолчанию sync: на нагрузочном тесте списка произведений (одно ядро)
+# sync дал 58 запросов/с против 47 у gthread 3x4. Потоки выгодны только
+# при ожидании ввода-вывода, для такой нагрузки включите gthread явно.
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'sync')
+workers = env_int('GUNICORN_WORKERS', cpu_count() * 2 + 1)
+threads = env_int('GUNICORN_THREADS', 4 if worker_class == 'gthread' else 1)
+worker_connections = env_int('GUNICORN_WORKER_CONNECTIONS', 1000)
+keepalive = env_int('GUNICORN_KEEPALIVE', 5)
+timeout = env_int('GUNICORN_TIMEOUT', 30)
+graceful_timeout = env_int('GUNICORN_GRACEFUL_TIMEOUT', 30)
+# Перезапуск воркера после max_requests запросов ограничивает рост
+# памяти, jitter не даёт всем воркерам перезапуститься одновременно.
+max_requests = env_int('GUNICORN_MAX_REQUESTS', 1000)
+max_requests_jitter = env_int('GUNICORN_MAX_REQUESTS_JITTER', 100)
+preload_app = env_bool('GUNICORN_PRELOAD', False)
+# Heartbeat воркеров в памяти, а не на overlay-диске контейнера.
+worker_tmp_dir = os.getenv(
+    'GUNICORN_WORKER_TMP_DIR',
+    '/dev/shm' if os.path.isdir('/dev/shm') else None)
+accesslog = os.getenv('GUNICORN_ACCESS_LOG', '-')
+errorlog = os.getenv('GUNICORN_ERROR_LOG', '-')
+loglevel = os.getenv('GUNICORN_LOG_LEVEL', 'info')
+
+
+def on_starting(server):
+    # Файлы метрик прошлого запуска не должны попасть в новые значения.
+    directory = os.getenv('PROMETHEUS_MULTIPROC_DIR')
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+        for name in os.listdir(directory):
+            if name.endswith('.db'):
+                os.remove(os.path.join(directory, name))
+
+
+def pre_fork(server, worker):
+    if preload_app:
+        # Соединения, открытые мастером при загрузке приложения, закрываем
+        # до fork: иначе воркеры унаследуют и будут делить один сокет.
+        from django.db import connections
+        connections.close_all()
+
+
+def post_fork(server, worker):
+    if worker_class == 'gevent':
+        try:
+            from psycogreen.gevent import patch_psycopg
+        except ImportError:
+            server.log.warning(
+                'psycogreen is not installed, psycopg2 will block the '
+                'gevent loop')
+        else:
+            patch_psycopg()
+
+
+def child_exit(server, worker):
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        # Живые gauge завершившегося воркера больше не учитываются.
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,366 @@
+import csv
+import os
+import time
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from itertools import islice
+
+from django.conf import settings
+from django.core.management.color import no_style
+from django.db import (DEFAULT_DB_ALIAS, DataError, connection, connections,
+                       transaction)
+from django.utils import timezone
+from reviews import models
+
+DATA_DIR = os.path.join(settings.BASE_DIR, 'static', 'data')
+DEFAULT_BATCH_SIZE = 1000
+
+# columns: поле модели -> колонка CSV,
+# foreign_keys: поле модели -> модель, на которую оно ссылается.
+Table = namedtuple('Table', ('name', 'model', 'file', 'columns',
+                             'foreign_keys'))
+TableStats = namedtuple('TableStats', ('name', 'added', 'skipped',
+                                       'seconds'))
+
+TABLES = (
+    Table('Category', models.Category, 'category.csv',
+          {'id': 'id', 'name': 'name', 'slug': 'slug'}, {}),
+    Table('Genre', models.Genre, 'genre.csv',
+          {'id': 'id', 'name': 'name', 'slug': 'slug'}, {}),
+    Table('Title', models.Title, 'titles.csv',
+          {'id': 'id', 'name': 'name', 'year': 'year',
+           'category_id': 'category'},
+          {'category_id': models.Category}),
+    Table('TitleGenre', models.TitleGenre, 'genre_title.csv',
+          {'id': 'id', 'title_id': 'title_id', 'genre_id': 'genre_id'},
+          {'title_id': models.Title, 'genre_id': models.Genre}),
+    Table('User', models.User, 'users.csv',
+          {'id': 'id', 'username': 'username', 'email': 'email',
+           'role': 'role'}, {}),
+    Table('Review', models.Review, 'review.csv',
+          {'id': 'id', 'title_id': 'title_id', 'text': 'text',
+           'author_id': 'author', 'score': 'score', 'pub_date': 'pub_date'},
+          {'title_id': models.Title, 'author_id': models.User}),
+    Table('Comment', models.Comment, 'comments.csv',
+          {'id': 'id', 'review_id': 'review_id', 'text': 'text',
+           'author_id': 'author', 'pub_date': 'pub_date'},
+          {'review_id': models.Review, 'author_id': models.User}),
+)
+
+
+def read_rows(path):
+    """Построчно читает CSV, не загружая файл в память."""
+    with open(path, newline='', encoding='utf-8') as csvfile:
+        yield from csv.DictReader(csvfile, delimiter=',')
+
+
+def batches(iterable, size):
+    iterator = iter(iterable)
+    batch = list(islice(iterator, size))
+    while batch:
+        yield batch
+        batch = list(islice(iterator, size))
+
+
+def dependency_levels(tables):
+    """Разбивает таблицы на волны, внутри которых нет зависимостей."""
+    loaded, levels, pending = set(), [], list(tables)
+    while pending:
+        level = [
+            table for table in pending
+            if all(model in loaded or model is table.model
+                   for model in table.foreign_keys.values())
+        ]
+        if not level:
+            raise ValueError('Cyclic dependencies between tables')
+        levels.append(level)
+        loaded.update(table.model for table in level)
+        pending = [table for table in pending if table not in level]
+    return levels
+
+
+@contextmanager
+def dates_from_csv(table):
+    """Отключает auto_now и auto_now_add у полей, которые есть в CSV.
+
+    Иначе bulk_create и save() заменили бы pub_date из файла текущим
+    временем, а COPY сохраняет его как есть.
+    """
+    fields = [
+        field for field in table.model._meta.concrete_fields
+        if field.attname in table.columns
+        and (getattr(field, 'auto_now', False)
+             or getattr(field, 'auto_now_add', False))
+    ]
+    flags = [(field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, (auto_now, auto_now_add) in zip(fields, flags):
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def reset_sequences(model_list):
+    sql_list = connection.ops.sequence_reset_sql(no_style(), model_list)
+    with connection.cursor() as cursor:
+        for sql in sql_list:
+            cursor.execute(sql)
+
+
+INTEGER_TYPES = {
+    'AutoField', 'BigAutoField', 'BigIntegerField', 'IntegerField',
+    'SmallIntegerField', 'ForeignKey',
+}
+POSITIVE_INTEGER_TYPES = {
+    'PositiveIntegerField', 'PositiveSmallIntegerField',
+}
+TEXT_TYPES = {'CharField', 'EmailField', 'SlugField', 'TextField'}
+
+
+class BulkImporter:
+    """Загружает CSV пачками через bulk_create.
+
+    Внешние ключи проверяются по множествам id, которые читаются из базы
+    один раз на таблицу. Пачка, которую база отвергла целиком, повторяется
+    построчно, чтобы пропустить только ошибочные строки.
+
+    При workers > 1 независимые таблицы загружаются одновременно, а пачки
+    одной таблицы вставляются параллельно. Каждый поток пула открывает одно
+    соединение на всю загрузку, соединения закрываются в конце run().
+    SQLite не допускает параллельной записи, для неё workers всегда 1.
+    """
+
+    def __init__(self, data_dir=DATA_DIR, batch_size=DEFAULT_BATCH_SIZE,
+                 warn=None, workers=1):
+        self.data_dir = data_dir
+        self.batch_size = batch_size
+        self.warn = warn or (lambda message: None)
+        self.workers = 1 if connection.vendor == 'sqlite' else workers
+        self.pool = None
+        self._ids = {}
+        self._connections = []
+
+    def known_ids(self, model):
+        if model not in self._ids:
+            self._ids[model] = set(
+                model.objects.values_list('id', flat=True))
+        return self._ids[model]
+
+    def build(self, table, row):
+        values = {field: row.get(column)
+                  for field, column in table.columns.items()}
+        for field, model in table.foreign_keys.items():
+            try:
+                related_id = int(values[field])
+            except (TypeError, ValueError):
+                related_id = None
+            if related_id not in self.known_ids(model):
+                raise ValueError(
+                    f'{field}={values[field]!r} does not exist')
+            values[field] = related_id
+        return table.model(**values)
+
+    def insert(self, model, objects):
+        try:
+            with transaction.atomic():
+                model.objects.bulk_create(objects)
+            return len(objects)
+        except Exception:
+            return self.insert_one_by_one(objects)
+
+    def insert_one_by_one(self, objects):
+        added = 0
+        for obj in objects:
+            try:
+                # save() превратил бы повтор id в UPDATE существующей строки.
+                with transaction.atomic():
+                    obj.save(force_insert=True)
+                added += 1
+            except Exception as e:
+                self.warn(f'Creation skipped. Unable to create an object '
+                          f'with id={obj.pk} {e}')
+        return added
+
+    def build_batch(self, table, rows):
+        objects = []
+        for row in rows:
+            try:
+                objects.append(self.build(table, row))
+            except Exception as e:
+                self.warn(f'Creation skipped. Unable to create an object {e}')
+        return objects
+
+    def insert_batches(self, table):
+        """Отдаёт пары (строк в пачке, из них вставлено)."""
+        rows = read_rows(os.path.join(self.data_dir, table.file))
+        pending = deque()
+        for batch in batches(rows, self.batch_size):
+            objects = self.build_batch(table, batch)
+            if self.pool is None:
+                yield len(batch), self.insert(table.model, objects)
+                continue
+            pending.append((len(batch), self.pool.submit(
+                self.insert, table.model, objects)))
+            if len(pending) > self.workers * 2:
+                size, future = pending.popleft()
+                yield size, future.result()
+        for size, future in pending:
+            yield size, future.result()
+
+    def load(self, table):
+        started = time.monotonic()
+        added = skipped = 0
+        with dates_from_csv(table):
+            for size, inserted in self.insert_batches(table):
+                added += inserted
+                skipped += size - inserted
+        self._ids.pop(table.model, None)
+        return TableStats(table.name, added, skipped,
+                          time.monotonic() - started)
+
+    def share_connection(self):
+        """initializer пулов: запоминает соединение потока, чтобы закрыть
+        его из основного потока, когда потоки пула завершатся."""
+        wrapper = connections[DEFAULT_DB_ALIAS]
+        wrapper.inc_thread_sharing()
+        self._connections.append(wrapper)
+
+    def close_connections(self):
+        while self._connections:
+            wrapper = self._connections.pop()
+            wrapper.close()
+            wrapper.dec_thread_sharing()
+
+    def run(self, tables=TABLES):
+        """Загружает таблицы и отдаёт статистику по мере готовности."""
+        if self.workers == 1:
+            for table in tables:
+                yield self.load(table)
+            return
+        try:
+            with ThreadPoolExecutor(
+                    self.workers,
+                    initializer=self.share_connection) as self.pool:
+                for level in dependency_levels(tables):
+                    for table in level:
+                        for model in table.foreign_keys.values():
+                            self.known_ids(model)
+                    with ThreadPoolExecutor(
+                            len(level),
+                            initializer=self.share_connection) as table_pool:
+                        futures = [table_pool.submit(self.load, table)
+                                   for table in level]
+                        for future in as_completed(futures):
+                            yield future.result()
+        finally:
+            self.pool = None
+            self.close_connections()
+
+    def finish(self):
+        """Финальный проход: последовательности id и рейтинги."""
+        reset_sequences([table.model for table in TABLES])
+        models.Title.objects.recalculate_ratings()
+
+
+class CopyImporter(BulkImporter):
+    """Загружает CSV через COPY FROM STDIN во временную таблицу.
+
+    Приведение типов, проверка внешних ключей и уникальности выполняются
+    одним INSERT ... SELECT ... ON CONFLICT DO NOTHING, строки, которые уже
+    есть в базе или нарушают ограничения, пропускаются. На базах, отличных
+    от PostgreSQL, используется BulkImporter.
+
+    Значение, которое PostgreSQL не может привести к типу поля (например,
+    испорченная дата), прерывает весь INSERT ... SELECT. Тогда таблица
+    загружается через BulkImporter, и ошибочные строки пропускаются по
+    одной с предупреждением.
+    """
+
+    @property
+    def supported(self):
+        return connection.vendor == 'postgresql'
+
+    def load(self, table):
+        if not self.supported:
+            return super().load(table)
+        try:
+            return self.copy(table)
+        except DataError as e:
+            self.warn(f'{table.name}: COPY merge failed, loading row by '
+                      f'row. {e}')
+            return super().load(table)
+
+    def copy(self, table):
+        started = time.monotonic()
+        path = os.path.join(self.data_dir, table.file)
+        with open(path, newline='', encoding='utf-8') as csvfile:
+            header = next(csv.reader(csvfile))
+        qn = connection.ops.quote_name
+        staging = qn(f'import_{table.model._meta.db_table}')
+        columns = ', '.join(qn(column) for column in header)
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                f'CREATE TEMPORARY TABLE {staging} '
+                f'({", ".join(f"{qn(column)} text" for column in header)}) '
+                'ON COMMIT DROP'
+            )
+            with open(path, encoding='utf-8') as csvfile:
+                cursor.copy_expert(
+                    f'COPY {staging} ({columns}) '
+                    'FROM STDIN WITH (FORMAT csv, HEADER true)',
+                    csvfile
+                )
+            cursor.execute(f'SELECT count(*) FROM {staging}')
+            staged = cursor.fetchone()[0]
+            sql, params = self.merge_sql(table, staging)
+            cursor.execute(sql, params)
+            added = cursor.rowcount
+        return TableStats(table.name, added, staged - added,
+                          time.monotonic() - started)
+
+    def merge_sql(self, table, staging):
+        qn = connection.ops.quote_name
+        opts = table.model._meta
+        targets, values, conditions, params = [], [], [], []
+        for field in opts.concrete_fields:
+            targets.append(qn(field.column))
+            column = table.columns.get(field.attname)
+            if column is None:
+                auto_now = (getattr(field, 'auto_now', False)
+                            or getattr(field, 'auto_now_add', False))
+                default = timezone.now() if auto_now else field.get_default()
+                values.append('%s')
+                params.append(field.get_db_prep_save(default, connection))
+                continue
+            value = self.cast(field, f's.{qn(column)}')
+            values.append(value)
+            if not field.null:
+                conditions.append(f'{value} IS NOT NULL')
+            if field.attname in table.foreign_keys:
+                related = table.foreign_keys[field.attname]._meta
+                conditions.append(
+                    f'EXISTS (SELECT 1 FROM {qn(related.db_table)} r '
+                    f'WHERE r.{qn(related.pk.column)} = {value})'
+                )
+        where = ' AND '.join(conditions) or 'TRUE'
+        sql = (
+            f'INSERT INTO {qn(opts.db_table)} ({", ".join(targets)}) '
+            f'SELECT {", ".join(values)} FROM {staging} s WHERE {where} '
+            'ON CONFLICT DO NOTHING'
+        )
+        return sql, params
+
+    def cast(self, field, column):
+        internal_type = field.get_internal_type()
+        db_type = field.rel_db_type(connection)
+        if internal_type in TEXT_TYPES:
+            return column if field.null else f"COALESCE({column}, '')"
+        if internal_type in INTEGER_TYPES | POSITIVE_INTEGER_TYPES:
+            pattern = ('^[0-9]+$' if internal_type in POSITIVE_INTEGER_TYPES
+                       else '^-?[0-9]+$')
+            return (f"(CASE WHEN {column} ~ '{pattern}' "
+                    f'THEN {column}::{db_type} END)')
+        return f"NULLIF({column}, '')::{db_type}"
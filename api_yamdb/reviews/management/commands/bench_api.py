@@ -0,0 +1,138 @@
+import json
+import platform
+import subprocess
+import time
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import (override_settings, setup_databases,
+                               teardown_databases)
+from tools.benchmark import DEFAULT_SIZES, Benchmark, Dataset, compare
+
+
+def current_commit():
+    try:
+        return subprocess.run(
+            ('git', 'rev-parse', '--short', 'HEAD'),
+            capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = ('Seeds a test database and measures latency and throughput of '
+            'every API route registered on router_v1, one request at a time')
+
+    def add_arguments(self, parser):
+        for name, default in DEFAULT_SIZES.items():
+            parser.add_argument(
+                f'--{name.replace("_", "-")}', type=int, default=default,
+                help=f'Seeded {name.replace("_", " ")} (default {default})')
+        parser.add_argument(
+            '--iterations', type=int, default=200,
+            help='Measured requests per scenario')
+        parser.add_argument(
+            '--warmup', type=int, default=10,
+            help='Unmeasured requests before every scenario')
+        parser.add_argument(
+            '--scenario', nargs='+',
+            help='Run only these scenarios')
+        parser.add_argument(
+            '--no-cache', action='store_true',
+            help='Disable the anonymous response cache (API_CACHE_TIMEOUT=0)')
+        parser.add_argument(
+            '--keepdb', action='store_true',
+            help='Keep the test database between runs')
+        parser.add_argument(
+            '--output',
+            help='Write results to this JSON file')
+        parser.add_argument(
+            '--compare',
+            help='JSON file of a previous run to compare p95 latency with')
+        parser.add_argument(
+            '--max-regression', type=float,
+            help='Fail if p95 latency of a scenario grew by more percent')
+
+    def handle(self, *args, **options):
+        sizes = {name: options[name] for name in DEFAULT_SIZES}
+        if min(sizes.values()) < 1:
+            raise CommandError('Dataset sizes must be positive')
+        # Отдельная тестовая база: засев и сценарии записи не трогают
+        # рабочие данные.
+        old_config = setup_databases(
+            verbosity=self.verbosity(options), interactive=False,
+            keepdb=options['keepdb'])
+        try:
+            with override_settings(**(
+                    {'API_CACHE_TIMEOUT': 0} if options['no_cache'] else {})):
+                report = self.run(sizes, options)
+        finally:
+            teardown_databases(old_config, verbosity=self.verbosity(options),
+                               keepdb=options['keepdb'])
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                json.dump(report, file, ensure_ascii=False, indent=2)
+        if options['compare']:
+            self.compare(report, options)
+
+    @staticmethod
+    def verbosity(options):
+        return max(options['verbosity'] - 1, 0)
+
+    def run(self, sizes, options):
+        started = time.perf_counter()
+        data = Dataset(sizes).seed()
+        self.stdout.write(
+            f'Seeded {connection.vendor} in '
+            f'{time.perf_counter() - started:.1f}s: {sizes}')
+        benchmark = Benchmark(data, options['iterations'], options['warmup'])
+        results = benchmark.run(options['scenario'])
+        for name, result in results.items():
+            self.report(name, result)
+        return {
+            'meta': {
+                'commit': current_commit(),
+                'vendor': connection.vendor,
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'sizes': sizes,
+                'iterations': options['iterations'],
+                'warmup': options['warmup'],
+                'cache': not options['no_cache'],
+                'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            },
+            'scenarios': results,
+        }
+
+    def report(self, name, result):
+        if not result['requests']:
+            self.stdout.write(self.style.WARNING(f'{name}: skipped'))
+            return
+        style = self.style.ERROR if result['errors'] else self.style.SUCCESS
+        self.stdout.write(style(
+            f'{name:<24} {result["rps"]:>8.1f} req/s  '
+            f'p50 {result["p50_ms"]:>7.2f} ms  '
+            f'p95 {result["p95_ms"]:>7.2f} ms  '
+            f'{result["queries"]:>5.1f} queries  '
+            f'{result["errors"]} errors'))
+
+    def compare(self, report, options):
+        with open(options['compare']) as file:
+            baseline = json.load(file)
+        if baseline['meta'].get('vendor') != report['meta']['vendor']:
+            self.stdout.write(self.style.WARNING(
+                'Baseline was measured on another database'))
+        changes = compare(baseline['scenarios'], report['scenarios'])
+        regressions = []
+        for name, (old, new, change) in changes.items():
+            self.stdout.write(
+                f'{name:<24} p95 {old:>7.2f} -> {new:>7.2f} ms '
+                f'({change:+.1f}%)')
+            if (options['max_regression'] is not None
+                    and change > options['max_regression']):
+                regressions.append(name)
+        if regressions:
+            raise CommandError(
+                f'p95 latency regressed by more than '
+                f'{options["max_regression"]}%: {", ".join(regressions)}')
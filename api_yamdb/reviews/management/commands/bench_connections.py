@@ -0,0 +1,74 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.core.signals import request_finished, request_started
+from django.db import connection
+from django.db.backends.signals import connection_created
+
+
+class Command(BaseCommand):
+    help = ('Measures per-request database connection overhead with '
+            'different CONN_MAX_AGE values')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests', type=int, default=200,
+            help='Requests simulated for every CONN_MAX_AGE value')
+        parser.add_argument(
+            '--max-age', type=int, nargs='+', default=(0, 600),
+            help='CONN_MAX_AGE values to compare')
+        parser.add_argument(
+            '--no-health-checks', action='store_true',
+            help='Disable the per-request connection health check')
+
+    def simulate_request(self):
+        """Цикл запроса WSGI: сигналы начала и конца и один запрос к базе."""
+        request_started.send(sender=self.__class__)
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+        finally:
+            request_finished.send(sender=self.__class__)
+
+    def run(self, max_age, requests):
+        connection.close()
+        connection.settings_dict['CONN_MAX_AGE'] = max_age
+        created = []
+
+        def count(sender, connection, **kwargs):
+            created.append(connection.alias)
+
+        connection_created.connect(count)
+        timings = []
+        try:
+            for _ in range(requests):
+                started = time.perf_counter()
+                self.simulate_request()
+                timings.append(time.perf_counter() - started)
+        finally:
+            connection_created.disconnect(count)
+            connection.close()
+        return sorted(timings), len(created)
+
+    def handle(self, *args, **options):
+        settings_dict = connection.settings_dict
+        saved = (settings_dict['CONN_MAX_AGE'],
+                 settings_dict.get('CONN_HEALTH_CHECKS'))
+        if options['no_health_checks']:
+            settings_dict['CONN_HEALTH_CHECKS'] = False
+        self.stdout.write(
+            f'{settings_dict["ENGINE"]}, health checks '
+            f'{"on" if settings_dict.get("CONN_HEALTH_CHECKS") else "off"}')
+        try:
+            for max_age in options['max_age']:
+                timings, created = self.run(max_age, options['requests'])
+                mean = sum(timings) / len(timings) * 1000
+                p95 = timings[int(len(timings) * 0.95) - 1] * 1000
+                self.stdout.write(self.style.SUCCESS(
+                    f'CONN_MAX_AGE={max_age}: {len(timings)} requests, '
+                    f'mean {mean:.2f} ms, p95 {p95:.2f} ms, '
+                    f'{created} connects'))
+        finally:
+            settings_dict['CONN_MAX_AGE'], health_checks = saved
+            if health_checks is not None:
+                settings_dict['CONN_HEALTH_CHECKS'] = health_checks
@@ -0,0 +1,73 @@
+import statistics
+import time
+
+from api.rows import CommentRows, ReviewRows, TitleRows
+from api.views import TitleViewSet
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import setup_databases, teardown_databases
+from rest_framework.renderers import JSONRenderer
+from reviews.models import Comment, Review
+from tools.benchmark import DEFAULT_SIZES, Dataset
+
+
+class Command(BaseCommand):
+    help = ('Compares list serialization through DRF serializers and the '
+            'values() fast path (api/rows.py)')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows', type=int, default=500,
+            help='Objects serialized per call')
+        parser.add_argument(
+            '--repeat', type=int, default=20,
+            help='Measured calls per serializer')
+
+    def querysets(self):
+        return (
+            ('titles', TitleViewSet.queryset.all(), TitleRows),
+            ('reviews', Review.objects.select_related('author', 'title'),
+             ReviewRows),
+            ('comments', Comment.objects.select_related(
+                'author', 'review__title'), CommentRows),
+        )
+
+    def measure(self, build, repeat):
+        """Медиана времени выборки, сериализации и отрисовки JSON."""
+        renderer = JSONRenderer()
+        content = renderer.render(build())
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            renderer.render(build())
+            timings.append(time.perf_counter() - started)
+        return statistics.median(timings) * 1000, content
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        sizes = dict(DEFAULT_SIZES, titles=max(rows, 100),
+                     comments_per_review=max(rows // 100, 1) * 2)
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            Dataset(sizes).seed()
+            for name, queryset, row_serializer_class in self.querysets():
+                row_serializer = row_serializer_class()
+                serializer_class = row_serializer.serializer_class
+                drf_ms, drf_content = self.measure(
+                    lambda: serializer_class(
+                        list(queryset[:rows]), many=True).data,
+                    options['repeat'])
+                fast_ms, fast_content = self.measure(
+                    lambda: row_serializer.to_representation(
+                        list(row_serializer.values(queryset)[:rows])),
+                    options['repeat'])
+                if drf_content != fast_content:
+                    raise CommandError(
+                        f'{name}: fast path output differs from '
+                        f'{serializer_class.__name__}')
+                self.stdout.write(self.style.SUCCESS(
+                    f'{name:<9} {rows} rows: '
+                    f'{serializer_class.__name__} {drf_ms:.2f} ms, '
+                    f'{row_serializer_class.__name__} {fast_ms:.2f} ms, '
+                    f'x{drf_ms / fast_ms:.1f}'))
+        finally:
+            teardown_databases(old_config, verbosity=0)
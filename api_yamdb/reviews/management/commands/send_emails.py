@@ -0,0 +1,95 @@
+import time
+from datetime import timedelta
+
+from django.core.mail import EmailMessage, get_connection
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from reviews.models import OutgoingEmail
+
+
+class Command(BaseCommand):
+    help = 'Sends queued emails in batches over a single mail connection'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=100,
+            help='Emails sent per mail connection')
+        parser.add_argument(
+            '--max-attempts', type=int, default=5,
+            help='Attempts before an email is given up')
+        parser.add_argument(
+            '--retry-delay', type=int, default=60,
+            help='Seconds before a failed email is retried')
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Keep polling the queue instead of exiting when drained')
+        parser.add_argument(
+            '--interval', type=float, default=5,
+            help='Seconds to wait between polls in --loop mode')
+
+    def pending(self, options):
+        retry_before = timezone.now() - timedelta(
+            seconds=options['retry_delay'])
+        return OutgoingEmail.objects.filter(
+            Q(last_attempt__isnull=True) | Q(last_attempt__lte=retry_before),
+            sent__isnull=True,
+            attempts__lt=options['max_attempts'],
+        )
+
+    def claim(self, options):
+        """Забирает пачку писем короткой транзакцией.
+
+        attempts и last_attempt обновляются до отправки, поэтому другие
+        обработчики не возьмут эти письма раньше retry_delay, а блокировки
+        строк не держатся, пока идёт обмен с SMTP-сервером.
+        """
+        with transaction.atomic():
+            emails = list(self.pending(options).select_for_update(
+                skip_locked=True)[:options['batch_size']])
+            now = timezone.now()
+            for email in emails:
+                email.attempts += 1
+                email.last_attempt = now
+            OutgoingEmail.objects.bulk_update(
+                emails, ('attempts', 'last_attempt'))
+        return emails
+
+    def send_batch(self, options):
+        emails = self.claim(options)
+        if not emails:
+            return 0, 0
+        sent = 0
+        with get_connection() as connection:
+            for email in emails:
+                message = EmailMessage(
+                    email.subject, email.body, email.from_email,
+                    (email.recipient,), connection=connection)
+                try:
+                    message.send()
+                except Exception as e:
+                    email.last_error = str(e)
+                else:
+                    email.sent = timezone.now()
+                    sent += 1
+        OutgoingEmail.objects.bulk_update(emails, ('last_error', 'sent'))
+        return len(emails), sent
+
+    def handle(self, *args, **options):
+        while True:
+            try:
+                taken, sent = self.send_batch(options)
+            except Exception as e:
+                if not options['loop']:
+                    raise
+                self.stderr.write(f'Mail connection failed: {e}')
+                taken = sent = 0
+            if taken:
+                self.stdout.write(self.style.SUCCESS(
+                    f'{sent} of {taken} emails sent'))
+            if taken == options['batch_size']:
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,52 @@
+from django.db import migrations
+
+# Поля, по которым api.search ищет подстроку и сходство триграмм:
+# индекс строится по UPPER(поле), как в условиях запроса.
+TRIGRAM_INDEXES = (
+    ('reviews_title_name_trgm', 'reviews_title', 'name'),
+    ('reviews_genre_name_trgm', 'reviews_genre', 'name'),
+    ('reviews_category_name_trgm', 'reviews_category', 'name'),
+    ('reviews_user_username_trgm', 'reviews_user', 'username'),
+)
+# Выражение совпадает с SearchVector('name', 'description',
+# config='russian') из api.search.document_vector.
+DOCUMENT_INDEX = (
+    'CREATE INDEX IF NOT EXISTS reviews_title_document_fts '
+    'ON reviews_title USING gin (to_tsvector(\'russian\'::regconfig, '
+    'COALESCE(name, \'\') || \' \' || COALESCE(description, \'\')))'
+)
+
+
+def create_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+        if cursor.fetchone():
+            cursor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+            for name, table, column in TRIGRAM_INDEXES:
+                cursor.execute(
+                    f'CREATE INDEX IF NOT EXISTS {name} ON {table} '
+                    f'USING gin (UPPER({column}) gin_trgm_ops)')
+        cursor.execute(DOCUMENT_INDEX)
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for name, _, _ in TRIGRAM_INDEXES:
+            cursor.execute(f'DROP INDEX IF EXISTS {name}')
+        cursor.execute('DROP INDEX IF EXISTS reviews_title_document_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0022_title_modified'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
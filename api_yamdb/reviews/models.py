@@ -1,6 +1,8 @@
 from django.contrib.auth.models import AbstractUser, UserManager
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
+from django.db.models import Count, F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce, Now, NullIf
 from reviews.validators import validate_year
 
 GENRE_NAME_MAX_LENGTH = 256
@@ -98,6 +100,39 @@ class Category(models.Model):
         return self.name
 
 
+class TitleQuerySet(models.QuerySet):
+
+    def change_rating(self, score_delta, count_delta):
+        """Инкрементально обновляет хранимый рейтинг одним UPDATE."""
+        rating_sum = F('rating_sum') + score_delta
+        rating_count = F('rating_count') + count_delta
+        return self.update(
+            rating_sum=rating_sum,
+            rating_count=rating_count,
+            rating=rating_sum / NullIf(rating_count, 0),
+            modified=Now()
+        )
+
+    def recalculate_ratings(self):
+        """Пересчитывает хранимый рейтинг по таблице отзывов."""
+        reviews = Review.objects.filter(
+            title=OuterRef('pk')).order_by().values('title')
+        rating_sum = reviews.annotate(value=Sum('score')).values('value')
+        rating_count = reviews.annotate(value=Count('id')).values('value')
+        rating = reviews.annotate(
+            value=Sum('score') / Count('id')).values('value')
+        return self.update(
+            rating_sum=Coalesce(Subquery(rating_sum), 0),
+            rating_count=Coalesce(Subquery(rating_count), 0),
+            rating=Subquery(rating),
+            modified=Now()
+        )
+
+    def touch(self):
+        """Отмечает изменение произведения, его отзывов или комментариев."""
+        return self.update(modified=Now())
+
+
 class Title(models.Model):
     name = models.TextField(verbose_name='Название')
     year = models.PositiveSmallIntegerField(validators=(validate_year,),
@@ -109,9 +144,24 @@ class Title(models.Model):
     category = models.ForeignKey(Category, related_name='titles', null=True,
                                  on_delete=models.SET_NULL,
                                  verbose_name='Категория')
+    rating = models.PositiveSmallIntegerField(null=True, editable=False,
+                                              db_index=True,
+                                              verbose_name='Рейтинг')
+    rating_sum = models.PositiveIntegerField(default=0, editable=False,
+                                             verbose_name='Сумма оценок')
+    rating_count = models.PositiveIntegerField(default=0, editable=False,
+                                               verbose_name='Число оценок')
+    modified = models.DateTimeField(auto_now=True, db_index=True,
+                                    verbose_name='Дата изменения')
+    objects = TitleQuerySet.as_manager()
 
     class Meta:
         ordering = ('-id',)
+        indexes = (
+            models.Index(fields=('category', '-id'),
+                         name='title_category_id_idx'),
+            models.Index(fields=('year', '-id'), name='title_year_id_idx'),
+        )
         verbose_name = 'Произведение'
         verbose_name_plural = 'Произведения'
 
@@ -119,11 +169,46 @@ class Title(models.Model):
         return self.name
 
 
+class TitleGenreQuerySet(models.QuerySet):
+
+    def set_genres(self, genre_ids, created=False):
+        """Приводит связи к genre_ids ({id произведения: id жанров}).
+
+        Лишние связи удаляются одним DELETE, недостающие вставляются одним
+        INSERT. У новых произведений (created) связей нет, они не читаются.
+        """
+        wanted = {title_id: set(ids) for title_id, ids in genre_ids.items()}
+        current = {title_id: set() for title_id in wanted}
+        stale = []
+        if not created and wanted:
+            links = self.filter(title_id__in=wanted).values_list(
+                'id', 'title_id', 'genre_id')
+            for link_id, title_id, genre_id in links:
+                if genre_id in wanted[title_id]:
+                    current[title_id].add(genre_id)
+                else:
+                    stale.append(link_id)
+        if stale:
+            self.filter(id__in=stale).delete()
+        self.bulk_create(
+            TitleGenre(title_id=title_id, genre_id=genre_id)
+            for title_id, ids in genre_ids.items()
+            for genre_id in dict.fromkeys(ids)
+            if genre_id not in current[title_id])
+
+
 class TitleGenre(models.Model):
     genre = models.ForeignKey(Genre, on_delete=models.CASCADE,
                               verbose_name='Жанр')
     title = models.ForeignKey(Title, on_delete=models.CASCADE,
                               verbose_name='Произведение')
+    objects = TitleGenreQuerySet.as_manager()
+
+    class Meta:
+        indexes = (
+            models.Index(fields=('genre', 'title'),
+                         name='titlegenre_genre_title_idx'),
+        )
 
     def __str__(self):
         return f'{self.title} - {self.genre}'
@@ -166,6 +251,10 @@ class Review(models.Model):
                 name='unique_title_author'
             ),
         )
+        indexes = (
+            models.Index(fields=('title', '-pub_date'),
+                         name='review_title_pub_date_idx'),
+        )
         verbose_name = 'Отзыв'
         verbose_name_plural = 'Отзывы'
 
@@ -194,5 +283,34 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ('-pub_date',)
+        indexes = (
+            models.Index(fields=('review', '-pub_date'),
+                         name='comment_review_pub_date_idx'),
+        )
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
+
+
+class OutgoingEmail(models.Model):
+    subject = models.CharField(max_length=255, verbose_name='Тема')
+    body = models.TextField(verbose_name='Текст')
+    from_email = models.EmailField(verbose_name='Отправитель')
+    recipient = models.EmailField(verbose_name='Получатель')
+    created = models.DateTimeField(auto_now_add=True,
+                                   verbose_name='Дата создания')
+    sent = models.DateTimeField(null=True, blank=True, db_index=True,
+                                verbose_name='Дата отправки')
+    attempts = models.PositiveSmallIntegerField(default=0,
+                                                verbose_name='Попытки')
+    last_attempt = models.DateTimeField(null=True, blank=True,
+                                        verbose_name='Последняя попытка')
+    last_error = models.TextField(blank=True,
+                                  verbose_name='Последняя ошибка')
+
+    class Meta:
+        ordering = ('id',)
+        verbose_name = 'Письмо'
+        verbose_name_plural = 'Исходящие письма'
+
+    def __str__(self):
+        return f'{self.recipient}: {self.subject}'
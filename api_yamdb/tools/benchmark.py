@@ -0,0 +1,396 @@
+"""Нагрузочные сценарии для маршрутов router_v1.
+
+Запросы идут через тестовый клиент DRF внутри процесса: в замер
+попадают middleware, аутентификация, запросы к базе, сериализация и
+отрисовка, но не HTTP-сервер. Сценарии и запросы внутри них выполняются
+последовательно, по одному: замеряется задержка маршрута без конкуренции
+за базу и процессор, а не поведение под одновременной нагрузкой. Данные
+засеваются детерминированно, поэтому результаты разных коммитов на одной
+базе сравнимы (см. bench_api).
+
+Модуль импортирует тестовый клиент DRF, поэтому лежит вне пакета api и
+используется только командами bench_api и bench_serialization.
+"""
+import time
+from collections import defaultdict
+from contextlib import ExitStack
+from uuid import uuid4
+
+from api.authentication import access_token_for
+from api.profiling import percentile
+from api.urls import router_v1
+from django.contrib.auth.tokens import default_token_generator
+from django.db import connections
+from rest_framework.test import APIClient
+from reviews.models import (Category, Comment, Genre, Review, Title,
+                            TitleGenre, User)
+
+DEFAULT_SIZES = {
+    'titles': 1000,
+    'genres': 20,
+    'categories': 10,
+    'users': 50,
+    'reviews_per_title': 5,
+    'comments_per_review': 2,
+}
+# Объектов в одном запросе пакетных сценариев.
+BULK_SIZE = 50
+
+
+class Dataset:
+    """Засеянные данные и объекты, созданные сценариями записи."""
+
+    def __init__(self, sizes):
+        self.sizes = sizes
+        # Метка запуска делает уникальными имена создаваемых объектов,
+        # если база сохраняется между запусками (--keepdb).
+        self.tag = uuid4().hex[:6]
+        self.created = defaultdict(list)
+
+    def seed(self):
+        sizes = self.sizes
+        tag = self.tag
+        # bulk_create возвращает id только на PostgreSQL, поэтому
+        # созданные строки перечитываются.
+        Category.objects.bulk_create(
+            Category(name=f'Категория {i}', slug=f'c-{tag}-{i}')
+            for i in range(sizes['categories']))
+        categories = list(Category.objects.filter(
+            slug__startswith=f'c-{tag}-').order_by('id'))
+        Genre.objects.bulk_create(
+            Genre(name=f'Жанр {i}', slug=f'g-{tag}-{i}')
+            for i in range(sizes['genres']))
+        genres = list(Genre.objects.filter(
+            slug__startswith=f'g-{tag}-').order_by('id'))
+        Title.objects.bulk_create(
+            Title(name=f'Произведение {tag} {i}', year=1950 + i % 70,
+                  description=f'Описание произведения {i}',
+                  category=categories[i % len(categories)])
+            for i in range(sizes['titles']))
+        titles = list(Title.objects.filter(
+            name__startswith=f'Произведение {tag} ').order_by('id'))
+        TitleGenre.objects.bulk_create(
+            TitleGenre(title=title, genre=genres[(i + shift) % len(genres)])
+            for i, title in enumerate(titles) for shift in (0, 1))
+        User.objects.bulk_create(
+            User(username=f'bench-{tag}-{i}', email=f'{tag}-{i}@yamdb.ru')
+            for i in range(sizes['users']))
+        users = list(User.objects.filter(
+            username__startswith=f'bench-{tag}-').order_by('id'))
+        Review.objects.bulk_create(
+            Review(title=title, author=users[i], text='Отзыв',
+                   score=1 + (title.id + i) % 10)
+            for title in titles
+            for i in range(min(sizes['reviews_per_title'], len(users))))
+        reader = users[0]
+        reviews = list(Review.objects.filter(
+            title__in=titles[:100]).order_by('id'))
+        Comment.objects.bulk_create(
+            Comment(review=review, author=users[i % len(users)],
+                    text='Комментарий')
+            for review in reviews
+            for i in range(sizes['comments_per_review']))
+        Title.objects.filter(id__in=[title.id for title in titles]
+                             ).recalculate_ratings()
+
+        self.title_ids = [title.id for title in titles]
+        self.genre_slugs = [genre.slug for genre in genres]
+        self.category_slugs = [category.slug for category in categories]
+        self.reader = reader
+        self.writer = User.objects.create(
+            username=f'writer-{tag}', email=f'writer-{tag}@yamdb.ru')
+        self.admin = User.objects.create(
+            username=f'admin-{tag}', email=f'admin-{tag}@yamdb.ru',
+            role='admin')
+        self.review = Review.objects.filter(
+            author=reader, title_id=self.title_ids[0]).get()
+        self.comment = Comment.objects.filter(
+            author=reader, review=self.review).first()
+        return self
+
+
+class Scenario:
+    """Один запрос к маршруту роутера, повторяемый с номером k.
+
+    payload — тело запроса, для GET — параметры строки запроса. keep
+    сохраняет созданный объект из ответа в dataset.created[basename],
+    сценарии удаления забирают их оттуда, поэтому число их повторов
+    ограничено созданными объектами.
+    """
+
+    def __init__(self, name, basename, role, method, path, payload=None,
+                 status=200, keep=None, consumes=False):
+        self.name = name
+        self.basename = basename
+        self.role = role
+        self.method = method
+        self.path = path
+        self.payload = payload
+        self.status = status
+        self.keep = keep
+        self.consumes = consumes
+
+
+def scenarios(data):
+    tag = data.tag
+    title_id = data.title_ids[0]
+    review_path = f'/api/v1/titles/{title_id}/reviews/'
+    comment_path = f'{review_path}{data.review.id}/comments/'
+
+    def pop(basename):
+        return data.created[basename].pop()
+
+    return [
+        Scenario('auth-signup', 'auth_users', 'anon', 'post',
+                 lambda k: '/api/v1/auth/signup/',
+                 lambda k: {'username': f'signup-{tag}-{k}',
+                            'email': f'signup-{tag}-{k}@yamdb.ru'}),
+        Scenario('auth-token', 'auth_users', 'anon', 'post',
+                 lambda k: '/api/v1/auth/token/',
+                 lambda k: {'username': data.reader.username,
+                            'confirmation_code': (
+                                default_token_generator.make_token(
+                                    data.reader))}),
+
+        Scenario('genres-list', 'genre', 'anon', 'get',
+                 lambda k: '/api/v1/genres/'),
+        Scenario('genres-search', 'genre', 'anon', 'get',
+                 lambda k: '/api/v1/genres/', lambda k: {'search': 'Жанр 1'}),
+        Scenario('genres-create', 'genre', 'admin', 'post',
+                 lambda k: '/api/v1/genres/',
+                 lambda k: {'name': f'Новый жанр {tag} {k}',
+                            'slug': f'ng-{tag}-{k}'},
+                 status=201, keep=lambda k, body: body['slug']),
+        Scenario('genres-bulk-create', 'genre', 'admin', 'post',
+                 lambda k: '/api/v1/genres/',
+                 lambda k: [{'name': f'Пакетный жанр {tag} {k} {i}',
+                             'slug': f'bg-{tag}-{k}-{i}'}
+                            for i in range(BULK_SIZE)],
+                 status=201),
+        Scenario('genres-destroy', 'genre', 'admin', 'delete',
+                 lambda k: f'/api/v1/genres/{pop("genre")}/',
+                 status=204, consumes=True),
+
+        Scenario('categories-list', 'category', 'anon', 'get',
+                 lambda k: '/api/v1/categories/'),
+        Scenario('categories-create', 'category', 'admin', 'post',
+                 lambda k: '/api/v1/categories/',
+                 lambda k: {'name': f'Новая категория {tag} {k}',
+                            'slug': f'nc-{tag}-{k}'},
+                 status=201, keep=lambda k, body: body['slug']),
+        Scenario('categories-destroy', 'category', 'admin', 'delete',
+                 lambda k: f'/api/v1/categories/{pop("category")}/',
+                 status=204, consumes=True),
+
+        Scenario('titles-list', 'titles', 'anon', 'get',
+                 lambda k: '/api/v1/titles/'),
+        Scenario('titles-list-deep', 'titles', 'anon', 'get',
+                 lambda k: '/api/v1/titles/',
+                 lambda k: {'page': max(len(data.title_ids) // 10, 1)}),
+        Scenario('titles-list-genre', 'titles', 'anon', 'get',
+                 lambda k: '/api/v1/titles/',
+                 lambda k: {'genre': data.genre_slugs[0]}),
+        Scenario('titles-list-cursor', 'titles', 'anon', 'get',
+                 lambda k: '/api/v1/titles/',
+                 lambda k: {'pagination': 'cursor'}),
+        Scenario('titles-search', 'titles', 'anon', 'get',
+                 lambda k: '/api/v1/titles/',
+                 lambda k: {'name': 'произведение'}),
+        Scenario('titles-retrieve', 'titles', 'anon', 'get',
+                 lambda k: f'/api/v1/titles/'
+                           f'{data.title_ids[k % len(data.title_ids)]}/'),
+        Scenario('titles-create', 'titles', 'admin', 'post',
+                 lambda k: '/api/v1/titles/',
+                 lambda k: {'name': f'Новое произведение {k}', 'year': 2000,
+                            'genre': data.genre_slugs[:2],
+                            'category': data.category_slugs[0]},
+                 status=201, keep=lambda k, body: body['id']),
+        Scenario('titles-bulk-create', 'titles', 'admin', 'post',
+                 lambda k: '/api/v1/titles/',
+                 lambda k: [{'name': f'Пакетное произведение {k} {i}',
+                             'year': 2000, 'genre': data.genre_slugs[:2],
+                             'category': data.category_slugs[0]}
+                            for i in range(BULK_SIZE)],
+                 status=201),
+        Scenario('titles-bulk-update', 'titles', 'admin', 'patch',
+                 lambda k: '/api/v1/titles/',
+                 lambda k: [{'id': title_id, 'description': f'Описание {k}',
+                             'genre': data.genre_slugs[k % 2:k % 2 + 2]}
+                            for title_id in data.title_ids[:BULK_SIZE]]),
+        Scenario('titles-partial-update', 'titles', 'admin', 'patch',
+                 lambda k: f'/api/v1/titles/{title_id}/',
+                 lambda k: {'description': f'Описание {k}'}),
+        Scenario('titles-destroy', 'titles', 'admin', 'delete',
+                 lambda k: f'/api/v1/titles/{pop("titles")}/',
+                 status=204, consumes=True),
+
+        Scenario('reviews-list', 'reviews', 'anon', 'get',
+                 lambda k: review_path),
+        Scenario('reviews-retrieve', 'reviews', 'anon', 'get',
+                 lambda k: f'{review_path}{data.review.id}/'),
+        # Автор может оставить один отзыв на произведение, поэтому writer
+        # пишет по отзыву на каждое засеянное произведение.
+        Scenario('reviews-create', 'reviews', 'writer', 'post',
+                 lambda k: f'/api/v1/titles/{data.title_ids[k]}/reviews/',
+                 lambda k: {'text': 'Новый отзыв', 'score': 1 + k % 10},
+                 status=201,
+                 keep=lambda k, body: (data.title_ids[k], body['id'])),
+        Scenario('reviews-partial-update', 'reviews', 'reader', 'patch',
+                 lambda k: f'{review_path}{data.review.id}/',
+                 lambda k: {'score': 1 + k % 10}),
+        Scenario('reviews-destroy', 'reviews', 'writer', 'delete',
+                 lambda k: '/api/v1/titles/{}/reviews/{}/'.format(
+                     *pop('reviews')),
+                 status=204, consumes=True),
+
+        Scenario('comments-list', 'comments', 'anon', 'get',
+                 lambda k: comment_path),
+        Scenario('comments-retrieve', 'comments', 'anon', 'get',
+                 lambda k: f'{comment_path}{data.comment.id}/'),
+        Scenario('comments-create', 'comments', 'reader', 'post',
+                 lambda k: comment_path,
+                 lambda k: {'text': f'Новый комментарий {k}'},
+                 status=201, keep=lambda k, body: body['id']),
+        Scenario('comments-partial-update', 'comments', 'reader', 'patch',
+                 lambda k: f'{comment_path}{data.comment.id}/',
+                 lambda k: {'text': f'Исправленный комментарий {k}'}),
+        Scenario('comments-destroy', 'comments', 'reader', 'delete',
+                 lambda k: f'{comment_path}{pop("comments")}/',
+                 status=204, consumes=True),
+
+        Scenario('users-list', 'users', 'admin', 'get',
+                 lambda k: '/api/v1/users/'),
+        Scenario('users-retrieve', 'users', 'admin', 'get',
+                 lambda k: f'/api/v1/users/{data.reader.username}/'),
+        Scenario('users-create', 'users', 'admin', 'post',
+                 lambda k: '/api/v1/users/',
+                 lambda k: {'username': f'new-{tag}-{k}',
+                            'email': f'new-{tag}-{k}@yamdb.ru'},
+                 status=201, keep=lambda k, body: body['username']),
+        Scenario('users-partial-update', 'users', 'admin', 'patch',
+                 lambda k: f'/api/v1/users/{data.reader.username}/',
+                 lambda k: {'bio': f'Биография {k}'}),
+        Scenario('users-destroy', 'users', 'admin', 'delete',
+                 lambda k: f'/api/v1/users/{pop("users")}/',
+                 status=204, consumes=True),
+        Scenario('users-me', 'users', 'reader', 'get',
+                 lambda k: '/api/v1/users/me/'),
+        Scenario('users-me-patch', 'users', 'reader', 'patch',
+                 lambda k: '/api/v1/users/me/',
+                 lambda k: {'bio': f'О себе {k}'}),
+
+        Scenario('profiling-list', 'profiling', 'admin', 'get',
+                 lambda k: '/api/v1/profiling/'),
+    ]
+
+
+def uncovered_routes(scenario_list):
+    """Маршруты router_v1, для которых нет ни одного сценария."""
+    covered = {scenario.basename for scenario in scenario_list}
+    return [prefix for prefix, viewset, basename in router_v1.registry
+            if basename not in covered]
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class Benchmark:
+
+    def __init__(self, data, iterations=200, warmup=10):
+        self.data = data
+        self.iterations = iterations
+        self.warmup = warmup
+        self.clients = {'anon': APIClient()}
+        for role in ('reader', 'writer', 'admin'):
+            client = APIClient()
+            client.credentials(HTTP_AUTHORIZATION=(
+                f'Bearer {access_token_for(getattr(data, role))}'))
+            self.clients[role] = client
+
+    def counts(self, scenario):
+        """Число разогревочных и замеряемых запросов сценария."""
+        if scenario.consumes:
+            available = len(self.data.created[scenario.basename])
+        elif scenario.name == 'reviews-create':
+            available = len(self.data.title_ids)
+        else:
+            return self.warmup, self.iterations
+        warmup = min(self.warmup, available // 2)
+        return warmup, min(self.iterations, available - warmup)
+
+    def prepare(self, scenario, k):
+        """Запрос сценария без отправки, чтобы не замерять его сборку."""
+        client = self.clients[scenario.role]
+        path = scenario.path(k)
+        payload = scenario.payload(k) if scenario.payload else None
+        if scenario.method == 'get':
+            return client.get, (path, payload), {}
+        return (getattr(client, scenario.method), (path, payload),
+                {'format': 'json'})
+
+    def run_scenario(self, scenario):
+        warmup, iterations = self.counts(scenario)
+        timings = []
+        errors = 0
+        queries = QueryCounter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(queries))
+            for k in range(warmup + iterations):
+                if k == warmup:
+                    queries.count = 0
+                send, args, kwargs = self.prepare(scenario, k)
+                started = time.perf_counter()
+                response = send(*args, **kwargs)
+                elapsed = time.perf_counter() - started
+                if response.status_code != scenario.status:
+                    errors += 1
+                elif scenario.keep is not None:
+                    self.data.created[scenario.basename].append(
+                        scenario.keep(k, response.json()))
+                if k >= warmup:
+                    timings.append(elapsed)
+        return summarize(timings, errors, queries.count)
+
+    def run(self, names=None):
+        results = {}
+        for scenario in scenarios(self.data):
+            if names and scenario.name not in names:
+                continue
+            results[scenario.name] = self.run_scenario(scenario)
+        return results
+
+
+def summarize(timings, errors, queries):
+    if not timings:
+        return {'requests': 0, 'errors': errors}
+    total = sum(timings)
+    values = sorted(value * 1000 for value in timings)
+    return {
+        'requests': len(timings),
+        'errors': errors,
+        'rps': round(len(timings) / total, 1),
+        'mean_ms': round(total * 1000 / len(timings), 3),
+        'p50_ms': round(percentile(values, 0.5), 3),
+        'p95_ms': round(percentile(values, 0.95), 3),
+        'p99_ms': round(percentile(values, 0.99), 3),
+        'max_ms': round(values[-1], 3),
+        'queries': round(queries / len(timings), 2),
+    }
+
+
+def compare(baseline, current, metric='p95_ms'):
+    """Изменение metric по сценариям в процентах относительно baseline."""
+    changes = {}
+    for name, result in current.items():
+        old = baseline.get(name, {}).get(metric)
+        new = result.get(metric)
+        if old and new is not None:
+            changes[name] = (old, new, (new - old) / old * 100)
+    return changes
@@ -0,0 +1,55 @@
+import asyncio
+import json
+
+import pytest
+from asgiref.testing import ApplicationCommunicator
+from django.core.signals import request_finished
+from reviews.models import Title
+
+
+def asgi_get(path):
+    from api_yamdb.asgi import application
+
+    async def request():
+        communicator = ApplicationCommunicator(application, {
+            'type': 'http', 'http_version': '1.1', 'method': 'GET',
+            'path': path, 'query_string': b'', 'headers': [],
+        })
+        await communicator.send_input({'type': 'http.request'})
+        start = await communicator.receive_output(timeout=5)
+        body = b''
+        while True:
+            message = await communicator.receive_output(timeout=5)
+            body += message.get('body', b'')
+            if not message.get('more_body'):
+                return start['status'], body
+
+    return asyncio.get_event_loop().run_until_complete(request())
+
+
+@pytest.mark.django_db(transaction=True)
+class TestAsgi:
+
+    def test_titles_through_asgi(self):
+        Title.objects.create(name='Произведение', year=2000)
+        status, body = asgi_get('/api/v1/titles/')
+        assert status == 200, (
+            'Проверьте, что api_yamdb.asgi отдаёт список произведений'
+        )
+        assert json.loads(body)['count'] == 1
+
+    def test_request_finished_is_sent(self):
+        finished = []
+
+        def receiver(**kwargs):
+            finished.append(1)
+
+        request_finished.connect(receiver)
+        try:
+            asgi_get('/api/v1/titles/')
+        finally:
+            request_finished.disconnect(receiver)
+        assert finished, (
+            'Проверьте, что после ответа через ASGI отправляется '
+            'request_finished и соединения с базой закрываются'
+        )
@@ -0,0 +1,115 @@
+import pytest
+from api.authentication import access_token_for, cache_user
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from reviews.models import User
+
+
+def client_for(user):
+    client = APIClient()
+    client.credentials(
+        HTTP_AUTHORIZATION=f'Bearer {access_token_for(user)}')
+    return client
+
+
+@pytest.fixture
+def shared_cache(settings, tmp_path):
+    """Общий для процессов бэкенд, с которым пользователь кешируется."""
+    settings.CACHES = {'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': str(tmp_path),
+    }}
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures('shared_cache')
+class TestCachedAuthentication:
+
+    def test_token_has_role_claims(self):
+        user = User.objects.create(username='moder', email='m@yamdb.ru',
+                                   role='moderator')
+        token = AccessToken(str(access_token_for(user)))
+        assert token['role'] == 'moderator'
+        assert token['is_superuser'] is False
+
+    def test_user_is_not_queried_twice(self, django_assert_num_queries):
+        user = User.objects.create(username='reader', email='r@yamdb.ru')
+        client = client_for(user)
+        with django_assert_num_queries(1):
+            assert client.get('/api/v1/users/me/').status_code == 200
+        with django_assert_num_queries(0):
+            response = client.get('/api/v1/users/me/')
+        assert response.json()['username'] == 'reader', (
+            'Проверьте, что пользователь из токена берётся из кеша'
+        )
+
+    def test_patch_me_keeps_password(self):
+        user = User.objects.create_user('reader', 'r@yamdb.ru', 'secret')
+        client = client_for(user)
+        client.get('/api/v1/users/me/')
+        response = client.patch('/api/v1/users/me/', {'bio': 'Читатель'})
+        assert response.status_code == 200
+        user.refresh_from_db()
+        assert user.bio == 'Читатель'
+        assert user.check_password('secret'), (
+            'Проверьте, что сохранение пользователя из кеша не затирает '
+            'поля, которых нет в кеше'
+        )
+
+    def test_inactive_cached_user_is_rejected(self):
+        user = User.objects.create(username='reader', email='r@yamdb.ru')
+        client = client_for(user)
+        client.get('/api/v1/users/me/')
+        User.objects.filter(id=user.id).update(is_active=False)
+        user.is_active = False
+        cache_user(user)
+        assert client.get('/api/v1/users/me/').status_code == 401
+
+    @pytest.mark.django_db(transaction=True)
+    def test_role_change_invalidates_cache(self):
+        admin = User.objects.create(username='admin', email='a@yamdb.ru',
+                                    role='admin')
+        user = User.objects.create(username='reader', email='r@yamdb.ru')
+        client = client_for(user)
+        assert client.get('/api/v1/users/').status_code == 403
+        response = client_for(admin).patch(
+            '/api/v1/users/reader/', {'role': 'admin'})
+        assert response.status_code == 200
+        assert client.get('/api/v1/users/').status_code == 200, (
+            'Проверьте, что смена роли сбрасывает пользователя в кеше'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_deleted_user_is_rejected(self):
+        admin = User.objects.create(username='admin', email='a@yamdb.ru',
+                                    role='admin')
+        user = User.objects.create(username='reader', email='r@yamdb.ru')
+        client = client_for(user)
+        assert client.get('/api/v1/users/me/').status_code == 200
+        client_for(admin).delete('/api/v1/users/reader/')
+        assert client.get('/api/v1/users/me/').status_code == 401
+
+
+@pytest.mark.django_db
+class TestLocalCache:
+    """С локальным кешем процесса пользователь читается из базы."""
+
+    def test_user_is_queried_every_time(self, django_assert_num_queries):
+        client = client_for(
+            User.objects.create(username='reader', email='r@yamdb.ru'))
+        for _ in range(2):
+            with django_assert_num_queries(1):
+                assert client.get('/api/v1/users/me/').status_code == 200
+
+    def test_change_in_another_process_applies_at_once(self):
+        """Роль сменили в другом процессе: сигнал до этого кеша не дошёл."""
+        admin = User.objects.create(username='admin', email='a@yamdb.ru',
+                                    role='admin')
+        client = client_for(admin)
+        assert client.get('/api/v1/users/').status_code == 200
+        cache_user(admin)
+        User.objects.filter(id=admin.id).update(role='user')
+        assert client.get('/api/v1/users/').status_code == 403, (
+            'Проверьте, что без общего кеша пониженный в правах пользователь '
+            'сразу теряет доступ'
+        )
@@ -0,0 +1,67 @@
+import json
+
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from tools.benchmark import (Benchmark, Dataset, compare, scenarios,
+                             uncovered_routes)
+
+SIZES = {
+    'titles': 20,
+    'genres': 3,
+    'categories': 2,
+    'users': 4,
+    'reviews_per_title': 2,
+    'comments_per_review': 1,
+}
+
+
+@pytest.fixture
+def dataset(db):
+    return Dataset(SIZES).seed()
+
+
+class TestBenchmark:
+
+    def test_every_route_has_scenario(self, dataset):
+        assert uncovered_routes(scenarios(dataset)) == [], (
+            'Проверьте, что для каждого маршрута router_v1 есть сценарий'
+        )
+
+    def test_scenarios_succeed(self, dataset):
+        results = Benchmark(dataset, iterations=3, warmup=1).run()
+        failed = {name: result for name, result in results.items()
+                  if result['errors'] or not result['requests']}
+        assert failed == {}, (
+            'Проверьте, что сценарии получают ожидаемые статусы ответов'
+        )
+        json.dumps(results)
+
+    def test_compare(self):
+        baseline = {'titles-list': {'p95_ms': 10.0}, 'removed': {}}
+        current = {'titles-list': {'p95_ms': 15.0}, 'added': {'p95_ms': 1}}
+        assert compare(baseline, current) == {
+            'titles-list': (10.0, 15.0, 50.0)}
+
+
+@pytest.mark.django_db
+def test_command_fails_on_regression(tmp_path, monkeypatch):
+    """Команда сравнивает прогон с сохранённым и падает при регрессии."""
+    import reviews.management.commands.bench_api as bench_api
+    monkeypatch.setattr(bench_api, 'setup_databases', lambda **kwargs: None)
+    monkeypatch.setattr(bench_api, 'teardown_databases',
+                        lambda *args, **kwargs: None)
+    baseline = tmp_path / 'baseline.json'
+    baseline.write_text(json.dumps({
+        'meta': {'vendor': 'other'},
+        'scenarios': {'genres-list': {'p95_ms': 0.0001}},
+    }))
+    output = tmp_path / 'result.json'
+    sizes = [f'--{name.replace("_", "-")}={value}'
+             for name, value in SIZES.items()]
+    with pytest.raises(CommandError, match='genres-list'):
+        call_command('bench_api', *sizes, '--iterations=2', '--warmup=0',
+                     '--scenario', 'genres-list', f'--output={output}',
+                     f'--compare={baseline}', '--max-regression=10')
+    result = json.loads(output.read_text())
+    assert result['scenarios']['genres-list']['requests'] == 2
@@ -0,0 +1,282 @@
+import pytest
+from api.bulk import CONFLICT, BulkMixin, SlugBulkMixin
+from django.db import IntegrityError, connection
+from rest_framework.test import APIClient
+from reviews.models import ADMIN, Category, Genre, Title, TitleGenre, User
+
+TITLES = '/api/v1/titles/'
+GENRES = '/api/v1/genres/'
+CATEGORIES = '/api/v1/categories/'
+
+
+@pytest.fixture
+def admin_client():
+    client = APIClient()
+    client.force_authenticate(User.objects.create(
+        username='admin', email='admin@yamdb.ru', role=ADMIN))
+    return client
+
+
+@pytest.fixture
+def catalog():
+    Category.objects.create(name='Фильм', slug='movie')
+    Category.objects.create(name='Книга', slug='book')
+    for slug in ('drama', 'comedy', 'horror'):
+        Genre.objects.create(name=slug.title(), slug=slug)
+
+
+def titles_payload(count, **extra):
+    return [dict({'name': f'Произведение {i}', 'year': 2000,
+                  'genre': ['drama', 'comedy'], 'category': 'movie'},
+                 **extra) for i in range(count)]
+
+
+@pytest.mark.django_db
+class TestBulkTitles:
+
+    def test_create(self, admin_client, catalog):
+        response = admin_client.post(TITLES, titles_payload(3), format='json')
+        assert response.status_code == 201, (
+            'Проверьте, что POST со списком создаёт все произведения'
+        )
+        body = response.json()
+        assert [item['name'] for item in body] == [
+            f'Произведение {i}' for i in range(3)]
+        assert all(sorted(item['genre']) == ['comedy', 'drama']
+                   and item['category'] == 'movie' for item in body)
+        assert Title.objects.count() == 3
+        assert TitleGenre.objects.count() == 6
+
+    def test_single_object_post_still_works(self, admin_client, catalog):
+        response = admin_client.post(
+            TITLES, titles_payload(1)[0], format='json')
+        assert response.status_code == 201
+        assert response.json()['name'] == 'Произведение 0'
+
+    def test_errors_per_item_and_nothing_is_written(self, admin_client,
+                                                    catalog):
+        payload = titles_payload(3)
+        payload[1]['genre'] = ['drama', 'unknown']
+        payload[2]['year'] = 'год'
+        response = admin_client.post(TITLES, payload, format='json')
+        assert response.status_code == 400
+        errors = response.json()
+        assert len(errors) == 3, (
+            'Проверьте, что ошибки возвращаются списком по объектам запроса'
+        )
+        assert errors[0] == {}
+        assert list(errors[1]) == ['genre']
+        assert list(errors[2]) == ['year']
+        assert not Title.objects.exists(), (
+            'Проверьте, что пачка с ошибками не записывается'
+        )
+
+    def test_malformed_slugs(self, admin_client, catalog):
+        payload = titles_payload(3)
+        payload[0]['category'] = ['movie']
+        payload[1]['genre'] = [{'slug': 'drama'}]
+        response = admin_client.post(TITLES, payload, format='json')
+        assert response.status_code == 400, (
+            'Проверьте, что список или словарь вместо слага в пачке даёт '
+            'ошибку проверки, а не 500'
+        )
+        errors = response.json()
+        assert list(errors[0]) == ['category']
+        assert list(errors[1]) == ['genre']
+        assert errors[2] == {}
+        assert not Title.objects.exists()
+
+    @pytest.mark.skipif(
+        not connection.features.can_return_ids_from_bulk_insert,
+        reason='bulk_create базы не возвращает id')
+    def test_create_queries_do_not_grow(self, admin_client, catalog,
+                                        django_assert_max_num_queries):
+        admin_client.post(TITLES, titles_payload(1), format='json')
+        with django_assert_max_num_queries(10) as small:
+            admin_client.post(TITLES, titles_payload(2), format='json')
+        with django_assert_max_num_queries(len(small)):
+            admin_client.post(TITLES, titles_payload(50), format='json')
+
+    def test_update(self, admin_client, catalog):
+        admin_client.post(TITLES, titles_payload(3), format='json')
+        titles = list(Title.objects.order_by('id'))
+        modified = {title.id: title.modified for title in titles}
+        response = admin_client.patch(TITLES, [
+            {'id': titles[0].id, 'name': 'Новое название'},
+            {'id': titles[1].id, 'genre': ['horror'], 'category': 'book'},
+        ], format='json')
+        assert response.status_code == 200
+        assert [item['id'] for item in response.json()] == [
+            titles[0].id, titles[1].id]
+        first, second, third = Title.objects.order_by('id')
+        assert first.name == 'Новое название'
+        assert sorted(first.genres.values_list('slug', flat=True)) == [
+            'comedy', 'drama']
+        assert list(second.genres.values_list('slug', flat=True)) == [
+            'horror']
+        assert second.category.slug == 'book'
+        assert first.modified > modified[first.id], (
+            'Проверьте, что пакетное изменение обновляет modified'
+        )
+        assert third.modified == modified[third.id]
+
+    def test_update_errors(self, admin_client, catalog):
+        admin_client.post(TITLES, titles_payload(1), format='json')
+        title = Title.objects.get()
+        response = admin_client.patch(TITLES, [
+            {'id': title.id, 'name': 'Новое название'},
+            {'id': title.id, 'year': 2001},
+            {'name': 'Без id'},
+            {'id': 0},
+            {'id': 'abc'},
+            'не объект',
+        ], format='json')
+        assert response.status_code == 400
+        errors = response.json()
+        assert errors[0] == {}
+        assert all('id' in error for error in errors[1:5])
+        assert list(errors[5]) == ['non_field_errors']
+        assert Title.objects.get().name == 'Произведение 0'
+
+    def test_not_a_list(self, admin_client, catalog):
+        response = admin_client.patch(TITLES, {'name': 'x'}, format='json')
+        assert response.status_code == 400
+        assert 'non_field_errors' in response.json()
+
+    def test_max_items(self, admin_client, catalog, settings):
+        settings.BULK_MAX_ITEMS = 2
+        response = admin_client.post(TITLES, titles_payload(3), format='json')
+        assert response.status_code == 400
+        assert not Title.objects.exists()
+
+    def test_permissions(self, catalog):
+        response = APIClient().post(TITLES, titles_payload(1), format='json')
+        assert response.status_code == 401
+        reader = APIClient()
+        reader.force_authenticate(
+            User.objects.create(username='reader', email='r@yamdb.ru'))
+        assert reader.patch(TITLES, [], format='json').status_code == 403
+
+
+@pytest.mark.django_db
+class TestBulkGenresAndCategories:
+
+    def test_create(self, admin_client):
+        response = admin_client.post(GENRES, [
+            {'name': 'Драма', 'slug': 'drama'},
+            {'name': 'Комедия', 'slug': 'comedy'},
+        ], format='json')
+        assert response.status_code == 201
+        assert response.json() == [
+            {'name': 'Драма', 'slug': 'drama'},
+            {'name': 'Комедия', 'slug': 'comedy'},
+        ]
+        assert Genre.objects.count() == 2
+
+    def test_unique_slugs(self, admin_client, catalog):
+        response = admin_client.post(CATEGORIES, [
+            {'name': 'Музыка', 'slug': 'music'},
+            {'name': 'Фильм', 'slug': 'movie'},
+            {'name': 'Ещё музыка', 'slug': 'music'},
+            {'name': 'Без слага'},
+        ], format='json')
+        assert response.status_code == 400
+        errors = response.json()
+        assert errors[0] == {}
+        single = APIClient()
+        single.force_authenticate(User.objects.get(username='admin'))
+        expected = single.post(
+            CATEGORIES, {'name': 'Фильм', 'slug': 'movie'}).json()
+        assert errors[1] == expected, (
+            'Проверьте, что занятый слаг даёт ту же ошибку, что и POST '
+            'одного объекта'
+        )
+        assert list(errors[2]) == ['slug']
+        assert list(errors[3]) == ['slug']
+        assert Category.objects.count() == 2
+
+    def test_create_queries(self, admin_client, catalog,
+                            django_assert_max_num_queries):
+        payload = [{'name': f'Жанр {i}', 'slug': f'genre-{i}'}
+                   for i in range(30)]
+        # Пользователь, проверка слагов, вставка и точки сохранения.
+        with django_assert_max_num_queries(6):
+            response = admin_client.post(GENRES, payload, format='json')
+        assert response.status_code == 201
+
+    def test_update_touches_titles(self, admin_client, catalog):
+        admin_client.post(TITLES, titles_payload(1), format='json')
+        title = Title.objects.get()
+        response = admin_client.patch(GENRES, [
+            {'slug': 'drama', 'name': 'Трагедия'},
+            {'slug': 'comedy', 'name': 'Фарс'},
+        ], format='json')
+        assert response.status_code == 200
+        assert response.json() == [
+            {'name': 'Трагедия', 'slug': 'drama'},
+            {'name': 'Фарс', 'slug': 'comedy'},
+        ]
+        assert Genre.objects.get(slug='drama').name == 'Трагедия'
+        assert Title.objects.get().modified != title.modified, (
+            'Проверьте, что смена названия жанра меняет версию произведений'
+        )
+
+    def test_update_unknown_slug(self, admin_client, catalog):
+        response = admin_client.patch(CATEGORIES, [
+            {'slug': 'movie', 'name': 'Кино'},
+            {'slug': 'unknown', 'name': 'Нет такой'},
+        ], format='json')
+        assert response.status_code == 400
+        assert response.json()[0] == {}
+        assert list(response.json()[1]) == ['slug']
+        assert Category.objects.get(slug='movie').name == 'Фильм'
+
+    def test_concurrent_slug_is_validation_error(self, admin_client,
+                                                 catalog, monkeypatch):
+        """Слаг заняли после проверки пачки, но до вставки."""
+        monkeypatch.setattr(BulkMixin, 'validate_unique', lambda *args: None)
+        response = admin_client.post(GENRES, [
+            {'name': 'Новый', 'slug': 'new'},
+            {'name': 'Драма', 'slug': 'drama'},
+        ], format='json')
+        assert response.status_code == 400, (
+            'Проверьте, что гонка за слаг возвращает ошибку проверки, '
+            'а не 500'
+        )
+        assert response.json() == {'non_field_errors': [CONFLICT]}
+        assert not Genre.objects.filter(slug='new').exists()
+
+    def test_other_integrity_errors_are_raised(self, admin_client, catalog,
+                                               monkeypatch):
+        def fail(self, validated):
+            raise IntegrityError('CHECK constraint failed: reviews_genre')
+
+        monkeypatch.setattr(SlugBulkMixin, 'perform_bulk_create', fail)
+        with pytest.raises(IntegrityError):
+            admin_client.post(GENRES, [{'name': 'Новый', 'slug': 'new'}],
+                              format='json')
+
+    def test_nested_lists_have_no_bulk_update(self, admin_client, catalog):
+        admin_client.post(TITLES, titles_payload(1), format='json')
+        title = Title.objects.get()
+        response = admin_client.patch(
+            f'{TITLES}{title.id}/reviews/', [], format='json')
+        assert response.status_code == 405
+
+
+@pytest.mark.django_db(transaction=True)
+def test_bulk_writes_invalidate_cache(admin_client, catalog):
+    client = APIClient()
+    assert client.get(TITLES).json()['count'] == 0
+    assert client.get(GENRES).json()['count'] == 3
+    admin_client.post(TITLES, titles_payload(2), format='json')
+    admin_client.post(GENRES, [{'name': 'Новый', 'slug': 'new'}],
+                      format='json')
+    assert client.get(TITLES).json()['count'] == 2, (
+        'Проверьте, что пакетное создание сбрасывает кеш произведений'
+    )
+    assert client.get(GENRES).json()['count'] == 4
+    admin_client.patch(GENRES, [{'slug': 'drama', 'name': 'Трагедия'}],
+                       format='json')
+    genres = client.get(TITLES).json()['results'][0]['genre']
+    assert {'name': 'Трагедия', 'slug': 'drama'} in genres
@@ -0,0 +1,38 @@
+import pytest
+from rest_framework.test import APIClient
+from reviews.models import Title, User
+
+
+@pytest.mark.django_db
+class TestResponseCache:
+
+    def test_titles_list_is_cached(self, client, django_assert_num_queries):
+        Title.objects.create(name='Произведение', year=2000)
+        first = client.get('/api/v1/titles/')
+        with django_assert_num_queries(0):
+            second = client.get('/api/v1/titles/')
+        assert second.json() == first.json(), (
+            'Проверьте, что повторный анонимный запрос отдаётся из кеша'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_review_invalidates_title_and_reviews(self, client):
+        title = Title.objects.create(name='Произведение', year=2000)
+        user = User.objects.create(username='reader', email='r@yamdb.ru')
+        reviews_url = f'/api/v1/titles/{title.id}/reviews/'
+        assert client.get(reviews_url).json()['count'] == 0
+        assert client.get(f'/api/v1/titles/{title.id}/').json()[
+            'rating'] is None
+
+        author = APIClient()
+        author.force_authenticate(user)
+        response = author.post(reviews_url, {'text': 'Отзыв', 'score': 8})
+        assert response.status_code == 201
+
+        assert client.get(reviews_url).json()['count'] == 1, (
+            'Проверьте, что новый отзыв сбрасывает кеш отзывов произведения'
+        )
+        assert client.get(f'/api/v1/titles/{title.id}/').json()[
+            'rating'] == 8, (
+            'Проверьте, что новый отзыв сбрасывает кеш произведений'
+        )
@@ -0,0 +1,110 @@
+from datetime import datetime, timezone
+
+import pytest
+from rest_framework.test import APIClient
+from reviews.models import Category, Genre, Review, Title, User
+
+# modified в прошлом: на SQLite Now() хранится с точностью до секунды.
+PAST = datetime(2020, 1, 1, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def review():
+    title = Title.objects.create(name='Произведение', year=2000)
+    author = User.objects.create(username='reader', email='r@yamdb.ru')
+    return Review.objects.create(title=title, author=author, text='Отзыв',
+                                 score=7)
+
+
+@pytest.mark.django_db
+class TestConditionalGet:
+
+    @pytest.mark.parametrize('url', (
+        '/api/v1/titles/',
+        '/api/v1/titles/{title_id}/',
+        '/api/v1/titles/{title_id}/reviews/',
+        '/api/v1/titles/{title_id}/reviews/{review_id}/comments/',
+    ))
+    def test_not_modified(self, client, review, url,
+                          django_assert_max_num_queries):
+        url = url.format(title_id=review.title_id, review_id=review.id)
+        response = client.get(url)
+        assert response.status_code == 200
+        assert response.has_header('ETag'), (
+            f'Проверьте, что ответ {url} содержит ETag'
+        )
+        assert response.has_header('Last-Modified')
+        with django_assert_max_num_queries(2):
+            response = client.get(
+                url, HTTP_IF_NONE_MATCH=response['ETag'])
+        assert response.status_code == 304, (
+            'Проверьте, что на совпавший If-None-Match возвращается 304'
+        )
+
+    def test_comment_changes_etag(self, client, review):
+        url = f'/api/v1/titles/{review.title_id}/reviews/'
+        etag = client.get(url)['ETag']
+        author = APIClient()
+        author.force_authenticate(review.author)
+        response = author.post(f'{url}{review.id}/comments/',
+                               {'text': 'Комментарий'})
+        assert response.status_code == 201
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200, (
+            'Проверьте, что новый комментарий меняет версию отзывов'
+        )
+        assert response['ETag'] != etag
+
+    def test_review_text_edit_changes_etag(self, client, review):
+        Title.objects.update(modified=PAST)
+        urls = (f'/api/v1/titles/{review.title_id}/',
+                f'/api/v1/titles/{review.title_id}/reviews/')
+        etags = [client.get(url)['ETag'] for url in urls]
+        author = APIClient()
+        author.force_authenticate(review.author)
+        response = author.patch(f'{urls[1]}{review.id}/',
+                                {'text': 'Новый текст'})
+        assert response.status_code == 200
+        for url, etag in zip(urls, etags):
+            response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+            assert response.status_code == 200, (
+                'Проверьте, что правка текста отзыва без смены оценки '
+                f'меняет ETag {url}'
+            )
+
+    @pytest.mark.parametrize('change', (
+        lambda genre, category: genre.save(),
+        lambda genre, category: genre.delete(),
+        lambda genre, category: category.save(),
+        lambda genre, category: category.delete(),
+    ), ids=('genre-save', 'genre-delete', 'category-save',
+            'category-delete'))
+    def test_changes_outside_api(self, client, review, change):
+        """Правки в админке или через save() тоже меняют ETag."""
+        genre = Genre.objects.create(name='Драма', slug='drama')
+        category = Category.objects.create(name='Фильм', slug='movie')
+        review.title.genres.add(genre)
+        Title.objects.update(category=category, modified=PAST)
+        url = f'/api/v1/titles/{review.title_id}/'
+        etag = client.get(url)['ETag']
+        change(genre, category)
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200, (
+            'Проверьте, что изменение жанра или категории меняет ETag '
+            'произведения'
+        )
+
+    def test_cursor_page_etag(self, client, review):
+        """У курсорной страницы нет paginator.count, версия строится без
+        него."""
+        url = '/api/v1/titles/?pagination=cursor'
+        response = client.get(url)
+        assert response.status_code == 200
+        etag = response['ETag']
+        assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 304
+        Title.objects.update(modified=PAST)
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200, (
+            'Проверьте, что изменение произведения на курсорной странице '
+            'меняет ETag'
+        )
@@ -0,0 +1,105 @@
+import pytest
+from django.core.signals import request_started
+from django.db import Error, connection
+
+
+@pytest.fixture
+def persistent_connection(monkeypatch):
+    monkeypatch.setitem(connection.settings_dict, 'CONN_MAX_AGE', None)
+    connection.ensure_connection()
+    # SQLite в памяти не переподключается, срок жизни сбрасываем вручную.
+    monkeypatch.setattr(connection, 'close_at', None)
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.usefixtures('persistent_connection')
+class TestConnectionHealthChecks:
+
+    @pytest.fixture
+    def closed(self, monkeypatch):
+        calls = []
+        monkeypatch.setattr(connection, 'close', lambda: calls.append(1))
+        return calls
+
+    def test_unusable_connection_is_closed(self, monkeypatch, closed):
+        monkeypatch.setitem(connection.settings_dict,
+                            'CONN_HEALTH_CHECKS', True)
+        monkeypatch.setattr(connection, 'is_usable', lambda: False)
+        request_started.send(sender=self.__class__)
+        assert closed, (
+            'Проверьте, что в начале запроса сломанное соединение закрывается'
+        )
+
+    def test_usable_connection_is_kept(self, monkeypatch, closed):
+        monkeypatch.setitem(connection.settings_dict,
+                            'CONN_HEALTH_CHECKS', True)
+        request_started.send(sender=self.__class__)
+        assert not closed
+
+    def test_checks_can_be_disabled(self, monkeypatch, closed):
+        monkeypatch.setitem(connection.settings_dict,
+                            'CONN_HEALTH_CHECKS', False)
+        monkeypatch.setattr(connection, 'is_usable', lambda: False)
+        request_started.send(sender=self.__class__)
+        assert not closed
+
+
+@pytest.mark.skipif(connection.vendor != 'postgresql',
+                    reason='Пул соединений есть только для PostgreSQL')
+@pytest.mark.django_db
+class TestConnectionPool:
+
+    @pytest.fixture
+    def make_wrapper(self):
+        from api_yamdb.db_pool.base import DatabaseWrapper
+        wrappers = []
+
+        def make(max_size=2, timeout=0.1):
+            settings_dict = {
+                **connection.settings_dict,
+                'ENGINE': 'api_yamdb.db_pool',
+                'CONN_MAX_AGE': 0,
+                'POOL': {'MIN_SIZE': 0, 'MAX_SIZE': max_size,
+                         'TIMEOUT': timeout},
+            }
+            # Обработчики connection_created ищут обёртку по алиасу.
+            wrapper = DatabaseWrapper(settings_dict, alias='default')
+            wrappers.append(wrapper)
+            return wrapper
+
+        yield make
+        for wrapper in wrappers:
+            wrapper.close_pool()
+
+    def backend_pid(self, wrapper):
+        with wrapper.cursor() as cursor:
+            cursor.execute('SELECT pg_backend_pid()')
+            return cursor.fetchone()[0]
+
+    def test_connection_is_reused(self, make_wrapper):
+        first, second = make_wrapper(), make_wrapper()
+        pid = self.backend_pid(first)
+        first.close()
+        assert self.backend_pid(second) == pid, (
+            'Проверьте, что закрытое соединение возвращается в пул'
+        )
+        second.close()
+
+    def test_pool_waits_and_fails_when_exhausted(self, make_wrapper):
+        wrappers = [make_wrapper(max_size=2) for _ in range(3)]
+        self.backend_pid(wrappers[0])
+        self.backend_pid(wrappers[1])
+        with pytest.raises(Error):
+            wrappers[2].ensure_connection()
+        wrappers[0].close()
+        self.backend_pid(wrappers[2])
+        for wrapper in wrappers:
+            wrapper.close()
+
+    def test_broken_connection_is_discarded(self, make_wrapper):
+        wrapper = make_wrapper()
+        pid = self.backend_pid(wrapper)
+        wrapper.errors_occurred = True
+        wrapper.close()
+        assert self.backend_pid(wrapper) != pid
+        wrapper.close()
@@ -24,3 +24,32 @@ class TestDockerfileCompose:
         assert re.search(r'image:\s+postgres:', docker_compose), (
             'Проверьте, что  в файл docker-compose.yaml добавлен образ postgres:latest'
         )
+
+    def test_shared_cache(self):
+        with open(os.path.join(infra_dir_path, 'docker-compose.yaml')) as f:
+            docker_compose = f.read()
+        services = re.split(r'\n  (?=\w+:\n)', docker_compose)
+        django_services = [
+            service for service in services
+            if re.match(r'(web|mailer):', service)]
+        assert len(django_services) == 2
+        for service in django_services:
+            assert 'cache_value:/var/cache/yamdb/' in service, (
+                'Проверьте, что у всех процессов Django общий том кеша'
+            )
+        assert docker_compose.count(
+            'CACHE_BACKEND=django.core.cache.backends.filebased.'
+            'FileBasedCache') == 1, (
+            'Проверьте, что web (и mailer через web) используют общий бэкенд '
+            'кеша'
+        )
+
+    def test_reads_are_not_split(self):
+        with open(os.path.join(infra_dir_path, 'docker-compose.yaml')) as f:
+            docker_compose = f.read()
+        with open(os.path.join(infra_dir_path, 'nginx', 'default.conf')) as f:
+            nginx = f.read()
+        assert 'uvicorn' not in docker_compose and 'asgi' not in nginx, (
+            'Проверьте, что весь API обслуживает gunicorn: WsgiToAsgi вокруг '
+            'синхронного Django не ускоряет чтение'
+        )
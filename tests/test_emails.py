@@ -0,0 +1,116 @@
+from datetime import timedelta
+
+import pytest
+from django.core import mail
+from django.core.mail import EmailMessage
+from django.core.management import call_command
+from django.db import connection
+from reviews.models import OutgoingEmail
+
+
+def queue(*recipients):
+    OutgoingEmail.objects.bulk_create(
+        OutgoingEmail(subject='Код', body='Код', from_email='from@yamdb.ru',
+                      recipient=recipient)
+        for recipient in recipients
+    )
+
+
+@pytest.fixture
+def failing(monkeypatch):
+    """Письма получателям из множества не уходят."""
+    recipients = set()
+    send = EmailMessage.send
+
+    def send_or_fail(message, *args, **kwargs):
+        if recipients.intersection(message.to):
+            raise ConnectionError('SMTP недоступен')
+        return send(message, *args, **kwargs)
+
+    monkeypatch.setattr(EmailMessage, 'send', send_or_fail)
+    return recipients
+
+
+@pytest.mark.django_db
+class TestEmailOutbox:
+
+    def test_signup_queues_email(self, client):
+        response = client.post(
+            '/api/v1/auth/signup/',
+            {'username': 'reader', 'email': 'reader@yamdb.ru'}
+        )
+        assert response.status_code == 200
+        assert len(mail.outbox) == 0, (
+            'Проверьте, что signup не отправляет письмо синхронно'
+        )
+        assert OutgoingEmail.objects.filter(
+            recipient='reader@yamdb.ru', sent__isnull=True).exists(), (
+            'Проверьте, что signup кладёт письмо в очередь'
+        )
+
+    def test_send_emails_drains_outbox(self):
+        OutgoingEmail.objects.bulk_create(
+            OutgoingEmail(subject='Код', body=f'Код {i}',
+                          from_email='from@yamdb.ru',
+                          recipient=f'user{i}@yamdb.ru')
+            for i in range(5)
+        )
+        call_command('send_emails', batch_size=2)
+        assert len(mail.outbox) == 5
+        assert not OutgoingEmail.objects.filter(sent__isnull=True).exists()
+
+    def test_retry_with_backoff(self, failing):
+        queue('good@yamdb.ru', 'bad@yamdb.ru')
+        failing.add('bad@yamdb.ru')
+        call_command('send_emails', retry_delay=60, max_attempts=2)
+        bad = OutgoingEmail.objects.get(recipient='bad@yamdb.ru')
+        assert [message.to for message in mail.outbox] == [['good@yamdb.ru']]
+        assert (bad.sent, bad.attempts, bad.last_error) == (
+            None, 1, 'SMTP недоступен')
+
+        call_command('send_emails', retry_delay=60, max_attempts=2)
+        bad.refresh_from_db()
+        assert bad.attempts == 1, (
+            'Проверьте, что неотправленное письмо ждёт retry_delay'
+        )
+
+        failing.clear()
+        OutgoingEmail.objects.filter(id=bad.id).update(
+            last_attempt=bad.last_attempt - timedelta(seconds=61))
+        call_command('send_emails', retry_delay=60, max_attempts=2)
+        bad.refresh_from_db()
+        assert bad.sent is not None and bad.attempts == 2, (
+            'Проверьте, что письмо повторяется после retry_delay'
+        )
+        assert len(mail.outbox) == 2
+
+    def test_max_attempts(self, failing):
+        queue('bad@yamdb.ru')
+        failing.add('bad@yamdb.ru')
+        for _ in range(3):
+            OutgoingEmail.objects.update(last_attempt=None)
+            call_command('send_emails', max_attempts=2)
+        assert OutgoingEmail.objects.get().attempts == 2, (
+            'Проверьте, что после max_attempts письмо больше не отправляется'
+        )
+
+
+@pytest.mark.django_db(transaction=True)
+def test_sends_outside_transaction(monkeypatch):
+    """Строки забираются короткой транзакцией, SMTP — вне её."""
+    queue('reader@yamdb.ru')
+    seen = []
+    send = EmailMessage.send
+
+    def record(message, *args, **kwargs):
+        seen.append((connection.in_atomic_block,
+                     OutgoingEmail.objects.get().attempts))
+        return send(message, *args, **kwargs)
+
+    monkeypatch.setattr(EmailMessage, 'send', record)
+    call_command('send_emails')
+    assert seen == [(False, 1)], (
+        'Проверьте, что письмо помечается до отправки, а отправка идёт '
+        'без открытой транзакции'
+    )
+    assert OutgoingEmail.objects.get().sent is not None
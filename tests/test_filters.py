@@ -0,0 +1,72 @@
+import pytest
+from reviews.models import Category, Genre, Title, TitleGenre
+
+
+@pytest.mark.django_db
+class TestTitleFilter:
+
+    @pytest.fixture
+    def titles(self):
+        book = Category.objects.create(name='Книги', slug='book')
+        movie = Category.objects.create(name='Фильмы', slug='movie')
+        Category.objects.create(name='Музыка', slug='music')
+        drama = Genre.objects.create(name='Драма', slug='drama')
+        comedy = Genre.objects.create(name='Комедия', slug='comedy')
+        Genre.objects.create(name='Ужасы', slug='horror')
+        both = Title.objects.create(name='Обе', year=2000, category=book)
+        only_drama = Title.objects.create(name='Драма', year=2001,
+                                          category=movie)
+        Title.objects.create(name='Без жанра', year=2002)
+        TitleGenre.objects.bulk_create((
+            TitleGenre(title=both, genre=drama),
+            TitleGenre(title=both, genre=comedy),
+            TitleGenre(title=both, genre=comedy),
+            TitleGenre(title=only_drama, genre=drama),
+        ))
+
+    def names(self, client, query):
+        response = client.get(f'/api/v1/titles/?{query}')
+        assert response.status_code == 200, query
+        data = response.json()
+        names = [item['name'] for item in data['results']]
+        assert data['count'] == len(names), (
+            'Проверьте, что count совпадает с числом произведений в выдаче'
+        )
+        return names
+
+    def test_genre(self, client, titles):
+        assert self.names(client, 'genre=comedy') == ['Обе'], (
+            'Проверьте, что произведение с повторяющейся связью с жанром '
+            'попадает в выдачу один раз'
+        )
+        assert self.names(client, 'genre=drama') == ['Драма', 'Обе']
+        assert self.names(client, 'genre=horror') == []
+        assert self.names(client, 'genre=unknown') == []
+
+    def test_genre_any(self, client, titles):
+        assert self.names(client, 'genre=drama,comedy') == ['Драма', 'Обе']
+        assert self.names(
+            client, 'genre=comedy,horror&genre_match=any') == ['Обе']
+
+    def test_genre_all(self, client, titles):
+        assert self.names(
+            client, 'genre=drama,comedy&genre_match=all') == ['Обе'], (
+            'Проверьте, что genre_match=all оставляет произведения со всеми '
+            'перечисленными жанрами'
+        )
+        assert self.names(
+            client, 'genre=drama,horror&genre_match=all') == []
+
+    def test_genre_match_is_validated(self, client, titles):
+        response = client.get('/api/v1/titles/?genre=drama&genre_match=x')
+        assert response.status_code == 400
+
+    def test_category(self, client, titles):
+        assert self.names(client, 'category=book') == ['Обе']
+        assert self.names(client, 'category=book,movie') == ['Драма', 'Обе']
+        assert self.names(client, 'category=music') == []
+        assert self.names(client, 'category=unknown') == []
+
+    def test_category_and_genre(self, client, titles):
+        assert self.names(client, 'category=movie&genre=drama') == ['Драма']
+        assert self.names(client, 'category=movie&genre=comedy') == []
@@ -0,0 +1,229 @@
+import csv
+from datetime import datetime, timezone
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.db.backends.signals import connection_created
+from reviews.importers import TABLES, Table, dependency_levels
+from reviews.models import (Category, Comment, Genre, Review, Title,
+                            TitleGenre, User)
+
+PUB_DATE = '2019-09-24T21:08:21.567Z'
+PUB_DATETIME = datetime(2019, 9, 24, 21, 8, 21, 567000, tzinfo=timezone.utc)
+
+DATA = {
+    'category.csv': [('id', 'name', 'slug'),
+                     (1, 'Фильм', 'movie'), (2, 'Книга', 'book')],
+    'genre.csv': [('id', 'name', 'slug'),
+                  (1, 'Драма', 'drama'), (2, 'Комедия', 'comedy')],
+    'titles.csv': [('id', 'name', 'year', 'category'),
+                   (1, 'Титаник', 1997, 1), (2, 'Идиот', 1869, 2)],
+    'genre_title.csv': [('id', 'title_id', 'genre_id'),
+                        (1, 1, 1), (2, 1, 2), (3, 2, 1)],
+    'users.csv': [('id', 'username', 'email', 'role'),
+                  (1, 'reader', 'reader@yamdb.ru', 'user'),
+                  (2, 'writer', 'writer@yamdb.ru', 'user')],
+    'review.csv': [('id', 'title_id', 'text', 'author', 'score',
+                    'pub_date'),
+                   (1, 1, 'Отлично', 1, 10, PUB_DATE),
+                   (2, 1, 'Плохо', 2, 3, PUB_DATE),
+                   (3, 2, 'Неплохо', 1, 6, PUB_DATE)],
+    'comments.csv': [('id', 'review_id', 'text', 'author', 'pub_date'),
+                     (1, 1, 'Согласен', 2, PUB_DATE)],
+}
+
+COUNTS = {Category: 2, Genre: 2, Title: 2, TitleGenre: 3, User: 2,
+          Review: 3, Comment: 1}
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    def write(**extra):
+        for name, rows in DATA.items():
+            with open(tmp_path / name, 'w', newline='',
+                      encoding='utf-8') as csvfile:
+                csv.writer(csvfile).writerows(rows + extra.get(name, []))
+        return str(tmp_path)
+    return write
+
+
+def load(data_dir, *args):
+    out = StringIO()
+    call_command('add_data_to_db', '--data-dir', data_dir, *args,
+                 verbosity=2, stdout=out)
+    return out.getvalue()
+
+
+def counts():
+    return {model: model.objects.count() for model in COUNTS}
+
+
+@pytest.mark.django_db
+class TestBulkImport:
+
+    def test_clean_import(self, data_dir):
+        out = load(data_dir())
+        assert counts() == COUNTS
+        assert 'Review: 3 added, 0 skipped' in out
+        assert 'Data added successfully' in out
+        title = Title.objects.get(id=1)
+        assert (title.rating_sum, title.rating_count, title.rating) == (
+            13, 2, 6), (
+            'Проверьте, что после загрузки рейтинги пересчитываются'
+        )
+        assert sorted(title.genres.values_list('slug', flat=True)) == [
+            'comedy', 'drama']
+        assert Category.objects.create(name='Музыка', slug='music').id == 3, (
+            'Проверьте, что после загрузки сбрасываются последовательности id'
+        )
+
+    def test_pub_date_from_csv(self, data_dir):
+        load(data_dir())
+        assert set(Review.objects.values_list('pub_date', flat=True)) == {
+            PUB_DATETIME}, (
+            'Проверьте, что bulk-загрузка сохраняет pub_date из CSV'
+        )
+        assert Comment.objects.get().pub_date == PUB_DATETIME
+        assert Review._meta.get_field('pub_date').auto_now_add
+        review = Review.objects.create(title_id=2, author_id=2, text='Новый',
+                                       score=5)
+        assert review.pub_date > PUB_DATETIME
+
+    def test_bad_rows_are_skipped(self, data_dir):
+        out = load(data_dir(**{
+            'review.csv': [(4, 2, 'Ошибка', 2, 'десять', PUB_DATE),
+                           (5, 99, 'Нет произведения', 2, 5, PUB_DATE)],
+        }), '--batch-size', '10')
+        assert 'Review: 3 added, 2 skipped' in out, (
+            'Проверьте, что отвергнутая пачка повторяется построчно и '
+            'пропускаются только ошибочные строки'
+        )
+        assert "title_id='99' does not exist" in out
+        assert set(Review.objects.values_list('id', flat=True)) == {1, 2, 3}
+        assert counts() == COUNTS
+
+    def test_reimport_skips_existing(self, data_dir):
+        path = data_dir()
+        load(path)
+        Category.objects.filter(id=1).update(name='Кино')
+        out = load(path)
+        assert 'Category: 0 added, 2 skipped' in out, (
+            'Проверьте, что повторная загрузка пропускает строки, которые '
+            'уже есть в базе'
+        )
+        assert 'Comment: 0 added, 1 skipped' in out
+        assert counts() == COUNTS
+        assert Category.objects.get(id=1).name == 'Кино', (
+            'Проверьте, что повторная загрузка не перезаписывает строки'
+        )
+
+    def test_tables_load_in_dependency_order(self, data_dir):
+        out = load(data_dir())
+        names = [line.split(':')[0] for line in out.splitlines()
+                 if ' added, ' in line]
+        order = {name: names.index(name) for name in names}
+        for table in TABLES:
+            for model in table.foreign_keys.values():
+                assert order[model.__name__] < order[table.name]
+
+
+class TestDependencyLevels:
+
+    def test_levels(self):
+        levels = [{table.name for table in level}
+                  for level in dependency_levels(TABLES)]
+        assert levels == [{'Category', 'Genre', 'User'}, {'Title'},
+                          {'TitleGenre', 'Review'}, {'Comment'}]
+
+    def test_self_reference(self):
+        table = Table('Genre', Genre, 'genre.csv', {}, {'parent_id': Genre})
+        assert dependency_levels([table]) == [[table]]
+
+    def test_cycle(self):
+        tables = [
+            Table('Genre', Genre, 'genre.csv', {}, {'x_id': Category}),
+            Table('Category', Category, 'category.csv', {}, {'x_id': Genre}),
+        ]
+        with pytest.raises(ValueError):
+            dependency_levels(tables)
+
+
+@pytest.mark.skipif(connection.vendor != 'postgresql',
+                    reason='COPY есть только в PostgreSQL')
+@pytest.mark.django_db(transaction=True)
+class TestCopyImport:
+
+    def test_clean_import(self, data_dir):
+        out = load(data_dir(), '--copy')
+        assert 'falling back' not in out
+        assert counts() == COUNTS
+        assert Title.objects.get(id=1).rating == 6
+        assert set(Review.objects.values_list('pub_date', flat=True)) == {
+            PUB_DATETIME}
+
+    def test_matches_bulk_import(self, data_dir):
+        path = data_dir()
+        load(path, '--copy')
+        copied = list(Review.objects.order_by('id').values())
+        Review.objects.all().delete()
+        load(path)
+        assert list(Review.objects.order_by('id').values()) == copied, (
+            'Проверьте, что COPY и bulk-загрузка сохраняют одинаковые строки'
+        )
+
+    def test_reimport_skips_existing(self, data_dir):
+        path = data_dir()
+        load(path, '--copy')
+        out = load(path, '--copy')
+        assert 'Review: 0 added, 3 skipped' in out
+        assert counts() == COUNTS
+
+    def test_bad_timestamp_falls_back(self, data_dir):
+        out = load(data_dir(**{
+            'review.csv': [(4, 2, 'Ошибка', 2, 5, 'вчера')],
+        }), '--copy')
+        assert 'Review: COPY merge failed, loading row by row' in out
+        assert 'Unable to create an object with id=4' in out, (
+            'Проверьте, что испорченная дата пропускает только свою строку'
+        )
+        assert 'Review: 3 added, 1 skipped' in out
+        assert counts() == COUNTS
+
+
+@pytest.mark.skipif(connection.vendor != 'postgresql',
+                    reason='SQLite всегда загружает в один поток')
+@pytest.mark.django_db(transaction=True)
+def test_workers_reuse_connections(data_dir):
+    opened = []
+
+    def track(sender, connection, **kwargs):
+        opened.append(connection)
+
+    connection_created.connect(track)
+    try:
+        out = load(data_dir(), '--workers', '3', '--batch-size', '1')
+    finally:
+        connection_created.disconnect(track)
+    assert counts() == COUNTS
+    assert 'Review: 3 added, 0 skipped' in out
+    # Три потока для пачек и не больше трёх для таблиц одной волны.
+    assert len(opened) <= 6, (
+        'Проверьте, что поток открывает соединение один раз, а не на '
+        'каждую пачку'
+    )
+    main = connections[DEFAULT_DB_ALIAS]
+    assert all(wrapper.connection is None for wrapper in opened
+               if wrapper is not main), (
+        'Проверьте, что соединения потоков закрываются после загрузки'
+    )
+
+
+@pytest.mark.skipif(connection.vendor != 'sqlite',
+                    reason='запасной путь для баз без COPY')
+@pytest.mark.django_db
+def test_copy_falls_back_without_postgresql(data_dir):
+    out = load(data_dir(), '--copy', '--workers', '4')
+    assert 'COPY requires PostgreSQL, falling back to bulk inserts' in out
+    assert counts() == COUNTS
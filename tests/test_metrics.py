@@ -0,0 +1,86 @@
+import os
+import subprocess
+import sys
+
+import pytest
+from api import metrics
+from django.conf import settings
+from django.db import connection
+from prometheus_client import CollectorRegistry, multiprocess
+from rest_framework.test import APIClient
+
+
+def requests_count(viewset, action, method, status):
+    return metrics.REGISTRY.get_sample_value('yamdb_requests_total', {
+        'viewset': viewset, 'action': action, 'method': method,
+        'status': str(status),
+    }) or 0
+
+
+@pytest.mark.django_db
+class TestMetrics:
+
+    def test_requests_are_counted_by_action(self):
+        client = APIClient()
+        before = requests_count('TitleViewSet', 'list', 'GET', 200)
+        client.get('/api/v1/titles/')
+        client.get('/api/v1/titles/')
+        assert requests_count('TitleViewSet', 'list', 'GET', 200) == (
+            before + 2), (
+            'Проверьте, что запросы считаются по вьюсету и действию'
+        )
+
+    def test_errors_are_counted_by_status(self):
+        before = requests_count('GenreViewSet', 'create', 'POST', 401)
+        APIClient().post('/api/v1/genres/', {'name': 'Драма'})
+        assert requests_count('GenreViewSet', 'create', 'POST', 401) == (
+            before + 1)
+
+    def test_metrics_endpoint(self):
+        APIClient().get('/api/v1/categories/')
+        response = APIClient().get('/metrics')
+        assert response.status_code == 200
+        assert response['Content-Type'].startswith('text/plain')
+        body = response.content.decode()
+        assert ('yamdb_request_duration_seconds_bucket{action="list",'
+                'le="0.005",method="GET",viewset="CategoryViewSet"}'
+                in body), (
+            'Проверьте, что /metrics отдаёт гистограмму времени ответа'
+        )
+
+    def test_pool_gauges(self, monkeypatch):
+        class Pool:
+            closed = False
+            maxconn = 10
+
+            def usage(self):
+                return 3, 2
+
+        monkeypatch.setattr(connection, 'connection_pool', Pool(),
+                            raising=False)
+        metrics.update_pool_gauges()
+        value = metrics.REGISTRY.get_sample_value
+        assert value('yamdb_db_pool_connections',
+                     {'alias': 'default', 'state': 'in_use'}) == 3
+        assert value('yamdb_db_pool_connections',
+                     {'alias': 'default', 'state': 'idle'}) == 2
+        assert value('yamdb_db_pool_max_connections',
+                     {'alias': 'default'}) == 10
+
+
+def test_multiprocess_values_are_summed(tmp_path):
+    """Значения воркеров складываются через файлы каталога метрик."""
+    script = (
+        'from api import metrics\n'
+        'metrics.REQUESTS.labels("TitleViewSet", "list", "GET", 200).inc()\n'
+    )
+    env = dict(os.environ, PROMETHEUS_MULTIPROC_DIR=str(tmp_path),
+               PYTHONPATH=settings.BASE_DIR)
+    for _ in range(2):
+        subprocess.run([sys.executable, '-c', script], env=env, check=True)
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry, str(tmp_path))
+    assert registry.get_sample_value('yamdb_requests_total', {
+        'viewset': 'TitleViewSet', 'action': 'list', 'method': 'GET',
+        'status': '200',
+    }) == 2
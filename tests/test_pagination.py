@@ -0,0 +1,101 @@
+from datetime import datetime, timezone
+
+import pytest
+from api.views import TitleViewSet
+from rest_framework.test import APIClient
+from reviews.models import Review, Title, User
+
+TITLES = '/api/v1/titles/'
+
+
+@pytest.fixture
+def titles():
+    Title.objects.bulk_create(
+        Title(name=f'Произведение {i}', year=2000) for i in range(25))
+    return list(Title.objects.order_by('-id').values_list('id', flat=True))
+
+
+def follow(client, url, link='next'):
+    """Идёт по ссылкам link и возвращает id всех страниц."""
+    ids = []
+    pages = 0
+    while url:
+        body = client.get(url).json()
+        ids.extend(item['id'] for item in body['results'])
+        url = body[link]
+        pages += 1
+    return ids, pages
+
+
+@pytest.mark.django_db
+class TestCursorPagination:
+
+    def test_cursor_page(self, titles):
+        body = APIClient().get(f'{TITLES}?pagination=cursor').json()
+        assert list(body) == ['next', 'previous', 'results'], (
+            'Проверьте, что курсорная страница не содержит count'
+        )
+        assert [item['id'] for item in body['results']] == titles[:10]
+        assert body['previous'] is None
+        assert 'cursor=' in body['next']
+        assert 'pagination=cursor' in body['next'], (
+            'Проверьте, что ссылка next сохраняет режим пагинации'
+        )
+
+    def test_next_and_previous(self, titles):
+        client = APIClient()
+        ids, pages = follow(client, f'{TITLES}?pagination=cursor')
+        assert ids == titles, (
+            'Проверьте, что курсор проходит все записи по одному разу в '
+            'порядке -id'
+        )
+        assert pages == 3
+        first = client.get(f'{TITLES}?pagination=cursor').json()
+        second = client.get(first['next']).json()
+        back = client.get(second['previous']).json()
+        assert back['results'] == first['results']
+
+    def test_new_rows_do_not_shift_pages(self, titles):
+        client = APIClient()
+        first = client.get(f'{TITLES}?pagination=cursor').json()
+        Title.objects.create(name='Новое', year=2000)
+        second = client.get(first['next']).json()
+        assert [item['id'] for item in second['results']] == titles[10:20], (
+            'Проверьте, что новая запись не сдвигает следующие страницы'
+        )
+
+    def test_ties_in_ordering(self, titles):
+        """Отзывы с одинаковой pub_date не теряются и не повторяются."""
+        title = Title.objects.get(id=titles[0])
+        for i in range(15):
+            author = User.objects.create(username=f'user{i}',
+                                         email=f'{i}@yamdb.ru')
+            Review.objects.create(title=title, author=author, text='Отзыв',
+                                  score=5)
+        Review.objects.update(
+            pub_date=datetime(2021, 1, 1, tzinfo=timezone.utc))
+        ids, _ = follow(
+            APIClient(),
+            f'{TITLES}{title.id}/reviews/?pagination=cursor')
+        assert sorted(ids) == sorted(
+            Review.objects.values_list('id', flat=True))
+
+    def test_mode_switching(self, titles, monkeypatch):
+        client = APIClient()
+        assert 'count' in client.get(TITLES).json(), (
+            'Проверьте, что по умолчанию пагинация постраничная'
+        )
+        cursor = client.get(f'{TITLES}?pagination=cursor').json()['next']
+        cursor = cursor.split('cursor=')[-1].split('&')[0]
+        body = client.get(f'{TITLES}?cursor={cursor}').json()
+        assert 'count' not in body, (
+            'Проверьте, что параметр cursor включает курсорный режим'
+        )
+        assert [item['id'] for item in body['results']] == titles[10:20]
+        body = client.get(
+            f'{TITLES}?cursor={cursor}&pagination=page').json()
+        assert body['count'] == 25
+
+        monkeypatch.setattr(TitleViewSet, 'pagination_mode', 'cursor')
+        assert 'count' not in client.get(f'{TITLES}?page_size=5').json()
+        assert client.get(f'{TITLES}?pagination=page').json()['count'] == 25
@@ -0,0 +1,90 @@
+import os
+
+import pytest
+from api.authentication import access_token_for
+from api.profiling import percentile, stats
+from rest_framework.test import APIClient
+from reviews.models import Category, Title, User
+
+
+def client_for(user):
+    client = APIClient()
+    client.credentials(
+        HTTP_AUTHORIZATION=f'Bearer {access_token_for(user)}')
+    return client
+
+
+@pytest.fixture
+def profiling(settings, tmp_path):
+    settings.PROFILING_ENABLED = True
+    settings.PROFILING_CPROFILE_RATE = 0
+    settings.PROFILING_CPROFILE_DIR = str(tmp_path)
+    stats.reset()
+    yield settings
+    stats.reset()
+
+
+@pytest.fixture
+def admin():
+    return User.objects.create(username='admin', email='a@yamdb.ru',
+                               role='admin')
+
+
+@pytest.mark.django_db
+class TestProfiling:
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        assert percentile(values, 0.5) == 50
+        assert percentile(values, 0.95) == 95
+        assert percentile(values, 1) == 100
+        assert percentile([7], 0.99) == 7
+
+    def test_route_stats(self, profiling, admin):
+        category = Category.objects.create(name='Фильм', slug='movie')
+        Title.objects.create(name='Титаник', year=1997, category=category)
+        client = APIClient()
+        for _ in range(3):
+            assert client.get('/api/v1/titles/').status_code == 200
+        response = client_for(admin).get('/api/v1/profiling/')
+        assert response.status_code == 200
+        routes = response.json()['routes']
+        assert 'GET titles-list' in routes, (
+            'Проверьте, что статистика собирается по именам маршрутов '
+            'роутера'
+        )
+        titles = routes['GET titles-list']
+        assert titles['requests'] == 3
+        assert titles['queries']['max'] > 0
+        assert titles['db_ms']['max'] > 0
+        assert titles['serializer_ms']['max'] > 0
+        assert titles['render_ms']['max'] > 0
+        assert titles['size']['p50'] > 0
+        assert titles['wall_ms']['p95'] >= titles['db_ms']['p95']
+
+    def test_reset(self, profiling, admin):
+        client = client_for(admin)
+        client.get('/api/v1/genres/')
+        assert client.post('/api/v1/profiling/reset/').status_code == 204
+        routes = client.get('/api/v1/profiling/').json()['routes']
+        assert list(routes) == ['POST profiling-reset']
+
+    def test_only_admin_sees_stats(self, profiling):
+        user = User.objects.create(username='reader', email='r@yamdb.ru')
+        assert APIClient().get('/api/v1/profiling/').status_code == 401
+        assert client_for(user).get('/api/v1/profiling/').status_code == 403
+
+    def test_slow_request_is_dumped(self, profiling):
+        profiling.PROFILING_CPROFILE_RATE = 1
+        profiling.PROFILING_SLOW_MS = 0
+        APIClient().get('/api/v1/genres/')
+        dumps = os.listdir(profiling.PROFILING_CPROFILE_DIR)
+        assert len(dumps) == 1 and 'GET-genre-list' in dumps[0], (
+            'Проверьте, что профиль медленного запроса сохраняется'
+        )
+
+    def test_disabled_by_default(self, settings):
+        settings.PROFILING_ENABLED = False
+        stats.reset()
+        APIClient().get('/api/v1/genres/')
+        assert stats.summary() == {}
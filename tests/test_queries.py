@@ -0,0 +1,104 @@
+import pytest
+from api.views import TitleViewSet
+from reviews.models import (Category, Comment, Genre, Review, Title,
+                            TitleGenre, User)
+
+
+@pytest.fixture
+def titles():
+    category = Category.objects.create(name='Фильмы', slug='films')
+    genres = [
+        Genre.objects.create(name=f'Жанр {i}', slug=f'genre-{i}')
+        for i in range(3)
+    ]
+    Title.objects.bulk_create(
+        Title(name=f'Произведение {i}', year=2000, category=category)
+        for i in range(1000)
+    )
+    TitleGenre.objects.bulk_create(
+        TitleGenre(title_id=title_id, genre=genre)
+        for title_id in Title.objects.values_list('id', flat=True)
+        for genre in genres
+    )
+
+
+@pytest.fixture
+def review():
+    title = Title.objects.create(name='Произведение', year=2000)
+    User.objects.bulk_create(
+        User(username=f'user{i}', email=f'user{i}@yamdb.ru')
+        for i in range(20)
+    )
+    users = User.objects.filter(username__startswith='user')
+    Review.objects.bulk_create(
+        Review(title=title, author=user, text='Отзыв', score=5)
+        for user in users
+    )
+    review = Review.objects.first()
+    Comment.objects.bulk_create(
+        Comment(review=review, author=user, text='Комментарий')
+        for user in users
+    )
+    return review
+
+
+@pytest.mark.django_db
+class TestTitleQueries:
+
+    @pytest.mark.parametrize('page_size', (10, 100, 1000))
+    def test_titles_list_query_count(self, client, titles, monkeypatch,
+                                     django_assert_num_queries, page_size):
+        monkeypatch.setattr(
+            TitleViewSet.pagination_class, 'page_size', page_size)
+        # count страницы, произведения с категориями, жанры
+        with django_assert_num_queries(3):
+            response = client.get('/api/v1/titles/')
+        assert response.status_code == 200
+        assert len(response.json()['results']) == page_size, (
+            'Проверьте, что страница произведений содержит все записи'
+        )
+
+    def test_title_detail_query_count(self, client, titles,
+                                      django_assert_num_queries):
+        title = Title.objects.first()
+        with django_assert_num_queries(2):
+            response = client.get(f'/api/v1/titles/{title.id}/')
+        assert response.status_code == 200
+        assert len(response.json()['genre']) == 3
+
+
+@pytest.mark.django_db
+class TestReviewCommentQueries:
+
+    def test_reviews_list_query_count(self, client, review,
+                                      django_assert_num_queries):
+        with django_assert_num_queries(2):
+            response = client.get(f'/api/v1/titles/{review.title_id}/reviews/')
+        assert response.status_code == 200
+        assert len(response.json()['results']) == 10
+
+    def test_comments_list_query_count(self, client, review,
+                                       django_assert_num_queries):
+        url = (f'/api/v1/titles/{review.title_id}/reviews/'
+               f'{review.id}/comments/')
+        with django_assert_num_queries(2):
+            response = client.get(url)
+        assert response.status_code == 200
+        assert len(response.json()['results']) == 10
+
+    def test_empty_list_checks_parent(self, client, review,
+                                      django_assert_num_queries):
+        title = Title.objects.create(name='Без отзывов', year=2000)
+        with django_assert_num_queries(2):
+            response = client.get(f'/api/v1/titles/{title.id}/reviews/')
+        assert response.status_code == 200
+        assert response.json()['results'] == []
+        response = client.get(f'/api/v1/titles/{title.id + 1}/reviews/')
+        assert response.status_code == 404, (
+            'Проверьте, что для несуществующего произведения возвращается 404'
+        )
+        response = client.get(
+            f'/api/v1/titles/{title.id}/reviews/{review.id}/comments/')
+        assert response.status_code == 404, (
+            'Проверьте, что комментарии ищутся только в отзывах произведения'
+        )
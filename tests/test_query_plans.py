@@ -0,0 +1,180 @@
+import re
+
+import pytest
+from api.search import has_trigram_extension
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from reviews.models import (Category, Comment, Genre, Review, Title,
+                            TitleGenre, User)
+
+pytestmark = pytest.mark.skipif(
+    connection.vendor != 'postgresql',
+    reason='Планы запросов проверяются только на PostgreSQL'
+)
+
+TITLES = 2000
+BAD_NODES = ('Seq Scan', 'Sort', 'Incremental Sort')
+# Индекс, который не покрывает условие, виден по строкам, отброшенным
+# фильтром после чтения: например, обход индекса по pub_date с проверкой
+# title_id вместо составного индекса (title, pub_date). Порог заметно
+# меньше таблиц, но больше соединений в пределах одной страницы.
+MAX_FILTERED_ROWS = 500
+FILTERED_ROWS_RE = re.compile(
+    r'Rows Removed by (?:Join Filter|Filter|Index Recheck): (\d+)')
+# GIN-индексы поиска из миграции reviews 0023.
+SEARCH_INDEXES = ('reviews_title_name_trgm', 'reviews_title_document_fts')
+
+
+@pytest.fixture(scope='module')
+def seeded(django_db_setup, django_db_blocker):
+    """Данные на весь модуль: засев занимает больше, чем сами проверки."""
+    with django_db_blocker.unblock():
+        categories = Category.objects.bulk_create(
+            Category(name=f'Категория {i}', slug=f'category-{i}')
+            for i in range(10))
+        genres = Genre.objects.bulk_create(
+            Genre(name=f'Жанр {i}', slug=f'genre-{i}') for i in range(10))
+        titles = Title.objects.bulk_create(
+            Title(name=f'Произведение {i}', year=1990 + i % 30,
+                  category=categories[i % 10])
+            for i in range(TITLES))
+        TitleGenre.objects.bulk_create(
+            TitleGenre(title=title, genre=genres[(i + shift) % 10])
+            for i, title in enumerate(titles) for shift in (0, 3))
+        users = User.objects.bulk_create(
+            User(username=f'user{i}', email=f'user{i}@yamdb.ru')
+            for i in range(5))
+        reviews = Review.objects.bulk_create(
+            Review(title=title, author=user, text='Отзыв', score=5)
+            for title in titles for user in users)
+        Comment.objects.bulk_create(
+            Comment(review=review, author=users[0], text='Комментарий')
+            for review in reviews[:200] for _ in range(3))
+        Title.objects.recalculate_ratings()
+        with connection.cursor() as cursor:
+            # VACUUM, а не только ANALYZE: откаченные вставки предыдущих
+            # модулей остаются в списке ожидания GIN-индексов, и по его
+            # длине планировщик считает поиск по индексу дорогим.
+            cursor.execute('VACUUM ANALYZE')
+        yield titles[0], reviews[0]
+        for model in (Title, Genre, Category, User):
+            model.objects.all().delete()
+
+
+def plan_nodes(sql, forced=True):
+    """Узлы плана EXPLAIN ANALYZE для sql.
+
+    С forced=True планировщику запрещены последовательное чтение и
+    сортировка. Запрет не абсолютный: enable_* только добавляют огромную
+    стоимость, и Seq Scan или Sort остаются в плане, когда без них
+    запрос не выполнить. Поэтому такая проверка доказывает, что есть
+    индекс, который обслуживает условие и порядок запроса, но не то, что
+    планировщик выберет его сам: на маленькой или неселективной выборке
+    последовательное чтение честно дешевле. Для этого нужен план с
+    forced=False.
+    """
+    with connection.cursor() as cursor:
+        if forced:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            cursor.execute('SET LOCAL enable_sort = off')
+        # Засеянные таблицы занимают десятки страниц, и при стоимости
+        # случайного чтения по умолчанию планировщику дешевле пройти
+        # первичный ключ целиком. 1.1 — обычное значение для SSD.
+        cursor.execute('SET LOCAL random_page_cost = 1.1')
+        cursor.execute(f'EXPLAIN ANALYZE {sql}')
+        lines = [row[0] for row in cursor.fetchall()]
+    return [line.strip().lstrip('->').strip() for line in lines]
+
+
+@pytest.fixture
+def searchable(db):
+    """Произведение для поиска и индексы, которые поиск может использовать."""
+    if not has_trigram_extension(connection.alias):
+        pytest.skip('В базе нет расширения pg_trgm')
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT show_trgm('Ж')")
+        if not cursor.fetchone()[0]:
+            pytest.skip('pg_trgm не выделяет триграммы кириллицы: база '
+                        'создана с LC_CTYPE=C')
+    return Title.objects.create(name='Мастер и Маргарита', year=1967)
+
+
+@pytest.mark.django_db
+class TestQueryPlans:
+
+    def assert_indexed(self, client, url, bad_nodes=BAD_NODES):
+        """Проверяет планы SELECT запроса url и возвращает их SQL."""
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url)
+        assert response.status_code == 200, url
+        queries = []
+        for query in context.captured_queries:
+            sql = query['sql']
+            if not sql.startswith('SELECT'):
+                continue
+            queries.append(sql)
+            nodes = plan_nodes(sql)
+            bad = [
+                node for node in nodes
+                if node.startswith(bad_nodes) or any(
+                    int(rows) > MAX_FILTERED_ROWS
+                    for rows in FILTERED_ROWS_RE.findall(node))
+            ]
+            assert not bad, (
+                f'Проверьте индексы для запроса {url}: в плане есть '
+                f'{bad}\n{sql}\n' + '\n'.join(nodes)
+            )
+        return queries
+
+    @pytest.mark.parametrize('query', (
+        '',
+        '?pagination=cursor',
+        '?category=category-1',
+        '?category=category-1&page=15',
+        '?category=category-1,category-2',
+        '?genre=genre-2',
+        '?genre=genre-2&page=30',
+        '?genre=genre-2,genre-5&genre_match=all',
+        '?year=2000',
+        '?year=2000&page=6',
+        '?category=category-1&genre=genre-1&year=2001',
+    ))
+    def test_titles_list(self, client, seeded, query):
+        self.assert_indexed(client, f'/api/v1/titles/{query}')
+
+    def test_title_detail(self, client, seeded):
+        title, _ = seeded
+        self.assert_indexed(client, f'/api/v1/titles/{title.id}/')
+
+    @pytest.mark.parametrize('query', ('', '?pagination=cursor'))
+    def test_reviews_list(self, client, seeded, query):
+        title, _ = seeded
+        self.assert_indexed(
+            client, f'/api/v1/titles/{title.id}/reviews/{query}')
+
+    @pytest.mark.parametrize('query', ('', '?pagination=cursor'))
+    def test_comments_list(self, client, seeded, query):
+        title, review = seeded
+        self.assert_indexed(
+            client,
+            f'/api/v1/titles/{title.id}/reviews/{review.id}/comments/{query}')
+
+    @pytest.mark.parametrize('term', ('Маргарита', 'Маргорита', 'ргари'))
+    def test_title_search(self, client, seeded, searchable, term):
+        # Результат поиска упорядочен по рангу, который считается для
+        # каждой найденной строки, поэтому сортировка найденного неизбежна.
+        queries = self.assert_indexed(
+            client, f'/api/v1/titles/?name={term}',
+            bad_nodes=tuple(node for node in BAD_NODES if node != 'Sort'))
+        search_queries = [sql for sql in queries if '@@' in sql]
+        assert search_queries
+        for sql in search_queries:
+            for forced in (True, False):
+                plan = '\n'.join(plan_nodes(sql, forced))
+                assert 'Seq Scan on reviews_title' not in plan and all(
+                    index in plan for index in SEARCH_INDEXES), (
+                    'Проверьте, что поиск по названию использует GIN-индексы '
+                    'триграмм и полнотекстового поиска'
+                    + ('' if forced else ' без принудительных настроек')
+                    + f'\n{sql}\n{plan}'
+                )
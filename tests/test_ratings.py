@@ -0,0 +1,155 @@
+from concurrent.futures import ThreadPoolExecutor
+from importlib import import_module
+from io import StringIO
+from threading import Barrier
+
+import pytest
+from django.apps import apps
+from django.core.management import call_command
+from django.db import connection
+from rest_framework.test import APIClient
+from reviews.models import Review, Title, User
+
+
+@pytest.fixture
+def title():
+    return Title.objects.create(name='Произведение', year=2000)
+
+
+@pytest.fixture
+def authors():
+    clients = []
+    for i in range(3):
+        client = APIClient()
+        client.force_authenticate(User.objects.create(
+            username=f'author{i}', email=f'author{i}@yamdb.ru'))
+        clients.append(client)
+    return clients
+
+
+def stored(title):
+    title.refresh_from_db()
+    return title.rating_sum, title.rating_count, title.rating
+
+
+def add_reviews(title, scores):
+    for i, score in enumerate(scores):
+        author = User.objects.create(username=f'user{i}',
+                                     email=f'user{i}@yamdb.ru')
+        Review.objects.create(title=title, author=author, text='Отзыв',
+                              score=score)
+
+
+@pytest.mark.django_db
+class TestStoredRating:
+
+    def test_create_update_delete(self, title, authors):
+        url = f'/api/v1/titles/{title.id}/reviews/'
+        assert stored(title) == (0, 0, None)
+        ids = [client.post(url, {'text': 'Отзыв', 'score': score}).json()[
+            'id'] for client, score in zip(authors, (7, 8, 10))]
+        assert stored(title) == (25, 3, 8), (
+            'Проверьте, что новый отзыв меняет сумму, число оценок и рейтинг'
+        )
+        authors[0].patch(f'{url}{ids[0]}/', {'score': 1})
+        assert stored(title) == (19, 3, 6), (
+            'Проверьте, что смена оценки пересчитывает рейтинг'
+        )
+        authors[1].patch(f'{url}{ids[1]}/', {'text': 'Без смены оценки'})
+        assert stored(title) == (19, 3, 6)
+        authors[2].delete(f'{url}{ids[2]}/')
+        assert stored(title) == (9, 2, 4), (
+            'Проверьте, что удаление отзыва пересчитывает рейтинг'
+        )
+        for client, review_id in zip(authors, ids):
+            client.delete(f'{url}{review_id}/')
+        assert stored(title) == (0, 0, None), (
+            'Проверьте, что без отзывов рейтинг пустой'
+        )
+
+    def test_matches_reviews(self, title, authors):
+        url = f'/api/v1/titles/{title.id}/reviews/'
+        for client, score in zip(authors, (3, 9, 10)):
+            client.post(url, {'text': 'Отзыв', 'score': score})
+        rating = APIClient().get(f'/api/v1/titles/{title.id}/').json()[
+            'rating']
+        assert rating == sum((3, 9, 10)) // 3
+
+
+@pytest.mark.django_db
+class TestRecalculateRatings:
+
+    def test_recalculate_ratings(self, title):
+        empty = Title.objects.create(name='Без отзывов', year=2000)
+        add_reviews(title, (5, 6))
+        Title.objects.update(rating_sum=100, rating_count=1, rating=100)
+        Title.objects.recalculate_ratings()
+        assert stored(title) == (11, 2, 5)
+        assert stored(empty) == (0, 0, None)
+
+    def test_command(self, title):
+        add_reviews(title, (2, 4))
+        Title.objects.update(rating_sum=0, rating_count=0, rating=None)
+        out = StringIO()
+        call_command('recalculate_ratings', stdout=out)
+        assert stored(title) == (6, 2, 3)
+        assert 'Ratings recalculated for 1 titles' in out.getvalue()
+
+    def test_migration_backfill(self, title):
+        """Заполнение новых полей в миграции 0020 по существующим отзывам."""
+        empty = Title.objects.create(name='Без отзывов', year=2000)
+        add_reviews(title, (10, 9, 1))
+        Title.objects.update(rating_sum=0, rating_count=0, rating=None)
+        migration = import_module(
+            'reviews.migrations.0020_auto_20261018_1752')
+        migration.fill_ratings(apps, None)
+        assert stored(title) == (20, 3, 6)
+        assert stored(empty) == (0, 0, None)
+
+
+def concurrently(*requests):
+    """Выполняет запросы одновременно, каждый в своём соединении."""
+    barrier = Barrier(len(requests))
+
+    def run(request):
+        try:
+            barrier.wait()
+            return request().status_code
+        finally:
+            connection.close()
+
+    with ThreadPoolExecutor(max_workers=len(requests)) as executor:
+        return sorted(executor.map(run, requests))
+
+
+@pytest.mark.skipif(connection.vendor != 'postgresql',
+                    reason='нужны параллельные транзакции PostgreSQL')
+@pytest.mark.django_db(transaction=True)
+class TestConcurrentRating:
+
+    def test_concurrent_updates(self, title, authors):
+        url = f'/api/v1/titles/{title.id}/reviews/'
+        client = authors[0]
+        review_id = client.post(url, {'text': 'Отзыв', 'score': 5}).json()[
+            'id']
+        statuses = concurrently(*(
+            lambda score=score: client.patch(
+                f'{url}{review_id}/', {'score': score})
+            for score in (1, 9, 3, 7)
+        ))
+        assert statuses == [200] * 4
+        score = Review.objects.get().score
+        assert stored(title) == (score, 1, score), (
+            'Проверьте, что одновременные правки оценки не сбивают сумму'
+        )
+
+    def test_double_delete(self, title, authors):
+        url = f'/api/v1/titles/{title.id}/reviews/'
+        ids = [client.post(url, {'text': 'Отзыв', 'score': score}).json()[
+            'id'] for client, score in zip(authors, (4, 8))]
+        statuses = concurrently(*(
+            lambda: authors[0].delete(f'{url}{ids[0]}/') for _ in range(3)))
+        assert statuses == [204, 404, 404], (
+            'Проверьте, что отзыв удаляется и вычитается из рейтинга один раз'
+        )
+        assert stored(title) == (8, 1, 8)
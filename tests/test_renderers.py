@@ -0,0 +1,168 @@
+import json
+from collections import OrderedDict
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import pytest
+from api import renderers
+from api.renderers import FastJSONRenderer
+from django.utils.translation import gettext_lazy
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from reviews.models import Category, Review, Title, User
+
+DATA = OrderedDict((
+    ('text', 'Юникод 😀 "кавычки" \\ \n  '),
+    ('number', 10),
+    ('float', 0.1),
+    ('none', None),
+    ('flag', True),
+    ('date', datetime(2021, 1, 2, 3, 4, 5, 123456, tzinfo=timezone.utc)),
+    ('decimal', Decimal('1.50')),
+    ('lazy', gettext_lazy('Not found.')),
+    ('nested', [{'b': 1, 'a': [1, 2]}, []]),
+    (1, 'int key'),
+))
+
+
+@pytest.fixture(params=('orjson', 'json'))
+def encoder(request, settings):
+    if request.param == 'orjson' and renderers.orjson is None:
+        pytest.skip('orjson не установлен')
+    settings.JSON_ENCODER = request.param
+    return request.param
+
+
+class TestFastJSONRenderer:
+
+    def test_same_bytes_as_json_renderer(self, encoder):
+        assert FastJSONRenderer().render(DATA) == JSONRenderer().render(
+            DATA), 'Проверьте, что FastJSONRenderer не меняет вывод JSON'
+
+    def test_indent(self, encoder):
+        media_type = 'application/json; indent=4'
+        assert FastJSONRenderer().render(DATA, media_type) == (
+            JSONRenderer().render(DATA, media_type))
+
+    def test_none(self, encoder):
+        assert FastJSONRenderer().render(None) == b''
+
+    def test_stdlib_fallback(self, monkeypatch):
+        monkeypatch.setattr(renderers, 'orjson', None)
+        assert FastJSONRenderer().render(DATA) == JSONRenderer().render(DATA)
+
+    @pytest.mark.parametrize('chunks', (
+        [], [[]], [[{'a': 1}]], [[{'a': 1}, {'b': '😀'}], [], [{'c': None}]],
+    ))
+    def test_stream(self, encoder, chunks):
+        envelope = OrderedDict((('count', 3), ('next', None)))
+        streamed = b''.join(
+            FastJSONRenderer().stream(envelope, 'results', chunks))
+        expected = dict(envelope, results=[
+            item for chunk in chunks for item in chunk])
+        assert streamed == JSONRenderer().render(expected)
+
+
+@pytest.fixture
+def titles(settings):
+    settings.STREAM_CHUNK_SIZE = 4
+    settings.STREAM_MAX_PAGE_SIZE = 30
+    category = Category.objects.create(name='Фильм', slug='movie')
+    Title.objects.bulk_create(
+        Title(name=f'Произведение {i}', year=2000, category=category)
+        for i in range(35))
+    return list(Title.objects.all())
+
+
+def content(response):
+    if response.streaming:
+        return b''.join(response.streaming_content)
+    return response.content
+
+
+@pytest.mark.django_db
+class TestStreaming:
+
+    def test_stream_matches_regular_page(self, titles):
+        client = APIClient()
+        regular = client.get('/api/v1/titles/?page=2')
+        streamed = client.get('/api/v1/titles/?page=2&stream=true')
+        assert streamed.streaming, (
+            'Проверьте, что ?stream=true отдаёт StreamingHttpResponse'
+        )
+        assert streamed['Content-Type'] == 'application/json'
+        body = json.loads(content(streamed))
+        expected = json.loads(content(regular))
+        assert body['results'] == expected['results']
+        assert body['count'] == expected['count'] == 35
+        assert body['next'].endswith('page=3&stream=true')
+
+    def test_page_size(self, titles):
+        client = APIClient()
+        body = json.loads(content(
+            client.get('/api/v1/titles/?stream=1&page_size=25')))
+        assert len(body['results']) == 25
+        assert [row['id'] for row in body['results']] == [
+            title.id for title in titles[:25]]
+        body = json.loads(content(
+            client.get('/api/v1/titles/?stream=1&page_size=1000')))
+        assert len(body['results']) == 30, (
+            'Проверьте, что размер страницы ограничен STREAM_MAX_PAGE_SIZE'
+        )
+
+    def test_page_size_is_ignored_without_stream(self, titles):
+        body = APIClient().get('/api/v1/titles/?page_size=25').json()
+        assert len(body['results']) == 10
+
+    def test_invalid_page(self, titles):
+        response = APIClient().get('/api/v1/titles/?stream=true&page=100')
+        assert response.status_code == 404
+
+    def test_stream_is_not_cached(self, titles):
+        client = APIClient()
+        for _ in range(2):
+            response = client.get('/api/v1/titles/?stream=true')
+            assert response.streaming
+            assert len(json.loads(content(response))['results']) == 10
+
+    def test_cursor_pagination_is_not_streamed(self, titles):
+        response = APIClient().get(
+            '/api/v1/titles/?stream=true&pagination=cursor')
+        assert not response.streaming
+        assert len(response.json()['results']) == 10
+
+    def test_reviews_stream(self, titles):
+        title = titles[0]
+        for i in range(12):
+            user = User.objects.create(username=f'user{i}',
+                                       email=f'{i}@yamdb.ru')
+            Review.objects.create(title=title, author=user, text='Отзыв',
+                                  score=5)
+        url = f'/api/v1/titles/{title.id}/reviews/'
+        client = APIClient()
+        streamed = json.loads(content(client.get(f'{url}?stream=true')))
+        regular = client.get(url).json()
+        assert streamed['results'] == regular['results']
+        assert streamed['count'] == regular['count'] == 12
+        streamed = json.loads(content(
+            client.get(f'{url}?stream=true&page_size=20')))
+        assert len(streamed['results']) == 12
+
+    @pytest.mark.parametrize('url', (
+        '/api/v1/titles/{title_id}/reviews/?stream=true',
+        '/api/v1/titles/{title_id}/reviews/1/comments/?stream=true',
+    ))
+    def test_missing_title_stream(self, titles, url):
+        missing = max(title.id for title in titles) + 1
+        response = APIClient().get(url.format(title_id=missing))
+        assert response.status_code == 404, (
+            'Проверьте, что потоковый список несуществующего произведения '
+            'возвращает 404, как обычный'
+        )
+
+    def test_stream_has_etag(self, titles):
+        url = f'/api/v1/titles/{titles[0].id}/reviews/'
+        etag = APIClient().get(f'{url}?stream=true')['ETag']
+        response = APIClient().get(f'{url}?stream=true',
+                                   HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 304
@@ -0,0 +1,122 @@
+from concurrent.futures import ThreadPoolExecutor
+from threading import Barrier
+
+import pytest
+from django.db import connection
+from rest_framework.test import APIClient
+from reviews.models import Review, Title, User
+
+DUPLICATE = {
+    'non_field_errors': [
+        'На каждое произведение можно оставить только одно ревью'],
+}
+
+
+@pytest.fixture
+def title():
+    return Title.objects.create(name='Произведение', year=2000)
+
+
+@pytest.fixture
+def author():
+    return User.objects.create(username='author', email='author@yamdb.ru')
+
+
+def client_for(user):
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+def url(title_id):
+    return f'/api/v1/titles/{title_id}/reviews/'
+
+
+@pytest.mark.django_db
+class TestReviewCreate:
+
+    def test_create(self, title, author, django_assert_num_queries):
+        # SAVEPOINT, UPDATE рейтинга, INSERT отзыва и RELEASE.
+        with django_assert_num_queries(4):
+            response = client_for(author).post(
+                url(title.id), {'text': 'Отзыв', 'score': 7})
+        assert response.status_code == 201
+        assert response.json()['author'] == 'author'
+        title.refresh_from_db()
+        assert (title.rating, title.rating_count) == (7, 1)
+
+    def test_duplicate(self, title, author):
+        client = client_for(author)
+        client.post(url(title.id), {'text': 'Отзыв', 'score': 7})
+        response = client.post(url(title.id), {'text': 'Ещё', 'score': 1})
+        assert response.status_code == 400
+        assert response.json() == DUPLICATE, (
+            'Проверьте, что повторный отзыв возвращает прежнюю ошибку '
+            'проверки'
+        )
+        title.refresh_from_db()
+        assert (title.rating, title.rating_count) == (7, 1), (
+            'Проверьте, что отклонённый отзыв не меняет рейтинг'
+        )
+
+    def test_missing_title(self, title, author):
+        response = client_for(author).post(
+            url(title.id + 1), {'text': 'Отзыв', 'score': 7})
+        assert response.status_code == 404
+        assert not Review.objects.exists()
+
+    def test_invalid_score_is_checked_first(self, title, author):
+        response = client_for(author).post(
+            url(title.id + 1), {'text': 'Отзыв', 'score': 11})
+        assert response.status_code == 400
+        assert 'score' in response.json()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_duplicate_rolls_back_rating(title, author):
+    client = client_for(author)
+    client.post(url(title.id), {'text': 'Отзыв', 'score': 7})
+    response = client.post(url(title.id), {'text': 'Ещё', 'score': 1})
+    assert response.status_code == 400
+    title.refresh_from_db()
+    assert (title.rating_sum, title.rating_count) == (7, 1)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_deleted_author(title, author):
+    """Автор удалён после аутентификации: это не повторный отзыв."""
+    client = client_for(author)
+    User.objects.filter(id=author.id).delete()
+    response = client.post(url(title.id), {'text': 'Отзыв', 'score': 7})
+    assert response.status_code == 401, (
+        'Проверьте, что отзыв удалённого пользователя возвращает 401, '
+        'а не ошибку сервера'
+    )
+    assert response.json()['detail'] == 'Пользователь не найден'
+    title.refresh_from_db()
+    assert (title.rating_sum, title.rating_count) == (0, 0)
+    assert not Review.objects.exists()
+
+
+@pytest.mark.skipif(connection.vendor != 'postgresql',
+                    reason='нужны параллельные транзакции PostgreSQL')
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_duplicates(title, author):
+    barrier = Barrier(4)
+
+    def post(score):
+        try:
+            barrier.wait()
+            return client_for(author).post(
+                url(title.id), {'text': 'Отзыв', 'score': score}).status_code
+        finally:
+            connection.close()
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        statuses = sorted(executor.map(post, (1, 2, 3, 4)))
+    assert statuses == [201, 400, 400, 400], (
+        'Проверьте, что из одновременных отзывов автора сохраняется один'
+    )
+    title.refresh_from_db()
+    review = Review.objects.get()
+    assert (title.rating_sum, title.rating_count) == (review.score, 1)
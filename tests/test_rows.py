@@ -0,0 +1,131 @@
+from datetime import datetime, timezone
+from io import StringIO
+
+import pytest
+from api.rows import RowSerializer
+from api.serializers import GenreSerializer
+from api.views import CommentViewSet, ReviewViewSet, TitleViewSet
+from django.core.cache import cache
+from django.core.management import call_command
+from rest_framework.test import APIClient
+from reviews.models import (Category, Comment, Genre, Review, Title,
+                            TitleGenre, User)
+
+VIEWSETS = (TitleViewSet, ReviewViewSet, CommentViewSet)
+
+
+@pytest.fixture
+def data():
+    category = Category.objects.create(name='Фильм', slug='movie')
+    genres = [Genre.objects.create(name=f'Жанр «{i}»', slug=f'genre-{i}')
+              for i in range(3)]
+    titles = [
+        Title.objects.create(name='Титаник', year=1997, category=category,
+                             description='Про "айсберг"\nи любовь'),
+        Title.objects.create(name='Без категории', year=2000),
+        Title.objects.create(name='Без жанров', year=1900,
+                             category=category, description=''),
+    ]
+    TitleGenre.objects.bulk_create([
+        TitleGenre(title=titles[0], genre=genres[0]),
+        TitleGenre(title=titles[0], genre=genres[2]),
+        TitleGenre(title=titles[1], genre=genres[1]),
+    ])
+    users = [User.objects.create(username=f'user{i}', email=f'{i}@yamdb.ru')
+             for i in range(3)]
+    reviews = [Review.objects.create(title=titles[0], author=user,
+                                     text=f'Отзыв 😀 {i}', score=i + 1)
+               for i, user in enumerate(users)]
+    # Даты с микросекундами и без них проверяют формат pub_date.
+    Review.objects.filter(id=reviews[0].id).update(
+        pub_date=datetime(2021, 1, 2, 3, 4, 5, 123456, tzinfo=timezone.utc))
+    Review.objects.filter(id=reviews[1].id).update(
+        pub_date=datetime(2021, 1, 2, 3, 4, 5, tzinfo=timezone.utc))
+    for user in users:
+        Comment.objects.create(review=reviews[0], author=user,
+                               text='Комментарий')
+    Title.objects.recalculate_ratings()
+    return titles[0], reviews[0]
+
+
+def responses(url, client, monkeypatch, fast):
+    for viewset in VIEWSETS:
+        monkeypatch.setattr(viewset, 'fast_list', fast)
+    cache.clear()
+    return client.get(url)
+
+
+@pytest.mark.django_db
+class TestFastList:
+
+    @pytest.mark.parametrize('query', (
+        '', '?page=2', '?pagination=cursor', '?genre=genre-0,genre-1',
+        '?category=movie', '?year=1997', '?name=титаник', '?page=100',
+    ))
+    def test_titles_are_identical(self, data, monkeypatch, query):
+        self.assert_identical(f'/api/v1/titles/{query}', monkeypatch)
+
+    @pytest.mark.parametrize('query', ('', '?pagination=cursor'))
+    def test_reviews_and_comments_are_identical(self, data, monkeypatch,
+                                                query):
+        title, review = data
+        reviews = f'/api/v1/titles/{title.id}/reviews/'
+        self.assert_identical(reviews + query, monkeypatch)
+        self.assert_identical(
+            f'{reviews}{review.id}/comments/{query}', monkeypatch)
+
+    def test_authenticated_reviews_are_identical(self, data, monkeypatch):
+        title, review = data
+        client = APIClient()
+        client.force_authenticate(User.objects.get(username='user0'))
+        self.assert_identical(f'/api/v1/titles/{title.id}/reviews/',
+                              monkeypatch, client)
+
+    def test_empty_nested_list(self, data, monkeypatch):
+        title = Title.objects.get(name='Без жанров')
+        self.assert_identical(f'/api/v1/titles/{title.id}/reviews/',
+                              monkeypatch)
+
+    def assert_identical(self, url, monkeypatch, client=None):
+        client = client or APIClient()
+        slow = responses(url, client, monkeypatch, fast=False)
+        fast = responses(url, client, monkeypatch, fast=True)
+        assert fast.status_code == slow.status_code
+        assert fast.content == slow.content, (
+            f'Проверьте, что быстрый list {url} отдаёт тот же JSON, '
+            'что и сериализатор'
+        )
+        assert fast.get('ETag') == slow.get('ETag')
+
+    def test_titles_list_queries(self, data, django_assert_num_queries):
+        # COUNT, страница и жанры страницы одним запросом.
+        with django_assert_num_queries(3):
+            APIClient().get('/api/v1/titles/')
+
+
+class GenreRows(RowSerializer):
+    serializer_class = GenreSerializer
+    fields = ('name', 'slug')
+
+
+@pytest.mark.django_db
+def test_default_to_representation(data):
+    rows = GenreRows()
+    queryset = Genre.objects.all()
+    assert rows.to_representation(rows.values(queryset)) == (
+        GenreSerializer(queryset, many=True).data), (
+        'Проверьте, что строки values() без форматирования отдаются как есть'
+    )
+
+
+@pytest.mark.django_db
+def test_bench_serialization_command(monkeypatch):
+    """Микробенчмарк сверяет вывод обоих путей на засеянных данных."""
+    import reviews.management.commands.bench_serialization as command
+    monkeypatch.setattr(command, 'setup_databases', lambda **kwargs: None)
+    monkeypatch.setattr(command, 'teardown_databases',
+                        lambda *args, **kwargs: None)
+    out = StringIO()
+    call_command('bench_serialization', '--rows=5', '--repeat=1', stdout=out)
+    assert 'TitleRows' in out.getvalue()
+    assert 'CommentRows' in out.getvalue()
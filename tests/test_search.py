@@ -0,0 +1,79 @@
+import pytest
+from api.search import has_trigram_extension
+from django.db import connection
+from rest_framework.test import APIClient
+from reviews.models import Category, Genre, Title, User
+
+
+@pytest.fixture
+def trigram(db):
+    if (connection.vendor == 'postgresql'
+            and not has_trigram_extension(connection.alias)):
+        pytest.skip('В базе нет расширения pg_trgm')
+
+
+@pytest.mark.django_db
+class TestSearch:
+
+    def names(self, response):
+        assert response.status_code == 200
+        return [item['name'] for item in response.json()['results']]
+
+    def test_title_name_substring(self, client):
+        Title.objects.create(name='Война и мир', year=1869)
+        Title.objects.create(name='Мастер и Маргарита', year=1967)
+        names = self.names(client.get('/api/v1/titles/?name=войн'))
+        assert names == ['Война и мир'], (
+            'Проверьте, что фильтр name находит произведение по части '
+            'названия без учёта регистра'
+        )
+
+    def test_title_name_typo(self, client, trigram):
+        Title.objects.create(name='Гарри Поттер', year=1997)
+        Title.objects.create(name='Властелин колец', year=1954)
+        names = self.names(client.get('/api/v1/titles/?name=Гари Потер'))
+        assert names == ['Гарри Поттер'], (
+            'Проверьте, что поиск по названию допускает опечатки'
+        )
+
+    def test_title_description_and_ranking(self, client):
+        Title.objects.create(name='Роман', year=1869,
+                             description='История о драконах')
+        Title.objects.create(name='Драконы', year=2000)
+        Title.objects.create(name='Стихи', year=1900)
+        names = self.names(client.get('/api/v1/titles/?name=драконы'))
+        assert names[0] == 'Драконы', (
+            'Проверьте, что совпадение в названии ранжируется выше'
+        )
+        assert 'Стихи' not in names
+
+    def test_genre_and_category_search(self, client):
+        Genre.objects.create(name='Фантастика', slug='sci-fi')
+        Genre.objects.create(name='Драма', slug='drama')
+        Category.objects.create(name='Фильмы', slug='movie')
+        Category.objects.create(name='Книги', slug='book')
+        assert self.names(client.get('/api/v1/genres/?search=фантаст')) \
+            == ['Фантастика']
+        assert self.names(client.get('/api/v1/categories/?search=фильм')) \
+            == ['Фильмы']
+
+    def test_genre_typo(self, client, trigram):
+        Genre.objects.create(name='Фантастика', slug='sci-fi')
+        Genre.objects.create(name='Драма', slug='drama')
+        assert self.names(client.get('/api/v1/genres/?search=фонтастика')) \
+            == ['Фантастика'], (
+            'Проверьте, что поиск жанров допускает опечатки'
+        )
+
+    def test_username_search(self):
+        admin = User.objects.create(username='admin', email='a@yamdb.ru',
+                                    role='admin')
+        User.objects.create(username='alexander', email='b@yamdb.ru')
+        User.objects.create(username='boris', email='c@yamdb.ru')
+        client = APIClient()
+        client.force_authenticate(admin)
+        response = client.get('/api/v1/users/?search=alex')
+        assert [item['username'] for item in response.json()['results']] \
+            == ['alexander'], (
+            'Проверьте, что search находит пользователя по части username'
+        )
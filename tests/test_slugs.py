@@ -0,0 +1,194 @@
+import time
+
+import pytest
+from api import slugs
+from api.slugs import atomic_with_slugs, resolve_slugs
+from django.db import IntegrityError
+from rest_framework.test import APIClient
+from reviews.models import ADMIN, Category, Genre, Title, TitleGenre, User
+
+TITLES = '/api/v1/titles/'
+
+
+@pytest.fixture
+def admin_client():
+    client = APIClient()
+    client.force_authenticate(User.objects.create(
+        username='admin', email='admin@yamdb.ru', role=ADMIN))
+    return client
+
+
+@pytest.fixture
+def catalog():
+    category = Category.objects.create(name='Фильм', slug='movie')
+    genres = {slug: Genre.objects.create(name=slug.title(), slug=slug)
+              for slug in ('drama', 'comedy', 'horror')}
+    return category, genres
+
+
+def title_payload(**extra):
+    return dict({'name': 'Произведение', 'year': 2000,
+                 'genre': ['drama', 'comedy'], 'category': 'movie'}, **extra)
+
+
+@pytest.mark.django_db
+class TestSlugCache:
+
+    def test_one_query_then_cached(self, catalog, django_assert_num_queries):
+        category, genres = catalog
+        request = {Genre: {'drama', 'comedy', 'unknown'}, Category: {'movie'}}
+        expected = {
+            Genre: {'drama': genres['drama'].id,
+                    'comedy': genres['comedy'].id},
+            Category: {'movie': category.id},
+        }
+        with django_assert_num_queries(1):
+            assert resolve_slugs(request) == expected, (
+                'Проверьте, что слаги жанров и категорий ищутся одним '
+                'запросом'
+            )
+        request[Genre].discard('unknown')
+        with django_assert_num_queries(0):
+            assert resolve_slugs(request) == expected, (
+                'Проверьте, что найденные слаги берутся из кеша'
+            )
+        # Промахи не кешируются.
+        with django_assert_num_queries(1):
+            resolve_slugs({Genre: {'unknown'}})
+
+    def test_timeout(self, catalog, settings, monkeypatch,
+                     django_assert_num_queries):
+        settings.SLUG_CACHE_TIMEOUT = 10
+        resolve_slugs({Genre: {'drama'}})
+        now = time.monotonic()
+        monkeypatch.setattr(slugs.time, 'monotonic', lambda: now + 11)
+        with django_assert_num_queries(1):
+            resolve_slugs({Genre: {'drama'}})
+
+
+@pytest.mark.django_db
+class TestTitleWrites:
+
+    def test_create_queries(self, admin_client, catalog,
+                            django_assert_num_queries):
+        # Слаги, INSERT произведения, INSERT связей с жанрами, жанры для
+        # ответа и точка сохранения (SAVEPOINT и RELEASE).
+        with django_assert_num_queries(6):
+            response = admin_client.post(TITLES, title_payload(),
+                                         format='json')
+        assert response.status_code == 201
+        assert sorted(response.json()['genre']) == ['comedy', 'drama']
+        assert response.json()['category'] == 'movie'
+        with django_assert_num_queries(5):
+            admin_client.post(TITLES, title_payload(), format='json')
+
+    def test_create_from_form(self, admin_client, catalog):
+        response = admin_client.post(TITLES, title_payload())
+        assert response.status_code == 201
+        assert sorted(Title.objects.get().genres.values_list(
+            'slug', flat=True)) == ['comedy', 'drama']
+
+    def test_unknown_slugs(self, admin_client, catalog):
+        response = admin_client.post(
+            TITLES, title_payload(genre=['drama', 'jazz'], category='music'),
+            format='json')
+        assert response.status_code == 400
+        assert set(response.json()) == {'genre', 'category'}
+        assert not Title.objects.exists()
+
+    @pytest.mark.parametrize('payload', (
+        {'category': ['movie']},
+        {'category': {'slug': 'movie'}},
+        {'genre': [{'slug': 'drama'}, ['comedy']]},
+        {'genre': {'slug': 'drama'}},
+    ))
+    def test_malformed_slugs(self, admin_client, catalog, payload):
+        response = admin_client.post(TITLES, title_payload(**payload),
+                                     format='json')
+        assert response.status_code == 400, (
+            'Проверьте, что список или словарь вместо слага даёт ошибку '
+            'проверки, а не 500'
+        )
+        assert set(response.json()) <= {'genre', 'category'}
+        assert not Title.objects.exists()
+
+    def test_update_diffs_genres(self, admin_client, catalog):
+        admin_client.post(TITLES, title_payload(), format='json')
+        title = Title.objects.get()
+        kept = TitleGenre.objects.get(title=title, genre__slug='comedy')
+        response = admin_client.patch(
+            f'{TITLES}{title.id}/', {'genre': ['comedy', 'horror']},
+            format='json')
+        assert response.status_code == 200
+        assert sorted(response.json()['genre']) == ['comedy', 'horror']
+        links = TitleGenre.objects.filter(title=title)
+        assert sorted(links.values_list('genre__slug', flat=True)) == [
+            'comedy', 'horror']
+        assert links.filter(id=kept.id).exists(), (
+            'Проверьте, что неизменные связи с жанрами не пересоздаются'
+        )
+
+    def test_update_without_genres_keeps_links(self, admin_client, catalog):
+        admin_client.post(TITLES, title_payload(), format='json')
+        title = Title.objects.get()
+        admin_client.patch(f'{TITLES}{title.id}/', {'name': 'Другое'},
+                           format='json')
+        assert TitleGenre.objects.filter(title=title).count() == 2
+
+
+@pytest.mark.django_db(transaction=True)
+def test_signals_clear_cache(catalog):
+    resolve_slugs({Genre: {'drama'}, Category: {'movie'}})
+    Genre.objects.get(slug='drama').delete()
+    assert not slugs.caches[Genre].entries, (
+        'Проверьте, что изменение жанра очищает кеш слагов'
+    )
+    assert slugs.caches[Category].entries
+
+
+@pytest.mark.django_db(transaction=True)
+def test_stale_slug_is_validation_error(admin_client, catalog):
+    """Слаг удалили в другом процессе, а в кеше этого он ещё есть."""
+    category, genres = catalog
+    ghost = Genre.objects.create(name='Призрак', slug='ghost')
+    resolve_slugs({Genre: {'ghost'}})
+    entries = dict(slugs.caches[Genre].entries)
+    ghost.delete()
+    slugs.caches[Genre].entries = entries
+    response = admin_client.post(
+        TITLES, title_payload(genre=['ghost']), format='json')
+    assert response.status_code == 400, (
+        'Проверьте, что нарушение внешнего ключа из-за устаревшего кеша '
+        'возвращает ошибку проверки'
+    )
+    assert not Title.objects.exists()
+    assert not slugs.caches[Genre].entries
+    response = admin_client.post(
+        TITLES, title_payload(genre=['ghost']), format='json')
+    assert response.status_code == 400
+    assert 'genre' in response.json()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_stale_category_is_validation_error(admin_client, catalog):
+    ghost = Category.objects.create(name='Призрак', slug='ghost')
+    resolve_slugs({Category: {'ghost'}})
+    entries = dict(slugs.caches[Category].entries)
+    ghost.delete()
+    slugs.caches[Category].entries = entries
+    response = admin_client.post(
+        TITLES, title_payload(category='ghost'), format='json')
+    assert response.status_code == 400
+    assert response.json() == {'non_field_errors': [slugs.STALE_SLUGS]}
+    assert not slugs.caches[Category].entries
+
+
+@pytest.mark.django_db(transaction=True)
+def test_other_integrity_errors_are_raised(catalog):
+    resolve_slugs({Genre: {'drama'}})
+    with pytest.raises(IntegrityError):
+        with atomic_with_slugs():
+            Title.objects.create(name=None, year=2000)
+    assert slugs.caches[Genre].entries, (
+        'Проверьте, что ошибки, не связанные со слагами, не очищают кеш'
+    )